@@ -0,0 +1,69 @@
+import argparse
+import json
+import sys
+
+from . import synthetic
+from .compare import compare
+from .run import run
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    subparsers = parser.add_subparsers(dest="command")
+
+    run_parser = subparsers.add_parser("run", help="run the benchmarks and write the results as JSON")
+    run_parser.add_argument("--output", default="-")
+    run_parser.add_argument("--series", type=int, default=1000)
+    run_parser.add_argument("--observations", type=int, default=100)
+    run_parser.add_argument("--dimensions", type=int, default=3)
+    run_parser.add_argument("--codes", type=int, default=1000)
+    run_parser.add_argument("--hierarchy-depth", type=int, default=3)
+    run_parser.add_argument("--repeat", type=int, default=3)
+
+    compare_parser = subparsers.add_parser("compare", help="compare two sets of results")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=0.1)
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        return _run(args)
+    elif args.command == "compare":
+        return _compare(args)
+    else:
+        parser.print_help()
+        return 2
+
+
+def _run(args):
+    shape = synthetic.shape(
+        series=args.series,
+        observations=args.observations,
+        dimensions=args.dimensions,
+        codes=args.codes,
+        hierarchy_depth=args.hierarchy_depth,
+    )
+    results = run(shape, repeat=args.repeat)
+    output = json.dumps(results, indent=4, sort_keys=True)
+    if args.output == "-":
+        print(output)
+    else:
+        with open(args.output, "w") as fileobj:
+            fileobj.write(output + "\n")
+    return 0
+
+
+def _compare(args):
+    with open(args.old) as fileobj:
+        old = json.load(fileobj)
+    with open(args.new) as fileobj:
+        new = json.load(fileobj)
+
+    lines, regressed = compare(old, new, threshold=args.threshold)
+    for line in lines:
+        print(line)
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,38 @@
+_rate_keys = ["observations_per_second", "codes_per_second"]
+
+
+def compare(old, new, threshold=0.1):
+    # Returns a list of lines describing each benchmark, and whether any
+    # benchmark regressed by more than threshold
+    lines = []
+    regressed = False
+    for name in sorted(set(old["results"]) & set(new["results"])):
+        old_result = old["results"][name]
+        new_result = new["results"][name]
+
+        for key in _rate_keys:
+            if old_result.get(key) and new_result.get(key):
+                change = new_result[key] / old_result[key] - 1
+                is_regression = change < -threshold
+                lines.append(_line(name, key, old_result[key], new_result[key], change, is_regression))
+                regressed = regressed or is_regression
+
+        key = "peak_memory_bytes"
+        if old_result.get(key) and new_result.get(key):
+            change = float(new_result[key]) / old_result[key] - 1
+            is_regression = change > threshold
+            lines.append(_line(name, key, old_result[key], new_result[key], change, is_regression))
+            regressed = regressed or is_regression
+
+    return lines, regressed
+
+
+def _line(name, key, old_value, new_value, change, is_regression):
+    return "{0:<24} {1:<24} {2:>14.0f} {3:>14.0f} {4:>+8.1%}{5}".format(
+        name,
+        key,
+        old_value,
+        new_value,
+        change,
+        "  REGRESSION" if is_regression else "",
+    )
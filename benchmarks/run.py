@@ -0,0 +1,154 @@
+import gc
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+import sdmx
+from sdmx import dsd, snapshot
+from sdmx.instrumentation import clock
+
+from . import synthetic
+
+
+_message_writers = {
+    "generic": synthetic.write_generic_message,
+    "compact": synthetic.write_compact_message,
+}
+
+_message_readers = {
+    "generic": sdmx.generic_data_message_reader,
+    "compact": sdmx.compact_data_message_reader,
+}
+
+_modes = [
+    ("eager", False),
+    ("lazy-pulldom", "pulldom"),
+    ("lazy-iterparse", "iterparse"),
+]
+
+_format_modes = {
+    "generic": _modes + [("events", "events")],
+    "compact": _modes,
+}
+
+
+def run(shape, repeat=3):
+    directory = tempfile.mkdtemp()
+    try:
+        dsd_path = os.path.join(directory, "dsd.xml")
+        with open(dsd_path, "wb") as fileobj:
+            synthetic.write_dsd(fileobj, shape)
+        with open(dsd_path, "rb") as fileobj:
+            parsed_dsd = dsd.reader(fileobj)
+
+        results = {}
+        for message_format, write_message in sorted(_message_writers.items()):
+            message_path = os.path.join(directory, "{0}.xml".format(message_format))
+            with open(message_path, "wb") as fileobj:
+                write_message(fileobj, shape)
+
+            for mode, lazy in _format_modes[message_format]:
+                name = "{0}-{1}".format(message_format, mode)
+                read = _message_read(_message_readers[message_format], message_path, parsed_dsd, lazy)
+                results[name] = _measure(read, repeat, unit="observations")
+
+        results["dsd"] = _measure(_dsd_read(dsd_path, lazy=False), repeat, unit="codes")
+        results["dsd-lazy"] = _measure(_dsd_read(dsd_path, lazy=True), repeat, unit="codes")
+        results["dsd-snapshot"] = _measure(_snapshot_read(snapshot.dumps(parsed_dsd)), repeat, unit="codes")
+
+        return {
+            "version": 1,
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "shape": dict(shape._asdict()),
+            "results": results,
+        }
+    finally:
+        shutil.rmtree(directory)
+
+
+def _message_read(message_reader, path, parsed_dsd, lazy):
+    def read():
+        count = 0
+        with open(path, "rb") as fileobj:
+            reader = message_reader(fileobj, lazy=lazy, parsed_dsd=parsed_dsd)
+            for dataset in reader.datasets():
+                for series in dataset.series():
+                    for observation in series.observations():
+                        count += 1
+        return count
+
+    return read
+
+
+def _dsd_read(path, lazy):
+    def read():
+        with open(path, "rb") as fileobj:
+            return _count_codes(dsd.reader(fileobj, lazy=lazy))
+
+    return read
+
+
+def _snapshot_read(content):
+    def read():
+        return _count_codes(snapshot.loads(content))
+
+    return read
+
+
+def _count_codes(dsd_reader):
+    # Lazy readers only read a code list when it's used, so every code list
+    # is read for the rate to be comparable between modes
+    return sum(len(code_list.codes()) for code_list in dsd_reader.code_lists())
+
+
+def _measure(read, repeat, unit):
+    timings = []
+    for index in range(repeat):
+        gc.collect()
+        start = clock()
+        count = read()
+        timings.append(clock() - start)
+
+    seconds = min(timings)
+    result = {
+        unit: count,
+        "seconds": seconds,
+        unit + "_per_second": count / seconds if seconds else None,
+    }
+    result["peak_memory_bytes"] = _peak_memory(read)
+    return result
+
+
+def _peak_memory(read):
+    if tracemalloc is None:
+        return None
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        read()
+        current, peak = tracemalloc.get_traced_memory()
+        return peak
+    finally:
+        tracemalloc.stop()
+
+
+def _commit():
+    try:
+        with open(os.devnull, "w") as devnull:
+            output = subprocess.check_output(
+                ["git", "rev-parse", "HEAD"],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                stderr=devnull,
+            )
+        return output.decode("ascii").strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
@@ -0,0 +1,154 @@
+import collections
+from xml.sax.saxutils import quoteattr
+
+
+Shape = collections.namedtuple("Shape", [
+    "series",
+    "observations",
+    "dimensions",
+    "codes",
+    "hierarchy_depth",
+])
+
+
+def shape(series=100, observations=100, dimensions=3, codes=50, hierarchy_depth=3):
+    return Shape(
+        series=series,
+        observations=observations,
+        dimensions=dimensions,
+        codes=codes,
+        hierarchy_depth=hierarchy_depth,
+    )
+
+
+key_family_id = "SYNTHETIC"
+
+
+def write_dsd(fileobj, shape):
+    write = _writer(fileobj)
+    write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    write('<Structure xmlns="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message" xmlns:structure="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/structure">\n')
+    write('<CodeLists>\n')
+    for dimension in range(shape.dimensions):
+        write('<structure:CodeList id={0}>\n'.format(quoteattr(_code_list_id(dimension))))
+        write('<structure:Name xml:lang="en">Code list {0}</structure:Name>\n'.format(dimension))
+        for code in range(shape.codes):
+            parent = _parent_code(code, shape.hierarchy_depth)
+            if parent is None:
+                parent_attribute = ""
+            else:
+                parent_attribute = " parentCode={0}".format(quoteattr(_code_value(parent)))
+            write('<structure:Code value={0}{1}>'.format(quoteattr(_code_value(code)), parent_attribute))
+            write('<structure:Description xml:lang="en">Description of code {0} in dimension {1}</structure:Description>'.format(code, dimension))
+            write('</structure:Code>\n')
+        write('</structure:CodeList>\n')
+    write('</CodeLists>\n')
+    write('<Concepts>\n')
+    for dimension in range(shape.dimensions):
+        write('<structure:Concept id={0}><structure:Name xml:lang="en">Dimension {1}</structure:Name></structure:Concept>\n'.format(
+            quoteattr(concept(dimension)),
+            dimension,
+        ))
+    write('</Concepts>\n')
+    write('<KeyFamilies>\n')
+    write('<structure:KeyFamily id="{0}">\n'.format(key_family_id))
+    write('<structure:Name xml:lang="en">Synthetic key family</structure:Name>\n')
+    write('<structure:Components>\n')
+    for dimension in range(shape.dimensions):
+        write('<structure:Dimension conceptRef={0} codelist={1}/>\n'.format(
+            quoteattr(concept(dimension)),
+            quoteattr(_code_list_id(dimension)),
+        ))
+    write('<structure:TimeDimension conceptRef="TIME_PERIOD"/>\n')
+    write('<structure:PrimaryMeasure conceptRef="OBS_VALUE"/>\n')
+    write('</structure:Components>\n')
+    write('</structure:KeyFamily>\n')
+    write('</KeyFamilies>\n')
+    write('</Structure>\n')
+
+
+def write_generic_message(fileobj, shape):
+    write = _writer(fileobj)
+    write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    write('<message:GenericData xmlns="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/generic" xmlns:message="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message">\n')
+    write('<message:DataSet>\n')
+    write('<KeyFamilyRef>{0}</KeyFamilyRef>\n'.format(key_family_id))
+    for series in range(shape.series):
+        write('<Series>\n<SeriesKey>\n')
+        for dimension, code in enumerate(series_key(shape, series)):
+            write('<Value concept={0} value={1}/>\n'.format(quoteattr(concept(dimension)), quoteattr(_code_value(code))))
+        write('</SeriesKey>\n')
+        for observation in range(shape.observations):
+            write('<Obs><Time>{0}</Time><ObsValue value="{1}"/></Obs>\n'.format(
+                time_period(observation),
+                observation_value(series, observation),
+            ))
+        write('</Series>\n')
+    write('</message:DataSet>\n')
+    write('</message:GenericData>\n')
+
+
+def write_compact_message(fileobj, shape):
+    write = _writer(fileobj)
+    write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    write('<message:CompactData xmlns:message="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message" xmlns:data="urn:synthetic">\n')
+    write('<data:DataSet>\n')
+    for series in range(shape.series):
+        attributes = "".join(
+            " {0}={1}".format(concept(dimension), quoteattr(_code_value(code)))
+            for dimension, code in enumerate(series_key(shape, series))
+        )
+        write('<data:Series{0}>\n'.format(attributes))
+        for observation in range(shape.observations):
+            write('<data:Obs TIME_PERIOD="{0}" OBS_VALUE="{1}"/>\n'.format(
+                time_period(observation),
+                observation_value(series, observation),
+            ))
+        write('</data:Series>\n')
+    write('</data:DataSet>\n')
+    write('</message:CompactData>\n')
+
+
+def concept(dimension):
+    return "DIM{0}".format(dimension)
+
+
+def series_key(shape, series):
+    # Each series has a distinct key until the number of series exceeds
+    # the number of possible keys
+    codes = []
+    for dimension in range(shape.dimensions):
+        codes.append(series % shape.codes)
+        series //= shape.codes
+    return codes
+
+
+def time_period(observation):
+    return "{0:04d}-{1:02d}".format(1900 + observation // 12, observation % 12 + 1)
+
+
+def observation_value(series, observation):
+    return "{0}.{1}".format(series, observation)
+
+
+def _code_list_id(dimension):
+    return "CL_DIM{0}".format(dimension)
+
+
+def _code_value(code):
+    return "C{0}".format(code)
+
+
+def _parent_code(code, hierarchy_depth):
+    # Codes form chains of length hierarchy_depth
+    if hierarchy_depth <= 1 or code % hierarchy_depth == 0:
+        return None
+    else:
+        return code - 1
+
+
+def _writer(fileobj):
+    def write(text):
+        fileobj.write(text.encode("utf-8"))
+
+    return write
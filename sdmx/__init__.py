@@ -1,6 +1,20 @@
 from .dsd import reader as dsd_reader
-from .generic import generic_data_message_reader
-from .compact import compact_data_message_reader
+from .generic import generic_data_message_reader, generic_data_message_feed
+from .compact import compact_data_message_reader, compact_data_message_feed
+from .dsdcache import DsdCache
+from .parallel import read_many
+from .httpclient import PooledRequests
+from .instrumentation import ReaderStats
 
-__all__ = ["dsd_reader", "generic_data_message_reader", "compact_data_message_reader"]
+__all__ = [
+    "dsd_reader",
+    "generic_data_message_reader",
+    "compact_data_message_reader",
+    "generic_data_message_feed",
+    "compact_data_message_feed",
+    "DsdCache",
+    "read_many",
+    "PooledRequests",
+    "ReaderStats",
+]
 
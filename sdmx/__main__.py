@@ -0,0 +1,133 @@
+import argparse
+import sys
+
+from . import arrow, delimited
+from .compact import compact_data_message_reader
+from .dsdcache import DsdCache
+from .generic import generic_data_message_reader
+from .instrumentation import clock
+
+
+_readers = {
+    "generic": generic_data_message_reader,
+    "compact": compact_data_message_reader,
+}
+
+# The fastest engine that supports each format
+_default_engines = {
+    "generic": "events",
+    "compact": "iterparse",
+}
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="python -m sdmx")
+    subparsers = parser.add_subparsers(dest="command")
+
+    parquet_parser = subparsers.add_parser("parquet", help="convert a data message to Parquet or Arrow")
+    _add_message_arguments(parquet_parser)
+    parquet_parser.add_argument("output")
+    parquet_parser.add_argument("--output-format", choices=["parquet", "arrow"],
+        help="defaults to arrow if the output ends with .arrow, and parquet otherwise")
+    parquet_parser.add_argument("--batch-size", type=int, default=65536,
+        help="the number of rows in each record batch or row group")
+
+    csv_parser = subparsers.add_parser("csv", help="convert a data message to CSV or TSV")
+    _add_message_arguments(csv_parser)
+    csv_parser.add_argument("output", help="the path to write to, or - to write to stdout")
+    csv_parser.add_argument("--delimiter",
+        help="defaults to a tab if the output ends with .tsv, and a comma otherwise")
+    csv_parser.add_argument("--label-lang", action="append", default=[], dest="label_langs",
+        help="add a column of code descriptions in this language for each dimension")
+
+    args = parser.parse_args(argv)
+    if args.command == "parquet":
+        return _parquet(args)
+    elif args.command == "csv":
+        return _csv(args)
+    else:
+        parser.print_help()
+        return 2
+
+
+def _add_message_arguments(parser):
+    parser.add_argument("message")
+    parser.add_argument("--message-format", choices=sorted(_readers), default="generic")
+    parser.add_argument("--dsd", help="the DSD to use if the message has no URL for its DSD")
+    parser.add_argument("--dsd-cache", help="a directory used to cache DSDs fetched from URLs")
+    parser.add_argument("--engine", help="the lazy engine used to read the message")
+    parser.add_argument("--lang", help="the language used to describe coded times")
+
+
+def _parquet(args):
+    output_format = args.output_format
+    if output_format is None:
+        output_format = "arrow" if args.output.endswith(".arrow") else "parquet"
+
+    def convert(message_reader):
+        return arrow.write(
+            message_reader,
+            args.output,
+            output_format=output_format,
+            batch_size=args.batch_size,
+            lang=args.lang,
+        )
+
+    return _convert(args, convert)
+
+
+def _csv(args):
+    delimiter = args.delimiter
+    if delimiter is None:
+        delimiter = "\t" if args.output.endswith(".tsv") else ","
+
+    def convert(message_reader):
+        if args.output == "-":
+            output = getattr(sys.stdout, "buffer", sys.stdout)
+            return _write_csv(message_reader, output, delimiter, args)
+        else:
+            with open(args.output, "wb") as output:
+                return _write_csv(message_reader, output, delimiter, args)
+
+    return _convert(args, convert)
+
+
+def _write_csv(message_reader, output, delimiter, args):
+    return delimited.write(message_reader, output, delimiter=delimiter, lang=args.lang, label_langs=args.label_langs)
+
+
+def _convert(args, convert):
+    start = clock()
+    with _open_dsd(args.dsd) as dsd_fileobj:
+        with open(args.message, "rb") as fileobj:
+            message_reader = _readers[args.message_format](
+                fileobj,
+                lazy=args.engine or _default_engines[args.message_format],
+                dsd_fileobj=dsd_fileobj,
+                dsd_cache=None if args.dsd_cache is None else DsdCache(args.dsd_cache),
+            )
+            rows = convert(message_reader)
+    seconds = clock() - start
+
+    sys.stderr.write("Wrote {0} rows in {1:.2f} seconds ({2:.0f} rows/second)\n".format(
+        rows, seconds, rows / seconds if seconds else 0))
+    return 0
+
+
+def _open_dsd(path):
+    if path is None:
+        return _NoFile()
+    else:
+        return open(path, "rb")
+
+
+class _NoFile(object):
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *args):
+        pass
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,104 @@
+_output_formats = ["parquet", "arrow"]
+
+
+def write(message_reader, path, output_format="parquet", batch_size=65536, lang=None):
+    # Observations are read in batches of columns, and each batch is
+    # written before the next is read, so memory use depends on the batch
+    # size rather than the size of the message. Returns the number of rows
+    # written.
+    import pyarrow
+
+    if output_format not in _output_formats:
+        raise ValueError("Unknown output format: {0!r}".format(output_format))
+
+    writer = None
+    rows = 0
+    try:
+        for dataset in message_reader.datasets():
+            schema = _schema(pyarrow, [dimension.concept_ref() for dimension in dataset.key_family().dimensions()])
+            if writer is None:
+                writer = _open_writer(path, schema, output_format)
+            elif not schema.equals(writer.schema):
+                raise ValueError("Datasets with different dimensions can't be written to the same file")
+
+            for columns in dataset.column_batches(batch_size, lang=lang):
+                batch = record_batch(columns, schema)
+                writer.write(batch)
+                rows += batch.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def record_batch(columns, schema=None):
+    # Dimensions are dictionary-encoded using the codes and categories
+    # read into the columns, so no object is created per observation
+    import pyarrow
+
+    if schema is None:
+        schema = _schema(pyarrow, list(columns.dimensions.keys()))
+
+    arrays = [
+        _dictionary_array(pyarrow, codes, columns.categories[concept_ref])
+        for concept_ref, codes in columns.dimensions.items()
+    ]
+    arrays.append(pyarrow.array(columns.time, type=pyarrow.string()))
+    arrays.append(pyarrow.array(columns.value, type=pyarrow.float64()))
+    return pyarrow.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _schema(pyarrow, concept_refs):
+    dimension_type = pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+    return pyarrow.schema(
+        [(concept_ref, dimension_type) for concept_ref in concept_refs] +
+        [("time", pyarrow.string()), ("value", pyarrow.float64())]
+    )
+
+
+def _dictionary_array(pyarrow, codes, categories):
+    # Codes of -1 are dimensions missing from the series key
+    indices = pyarrow.array(codes, type=pyarrow.int32(), mask=codes < 0)
+    return pyarrow.DictionaryArray.from_arrays(indices, pyarrow.array(categories, type=pyarrow.string()))
+
+
+def _open_writer(path, schema, output_format):
+    if output_format == "parquet":
+        return _ParquetWriter(path, schema)
+    else:
+        return _ArrowWriter(path, schema)
+
+
+class _ParquetWriter(object):
+    # Each batch is written as its own row group
+    def __init__(self, path, schema):
+        import pyarrow.parquet
+
+        self.schema = schema
+        self._writer = pyarrow.parquet.ParquetWriter(path, schema)
+
+    def write(self, batch):
+        import pyarrow
+
+        self._writer.write_table(pyarrow.Table.from_batches([batch], schema=self.schema))
+
+    def close(self):
+        self._writer.close()
+
+
+class _ArrowWriter(object):
+    # Uses the IPC stream format, since categories can differ between
+    # batches, and the file format doesn't allow dictionaries to be replaced
+    def __init__(self, path, schema):
+        import pyarrow
+
+        self.schema = schema
+        self._sink = pyarrow.OSFile(path, "wb")
+        self._writer = pyarrow.ipc.new_stream(self._sink, schema)
+
+    def write(self, batch):
+        self._writer.write_batch(batch)
+
+    def close(self):
+        self._writer.close()
+        self._sink.close()
@@ -0,0 +1,229 @@
+import collections
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+
+from .periods import parse_period
+
+
+_nan = float("nan")
+
+
+def parse_value(value):
+    if value is None:
+        return _nan
+    if isinstance(value, float):
+        return value
+    try:
+        return float(value)
+    except ValueError:
+        # Such as ":", which some providers use for missing values
+        return _nan
+
+
+class Columns(object):
+    def __init__(self, time, value, dimensions, categories):
+        self.time = time
+        self.value = value
+        self.dimensions = dimensions
+        self.categories = categories
+
+    def __len__(self):
+        return len(self.value)
+
+    def to_dataframe(self, labels=None):
+        # labels maps the name of each label column to the concept of a
+        # dimension and a list of labels, one for each of its categories
+        import numpy
+        import pandas
+
+        data = OrderedDict()
+        for concept_ref, codes in self.dimensions.items():
+            data[concept_ref] = pandas.Categorical.from_codes(codes, categories=self.categories[concept_ref])
+        for name, (concept_ref, category_labels) in (labels or {}).items():
+            data[name] = _label_column(pandas, numpy, self.dimensions[concept_ref], category_labels)
+        data["value"] = self.value
+        return pandas.DataFrame(data, index=_period_index(pandas, self.time))
+
+
+def _label_column(pandas, numpy, codes, category_labels):
+    # Labels aren't necessarily unique, so codes for categories are mapped
+    # to codes for distinct labels, rather than building a label per row
+    distinct_labels = []
+    label_codes = {}
+    category_label_codes = numpy.empty(len(category_labels) + 1, dtype=numpy.int32)
+    for index, label in enumerate(category_labels):
+        if label is None:
+            code = -1
+        else:
+            code = label_codes.get(label)
+            if code is None:
+                code = label_codes[label] = len(distinct_labels)
+                distinct_labels.append(label)
+        category_label_codes[index] = code
+    # Missing codes of -1 index the last element
+    category_label_codes[-1] = -1
+    return pandas.Categorical.from_codes(category_label_codes[codes], categories=distinct_labels)
+
+
+def _period_index(pandas, times):
+    # Each distinct time is parsed once. If every time has the same
+    # frequency, the index is a PeriodIndex, otherwise it holds the start
+    # of each period.
+    time_codes, distinct_times = pandas.factorize(times)
+    periods = [parse_period(time) for time in distinct_times]
+    frequencies = set(_pandas_frequency(period) for period in periods)
+    if len(frequencies) == 1 and None not in frequencies:
+        frequency, = frequencies
+        index = pandas.PeriodIndex(
+            [pandas.Period(period.start.isoformat(), freq=frequency) for period in periods],
+            freq=frequency,
+        )
+    else:
+        index = pandas.DatetimeIndex([period.start.isoformat() for period in periods])
+    return index.take(time_codes).rename("time")
+
+
+def _pandas_frequency(period):
+    start, end = period
+    days = (end - start).days
+    if days == 1:
+        return "D"
+    elif days == 7:
+        return "W"
+    elif start.day != 1:
+        return None
+
+    months = (end.year - start.year) * 12 + end.month - start.month
+    if months == 1:
+        return "M"
+    elif months == 3 and start.month % 3 == 1:
+        return "Q"
+    elif months == 6 and start.month % 6 == 1:
+        return "6M"
+    elif months == 12 and start.month == 1:
+        return "Y"
+    else:
+        return None
+
+
+class ColumnsBuilder(object):
+    # Encoders are kept when the builder is reset, so code lists are only
+    # encoded once however many batches are built
+    def __init__(self, dimensions, capacity=1024):
+        self._capacity = capacity
+        self._encoders = [
+            (concept_ref, CodeEncoder(code_values))
+            for concept_ref, code_values in dimensions
+        ]
+        self.reset()
+
+    def reset(self):
+        # Built columns are views of the buffers, so new buffers are used
+        import numpy
+
+        capacity = self._capacity
+        self._times = []
+        self._value = GrowableArray(numpy.empty(capacity, dtype=numpy.float64))
+        self._dimensions = [
+            (concept_ref, encoder, GrowableArray(numpy.empty(capacity, dtype=numpy.int32)))
+            for concept_ref, encoder in self._encoders
+        ]
+
+    def __len__(self):
+        return len(self._value)
+
+    def append_series(self, key_codes, read_observations):
+        # read_observations is called with the function to make each
+        # observation from its time, value and status. The strings from
+        # the parser are written straight to the buffers, and values are
+        # converted to floats for the whole series at once.
+        values = []
+        append_time = self._times.append
+        append_value = values.append
+
+        def add_observation(time, value, status=None):
+            append_time(time)
+            append_value(value)
+
+        collections.deque(read_observations(add_observation), maxlen=0)
+
+        try:
+            self._value.extend(values)
+        except ValueError:
+            self._value.extend([parse_value(value) for value in values])
+
+        for (concept_ref, encoder, column), code in zip(self._dimensions, key_codes):
+            column.fill(encoder.encode(code), len(values))
+
+    def build(self):
+        import numpy
+
+        return Columns(
+            time=numpy.array(self._times, dtype=numpy.str_),
+            value=self._value.to_array(),
+            dimensions=OrderedDict(
+                (concept_ref, column.to_array())
+                for concept_ref, encoder, column in self._dimensions
+            ),
+            categories=OrderedDict(
+                (concept_ref, list(encoder.categories))
+                for concept_ref, encoder, column in self._dimensions
+            ),
+        )
+
+
+class CodeEncoder(object):
+    def __init__(self, code_values):
+        self.categories = list(code_values)
+        self._indexes = dict(
+            (code_value, index)
+            for index, code_value in enumerate(self.categories)
+        )
+
+    def encode(self, code_value):
+        if code_value is None:
+            return -1
+
+        index = self._indexes.get(code_value)
+        if index is None:
+            # Not all providers restrict themselves to the codes in the DSD
+            index = self._indexes[code_value] = len(self.categories)
+            self.categories.append(code_value)
+        return index
+
+
+class GrowableArray(object):
+    def __init__(self, array):
+        self._array = array
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def extend(self, values):
+        end = self._length + len(values)
+        self._reserve(end)
+        self._array[self._length:end] = values
+        self._length = end
+
+    def fill(self, value, count):
+        end = self._length + count
+        self._reserve(end)
+        self._array[self._length:end] = value
+        self._length = end
+
+    def to_array(self):
+        return self._array[:self._length]
+
+    def _reserve(self, length):
+        capacity = len(self._array)
+        if length > capacity:
+            while capacity < length:
+                capacity = max(capacity * 2, 1)
+            import numpy
+
+            array = numpy.empty(capacity, dtype=self._array.dtype)
+            array[:self._length] = self._array[:self._length]
+            self._array = array
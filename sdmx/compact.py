@@ -1,6 +1,9 @@
 import functools
 
-from .dataset import data_message_reader, Observation
+from .dataset import data_message_reader, observation_factory, Observation
+from .feed import DataMessageFeed, FeedHandler, attribute_pairs, local_name
+from . import dsd
+from .iteration import LazyIteration
 
 
 class CompactDataMessageParser(object):
@@ -12,26 +15,38 @@ class CompactDataMessageParser(object):
         key_family, = dsd_reader.key_families()
         return key_family
     
-    def get_series_elements(self, dataset_element):
-        return [
-            (element, self._series_key(element))
-            for element in _children_with_local_name(dataset_element, "Series")
-        ]
-            
+    def get_series_elements(self, dataset_element, make_key, matches_key=None):
+        for element in _children_with_local_name(dataset_element, "Series"):
+            series_key = make_key(self._series_key(element))
+            if matches_key is None or matches_key(series_key):
+                yield element, series_key
         
     def _series_key(self, series_element):
         return series_element.attributes()
         
-    def read_observations(self, key_family, series_element):
-        return map(
-            lambda element: self._read_obs_element(key_family, element),
-            _children_with_local_name(series_element, "Obs"),
+    def read_observations(self, key_family, series_element, make_observation=Observation, matches_time=None):
+        time_concept = key_family.time_dimension().concept_ref()
+        value_concept = key_family.primary_measure().concept_ref()
+        obs_elements = _children_with_local_name(series_element, "Obs")
+        if matches_time is not None:
+            obs_elements = (
+                element
+                for element in obs_elements
+                if matches_time(element.get(time_concept))
+            )
+        return LazyIteration.map(
+            lambda element: self._read_obs_element(element, time_concept, value_concept, make_observation),
+            obs_elements,
         )
         
-    def _read_obs_element(self, key_family, obs_element):
-        time = obs_element.get(key_family.time_dimension().concept_ref())
-        value = obs_element.get(key_family.primary_measure().concept_ref())
-        return Observation(time, value)
+    def _read_obs_element(self, obs_element, time_concept, value_concept, make_observation):
+        time = obs_element.get(time_concept)
+        value = obs_element.get(value_concept)
+        status = obs_element.get(_status_concept)
+        return make_observation(time, value, status)
+
+
+_status_concept = "OBS_STATUS"
 
 
 def _children_with_local_name(parent, local_name):
@@ -44,4 +59,59 @@ def _children_with_local_name(parent, local_name):
             yield element
 
 
+class CompactFeedHandler(FeedHandler):
+    def __init__(self, time_concept, value_concept, make_observation=Observation):
+        FeedHandler.__init__(self)
+        self._time_concept = time_concept
+        self._value_concept = value_concept
+        self._make_observation = make_observation
+        self._depth = 0
+        self._series_key = None
+    
+    def start(self, name, attributes):
+        self._depth += 1
+        name = local_name(name)
+        # As with the parser, namespaces are ignored, but only elements
+        # at the expected depth are read
+        if self._depth == 4 and name == "Obs" and self._series_key is not None:
+            attributes = dict(attribute_pairs(attributes))
+            self._emit("observation", self._make_observation(
+                attributes.get(self._time_concept),
+                attributes.get(self._value_concept),
+                attributes.get(_status_concept),
+            ))
+        elif self._depth == 3 and name == "Series":
+            self._series_key = attribute_pairs(attributes)
+            self._emit("series_start", self._series_key)
+        elif self._depth == 2 and name == "DataSet":
+            self._emit("dataset_start", dict(attribute_pairs(attributes)))
+    
+    def end(self, name):
+        name = local_name(name)
+        if self._depth == 3 and name == "Series":
+            self._emit("series_end", self._series_key)
+            self._series_key = None
+        elif self._depth == 2 and name == "DataSet":
+            self._emit("dataset_end", None)
+        self._depth -= 1
+
+
+def compact_data_message_feed(dsd_fileobj=None, parsed_dsd=None, time_concept=None, value_concept=None, typed_values=False):
+    # The time and value concepts are read from the key family of the DSD
+    # if one is given
+    if parsed_dsd is None and dsd_fileobj is not None:
+        parsed_dsd = dsd.reader(dsd_fileobj)
+    if parsed_dsd is not None:
+        key_family, = parsed_dsd.key_families()
+        time_concept = time_concept or key_family.time_dimension().concept_ref()
+        value_concept = value_concept or key_family.primary_measure().concept_ref()
+    
+    handler = CompactFeedHandler(
+        time_concept=time_concept or "TIME_PERIOD",
+        value_concept=value_concept or "OBS_VALUE",
+        make_observation=observation_factory(typed_values),
+    )
+    return DataMessageFeed(handler)
+
+
 compact_data_message_reader = functools.partial(data_message_reader, CompactDataMessageParser())
@@ -0,0 +1,244 @@
+import bz2
+import struct
+import zipfile
+import zlib
+
+
+_gzip_magic = b"\x1f\x8b"
+_bz2_magic = b"BZh"
+_zip_magic = b"PK\x03\x04"
+
+_chunk_size = 16 * 1024
+
+
+def open_members(fileobj):
+    # Returns an iterable of file-like objects, one for each document in
+    # fileobj. Compressed input is decompressed as it's read, so is never
+    # written to disk or held in memory in full.
+    fileobj, magic = _peek(fileobj, 4)
+    if not isinstance(magic, bytes):
+        # Files opened in text mode can't be compressed
+        return [fileobj]
+    elif magic.startswith(_gzip_magic):
+        return [_DecompressingReader(fileobj, lambda: zlib.decompressobj(16 + zlib.MAX_WBITS))]
+    elif magic.startswith(_bz2_magic):
+        return [_DecompressingReader(fileobj, bz2.BZ2Decompressor)]
+    elif magic.startswith(_zip_magic):
+        if _is_seekable(fileobj):
+            return _zip_file_members(fileobj)
+        else:
+            return _streamed_zip_members(fileobj)
+    else:
+        return [fileobj]
+
+
+def decompress(fileobj):
+    # Returns the first document in fileobj
+    for member in open_members(fileobj):
+        return member
+    raise ValueError("Archive has no members")
+
+
+def _peek(fileobj, size):
+    if _is_seekable(fileobj):
+        position = fileobj.tell()
+        magic = fileobj.read(size)
+        fileobj.seek(position)
+        return fileobj, magic
+    else:
+        fileobj = _PeekableReader(fileobj)
+        return fileobj, fileobj.peek(size)
+
+
+def _is_seekable(fileobj):
+    seekable = getattr(fileobj, "seekable", None)
+    return seekable is not None and seekable()
+
+
+class _PeekableReader(object):
+    def __init__(self, fileobj):
+        self._fileobj = fileobj
+        self._buffer = b""
+
+    def peek(self, size):
+        while len(self._buffer) < size:
+            chunk = self._fileobj.read(size - len(self._buffer))
+            if not chunk:
+                break
+            # Chunks are added to the first chunk, rather than to the empty
+            # buffer, so text is kept as text
+            if self._buffer:
+                self._buffer += chunk
+            else:
+                self._buffer = chunk
+        return self._buffer[:size]
+
+    def unread(self, data):
+        self._buffer = data + self._buffer
+
+    def read(self, size=-1):
+        if not self._buffer:
+            return self._fileobj.read(size)
+        elif size is None or size < 0:
+            result = self._buffer + self._fileobj.read()
+            self._buffer = b""
+            return result
+        else:
+            result = self._buffer[:size]
+            self._buffer = self._buffer[size:]
+            return result
+
+    def read_exactly(self, size):
+        data = self.peek(size)
+        if len(data) < size:
+            raise ValueError("Archive is truncated")
+        self._buffer = self._buffer[size:]
+        return data
+
+
+class _DecompressingReader(object):
+    # If multi_stream is True, streams that follow the first stream are
+    # also decompressed, as for concatenated gzip files. Otherwise, any
+    # data after the first stream is left unread.
+    def __init__(self, fileobj, create_decompressor, multi_stream=True):
+        self._fileobj = fileobj
+        self._create_decompressor = create_decompressor
+        self._decompressor = create_decompressor()
+        self._multi_stream = multi_stream
+        self._buffer = b""
+        self._eof = False
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            chunks = [self._buffer]
+            while not self._eof:
+                chunks.append(self._decompress_chunk())
+            self._buffer = b""
+            return b"".join(chunks)
+
+        while len(self._buffer) < size and not self._eof:
+            self._buffer += self._decompress_chunk()
+        result = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return result
+
+    def drain(self):
+        while not self._eof:
+            self._decompress_chunk()
+        self._buffer = b""
+
+    def _decompress_chunk(self):
+        if _is_end_of_stream(self._decompressor):
+            return self._next_stream(b"")
+
+        chunk = self._fileobj.read(_chunk_size)
+        if not chunk:
+            self._eof = True
+            if not _is_end_of_stream(self._decompressor):
+                raise ValueError("Compressed data is truncated")
+            return b""
+
+        data = self._decompressor.decompress(chunk)
+        if _is_end_of_stream(self._decompressor):
+            data += self._next_stream(self._decompressor.unused_data)
+        return data
+
+    def _next_stream(self, unused_data):
+        if not self._multi_stream:
+            self._fileobj.unread(unused_data)
+            self._eof = True
+            return b""
+        elif unused_data:
+            self._decompressor = self._create_decompressor()
+            data = self._decompressor.decompress(unused_data)
+            if _is_end_of_stream(self._decompressor):
+                data += self._next_stream(self._decompressor.unused_data)
+            return data
+        else:
+            # Check for another stream before starting a new decompressor,
+            # since a decompressor can't be given empty input
+            chunk = self._fileobj.read(_chunk_size)
+            if not chunk:
+                self._eof = True
+                return b""
+            return self._next_stream(chunk)
+
+
+def _is_end_of_stream(decompressor):
+    eof = getattr(decompressor, "eof", None)
+    if eof is None:
+        return bool(decompressor.unused_data)
+    else:
+        return eof
+
+
+def _zip_file_members(fileobj):
+    zip_file = zipfile.ZipFile(fileobj)
+    for info in zip_file.infolist():
+        if not info.filename.endswith("/"):
+            with zip_file.open(info) as member:
+                yield member
+
+
+_local_file_header = struct.Struct("<4sHHHHHIIIHH")
+_data_descriptor_magic = b"PK\x07\x08"
+_stored = 0
+_deflated = 8
+_has_data_descriptor = 0x08
+
+
+def _streamed_zip_members(fileobj):
+    # Reads members using their local file headers, since the central
+    # directory at the end of the archive can't be reached without seeking
+    while fileobj.peek(4) == _zip_magic:
+        (magic, version, flags, method, modified_time, modified_date, crc,
+            compressed_size, size, name_length, extra_length) = _local_file_header.unpack(
+                fileobj.read_exactly(_local_file_header.size))
+        name = fileobj.read_exactly(name_length)
+        fileobj.read_exactly(extra_length)
+
+        if flags & _has_data_descriptor:
+            if method != _deflated:
+                raise ValueError("Unsupported zip member: sizes are only known after the data")
+            source = fileobj
+        else:
+            source = _LimitedReader(fileobj, compressed_size)
+
+        if method == _deflated:
+            member = _DecompressingReader(source, lambda: zlib.decompressobj(-zlib.MAX_WBITS), multi_stream=False)
+        elif method == _stored:
+            member = source
+        else:
+            raise ValueError("Unsupported zip compression method: {0}".format(method))
+
+        if not name.endswith(b"/"):
+            yield member
+        member.drain()
+
+        if flags & _has_data_descriptor:
+            if fileobj.peek(4) == _data_descriptor_magic:
+                fileobj.read_exactly(4)
+            fileobj.read_exactly(12)
+
+
+class _LimitedReader(object):
+    def __init__(self, fileobj, size):
+        self._fileobj = fileobj
+        self._remaining = size
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._fileobj.read(size)
+        self._remaining -= len(data)
+        if size and not data:
+            raise ValueError("Archive is truncated")
+        return data
+
+    def unread(self, data):
+        self._fileobj.unread(data)
+        self._remaining += len(data)
+
+    def drain(self):
+        while self._remaining:
+            self.read(_chunk_size)
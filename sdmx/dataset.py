@@ -1,41 +1,93 @@
-import io
+import collections
+import functools
 import itertools
 try:
     from collections import OrderedDict
 except ImportError:
     from ordereddict import OrderedDict
 
-from .xmlcommon import parse_xml, XmlNode, parse_xml_lazy
-from . import dsd
-from .iteration import EagerIteration, LazyIteration
+from .xmlcommon import parse_xml, XmlNode, parse_xml_lazy, parse_xml_iterparse, default_lookahead_limit
+from . import dsd, compression, delimited
+from .iteration import EagerIteration, LazyIteration, string_types
+from .columns import ColumnsBuilder, parse_value
+from .keys import KeySchema
+from .streams import ChunkedReader
+from .periods import PeriodFilter
+from .instrumentation import CountingReader, InstrumentedParser, InstrumentedCodeDescriptions, clock
 
 
 class DsdFetcher(object):
-    def __init__(self, requests):
+    def __init__(self, requests, dsd_cache=None, lazy=False, stats=None):
         self._requests = requests
+        self._dsd_cache = dsd_cache
+        self._lazy = lazy
+        self._stats = stats
         self._cache = {}
     
     def fetch(self, url):
-        if url not in self._cache:
-            response = self._requests.get(url)
-            fileobj = io.BytesIO()
-            for buf in response.iter_content(16 * 1024):
-                fileobj.write(buf)
-            fileobj.flush()
-            fileobj.seek(0)
-            
-            self._cache[url] = dsd.reader(fileobj)
+        if url in self._cache:
+            if self._stats is not None:
+                self._stats.increment("dsd_cache_hits")
+        elif self._stats is None:
+            self._cache[url] = self._fetch_uncached(url)
+        else:
+            hits = getattr(self._dsd_cache, "hits", 0)
+            with self._stats.timer("dsd_fetch"):
+                self._cache[url] = self._fetch_uncached(url)
+            if getattr(self._dsd_cache, "hits", 0) > hits:
+                self._stats.increment("dsd_cache_hits")
+            else:
+                self._stats.increment("dsd_cache_misses")
         
         return self._cache[url]
+    
+    def _fetch_uncached(self, url):
+        if self._dsd_cache is None:
+            return self._fetch(url)
+        else:
+            return self._dsd_cache.fetch(url, self._requests, lazy=self._lazy, stats=self._stats)
+    
+    def _fetch(self, url):
+        response = self._requests.get(url)
+        return _read_dsd(ChunkedReader(response.iter_content(16 * 1024)), self._lazy, self._stats)
+
+
+def _read_dsd(fileobj, lazy, stats):
+    if stats is None:
+        return dsd.reader(fileobj, lazy=lazy)
+    else:
+        with stats.timer("dsd_parse"):
+            return dsd.reader(CountingReader(fileobj, stats, "dsd_bytes_read"), lazy=lazy)
 
 
 class Observation(object):
-    def __init__(self, time, value):
+    __slots__ = ["time", "value", "status"]
+    
+    def __init__(self, time, value, status=None):
         self.time = time
         self.value = value
+        self.status = status
+
 
+def _typed_observation_factory():
+    # Times are shared between observations since most series in a
+    # dataset cover the same periods
+    times = {}
+    
+    def make_observation(time, value, status=None):
+        return Observation(times.setdefault(time, time), parse_value(value), status)
+    
+    return make_observation
 
-def data_message_reader(parser, fileobj, lazy=None, requests=None, dsd_fileobj=None):
+
+def observation_factory(typed_values):
+    if typed_values:
+        return _typed_observation_factory()
+    else:
+        return Observation
+
+
+def data_message_reader(parser, fileobj, lazy=None, requests=None, dsd_fileobj=None, dsd_cache=None, parsed_dsd=None, typed_values=False, lazy_dsd=False, stats=None, index=None, lookahead_limit=default_lookahead_limit):
     if lazy:
         iteration = LazyIteration
     else:
@@ -44,25 +96,54 @@ def data_message_reader(parser, fileobj, lazy=None, requests=None, dsd_fileobj=N
     if requests is None:
         import requests
     
-    if dsd_fileobj is None:
+    make_observation = observation_factory(typed_values)
+    
+    if index is not None:
+        # Each dataset header and series is parsed from its own range of
+        # bytes, so the engine doesn't apply
+        lazy = None
+    elif lazy == "events":
+        parser = _event_parser(parser)
+        parse_xml_lazily = functools.partial(parser.open, stats=stats)
+    elif lazy:
+        parse_xml_lazily = functools.partial(_lazy_parser(lazy), lookahead_limit=lookahead_limit, stats=stats)
+    
+    if stats is not None:
+        # Only wrap the parser and file when stats are wanted, so readers
+        # without stats pay nothing
+        parser = InstrumentedParser(parser, stats)
+        fileobj = CountingReader(fileobj, stats)
+    
+    if parsed_dsd is not None:
+        default_dsd_reader = parsed_dsd
+    elif dsd_fileobj is None:
         default_dsd_reader = None
     else:
-        default_dsd_reader = dsd.reader(fileobj=dsd_fileobj)
+        default_dsd_reader = _read_dsd(dsd_fileobj, lazy_dsd, stats)
     
     class MessageReader(object):
-        def __init__(self, root, dsd_fetcher):
-            self._root = root
+        def __init__(self, roots, dsd_fetcher):
+            self._roots = roots
             self._dsd_fetcher = dsd_fetcher
         
         def datasets(self):
+            if index is not None:
+                return iteration.map(self._read_indexed_dataset, index.datasets)
+            
+            # Archives may hold several messages, whose datasets are read
+            # in turn
             return iteration.map(
                 self._read_dataset_element,
-                parser.get_dataset_elements(self._root),
+                itertools.chain.from_iterable(LazyIteration.map(parser.get_dataset_elements, self._roots)),
             )
             
         def _read_dataset_element(self, element):
             return DatasetReader(element, self._key_family(element))
         
+        def _read_indexed_dataset(self, indexed_dataset):
+            element = XmlNode(index.read_dataset_header(fileobj, indexed_dataset))
+            return DatasetReader(element, self._key_family(element), indexed_dataset.series)
+        
         def _key_family(self, dataset_element):
             dsd_reader = self._dsd_reader(dataset_element)
             return KeyFamily(
@@ -78,27 +159,101 @@ def data_message_reader(parser, fileobj, lazy=None, requests=None, dsd_fileobj=N
                 return self._dsd_fetcher.fetch(key_family_uri)
 
     class DatasetReader(object):
-        def __init__(self, element, key_family):
+        def __init__(self, element, key_family, indexed_series=None):
             self._element = element
             self._key_family = key_family
+            self._indexed_series = indexed_series
+            self._key_schema = key_family._key_schema()
         
         def key_family(self):
             return self._key_family
         
-        def series(self):
+        def series(self, key_filter=None, include_descendants=False):
+            if key_filter is None:
+                matches_key = None
+            else:
+                matches_key = self._key_family._key_filter(key_filter, include_descendants)
+            
+            if self._indexed_series is None:
+                series_elements = parser.get_series_elements(self._element, self._key_schema.key, matches_key)
+            else:
+                series_elements = self._indexed_series_elements(matches_key)
+            
             return iteration.map(
                 lambda args: self._read_series_element(self._key_family, *args),
-                parser.get_series_elements(self._element),
+                series_elements,
             )
         
+        def _indexed_series_elements(self, matches_key):
+            # Only the series that match are read from the file
+            for indexed_series in self._indexed_series:
+                key = self._key_schema.key(indexed_series.key)
+                if matches_key is None or matches_key(key):
+                    yield XmlNode(index.read_series(fileobj, indexed_series)), key
+        
         def _read_series_element(self, key_family, element, key):
             return SeriesReader(key_family, element, key)
+        
+        def columns(self, lang=None, key_filter=None, include_descendants=False):
+            builder = self._key_family._columns_builder()
+            for series in self.series(key_filter, include_descendants):
+                series._append_to(builder, lang=lang)
+            return builder.build()
+        
+        def column_batches(self, size, lang=None, key_filter=None, include_descendants=False):
+            # Whole series are added to each batch, so a batch may have more
+            # than size observations
+            _check_batch_size(size)
+            builder = self._key_family._columns_builder()
+            for series in self.series(key_filter, include_descendants):
+                series._append_to(builder, lang=lang)
+                if len(builder) >= size:
+                    yield builder.build()
+                    builder.reset()
+            
+            if len(builder):
+                yield builder.build()
+        
+        def write_csv(self, fileobj, delimiter=",", lang=None, label_langs=(), key_filter=None, include_descendants=False, header=True):
+            writer = delimited.DelimitedWriter(fileobj, delimiter)
+            if header:
+                writer.write_row(delimited.header_row(self._key_family, label_langs))
+            rows = delimited.write_dataset(self, writer, lang=lang, label_langs=label_langs, key_filter=key_filter, include_descendants=include_descendants)
+            writer.flush()
+            return rows
+        
+        def to_dataframe(self, lang=None, key_filter=None, include_descendants=False, label_langs=()):
+            columns = self.columns(lang, key_filter, include_descendants)
+            return columns.to_dataframe(self._key_family._category_labels(columns.categories, label_langs))
+        
+        def observation_batches(self, size, lang=None, key_filter=None, include_descendants=False, start_period=None, end_period=None):
+            # Batches run across series, so each observation is paired with
+            # the key of its series
+            _check_batch_size(size)
+            batch = []
+            for series in self.series(key_filter, include_descendants):
+                key = series.key()
+                observations = iter(series.observations(lang=lang, start_period=start_period, end_period=end_period))
+                while True:
+                    remaining = size - len(batch)
+                    batch.extend(zip(itertools.repeat(key, remaining), itertools.islice(observations, remaining)))
+                    if len(batch) < size:
+                        break
+                    yield batch
+                    batch = []
+            
+            if batch:
+                yield batch
 
 
     class KeyFamily(object):
         def __init__(self, key_family_reader, dsd_reader):
             self._key_family_reader = key_family_reader
             self._dsd_reader = dsd_reader
+            self._code_descriptions = dsd_reader.code_descriptions()
+            if stats is not None:
+                self._code_descriptions = InstrumentedCodeDescriptions(self._code_descriptions, stats)
+            self._described_dimensions = {}
         
         def name(self, lang):
             return self._key_family_reader.name(lang=lang)
@@ -111,32 +266,112 @@ def data_message_reader(parser, fileobj, lazy=None, requests=None, dsd_fileobj=N
         
         def describe_key(self, key, lang):
             key_lookup = dict(key)
-            return OrderedDict(
-                self._describe_value(dimension, key_lookup[dimension.concept_ref()], lang=lang)
-                for dimension in self._key_family_reader.dimensions()
+            return self._describe_key_codes(
+                [key_lookup[dimension.concept_ref()] for dimension in self._key_family_reader.dimensions()],
+                lang,
             )
+        
+        def code_descriptions(self):
+            return self._code_descriptions
             
+        def dimensions(self):
+            return self._key_family_reader.dimensions()
+        
         def time_dimension(self):
             return self._key_family_reader.time_dimension()
             
         def primary_measure(self):
             return self._key_family_reader.primary_measure()
         
-        def _describe_value(self, dimension, code_value, lang):
-            concept = self._dsd_reader.concept(dimension.concept_ref())
-            
-            return concept.name(lang=lang), self._describe_code(dimension.code_list_id(), code_value, lang=lang)
+        def _describe_dimensions(self, lang):
+            described_dimensions = self._described_dimensions.get(lang)
+            if described_dimensions is None:
+                described_dimensions = self._described_dimensions[lang] = [
+                    (
+                        dimension.concept_ref(),
+                        self._dsd_reader.concept(dimension.concept_ref()).name(lang=lang),
+                        dimension.code_list_id(),
+                    )
+                    for dimension in self._key_family_reader.dimensions()
+                ]
+            return described_dimensions
+        
+        def _describe_key_codes(self, codes, lang):
+            describe = self._code_descriptions.describe
+            described = OrderedDict()
+            for (concept_ref, concept_name, code_list_id), code in zip(self._describe_dimensions(lang), codes):
+                if code is None:
+                    raise KeyError(concept_ref)
+                described[concept_name] = list(describe(code_list_id, code, lang))
+            return described
         
         def _describe_code(self, code_list_id, code_value, lang):
+            return self._code_descriptions.describe(code_list_id, code_value, lang)
+        
+        def _key_schema(self):
+            return KeySchema([dimension.concept_ref() for dimension in self._key_family_reader.dimensions()])
+        
+        def _columns_builder(self):
+            return ColumnsBuilder([
+                (dimension.concept_ref(), self._code_values(dimension.code_list_id()))
+                for dimension in self._key_family_reader.dimensions()
+            ])
+        
+        def _category_labels(self, categories, langs):
+            labels = OrderedDict()
+            for lang in langs:
+                for dimension in self._key_family_reader.dimensions():
+                    concept_ref = dimension.concept_ref()
+                    labels["{0}_{1}".format(concept_ref, lang)] = (concept_ref, [
+                        self._code_label(dimension.code_list_id(), code_value, lang)
+                        for code_value in categories[concept_ref]
+                    ])
+            return labels
+        
+        def _code_label(self, code_list_id, code_value, lang):
+            # Values that aren't in the code list have no label
             code_list = self._dsd_reader.code_list(code_list_id)
-            descriptions = []
-            while code_value is not None:
-                code = code_list.code(code_value.strip())
-                description = code.description(lang=lang)
-                descriptions.append(description)
-                code_value = code.parent_code_id()
+            if code_list is None or code_list.code(code_value.strip()) is None:
+                return None
+            else:
+                return self._describe_code(code_list_id, code_value, lang)[-1]
+        
+        def _code_values(self, code_list_id):
+            code_list = self._dsd_reader.code_list(code_list_id)
+            if code_list is None:
+                return []
+            else:
+                return [code.value for code in code_list.codes()]
+        
+        def _key_filter(self, key_filter, include_descendants):
+            codes_by_concept = {}
+            for concept_ref, codes in key_filter.items():
+                if isinstance(codes, string_types):
+                    codes = [codes]
+                if include_descendants:
+                    codes = self._with_descendants(concept_ref, codes)
+                codes_by_concept[concept_ref] = frozenset(codes)
+            return _KeyFilter(codes_by_concept).matches
+        
+        def _with_descendants(self, concept_ref, codes):
+            dimension = self._find_dimension(concept_ref)
+            code_list = None if dimension is None else self._dsd_reader.code_list(dimension.code_list_id())
+            if code_list is None:
+                return codes
+            
+            children = collections.defaultdict(list)
+            for code in code_list.codes():
+                if code.parent_code_id() is not None:
+                    children[code.parent_code_id()].append(code.value)
             
-            return list(reversed(descriptions))
+            result = set()
+            pending = list(codes)
+            while pending:
+                code = pending.pop()
+                if code not in result:
+                    result.add(code)
+                    pending.extend(children[code])
+            return result
         
         def _find_dimension(self, concept_ref):
             for dimension in self._key_family_reader.dimensions():
@@ -150,36 +385,159 @@ def data_message_reader(parser, fileobj, lazy=None, requests=None, dsd_fileobj=N
             self._element = element
             self._series_key = series_key
             
+        def key(self):
+            return list(self._series_key)
+        
+        def key_codes(self):
+            return self._series_key.dimension_codes()
+        
         def describe_key(self, lang):
-            return self._key_family.describe_key(self._series_key, lang=lang)
+            return self._key_family._describe_key_codes(self._series_key.dimension_codes(), lang=lang)
         
-        def observations(self, lang=None):
-            observations = parser.read_observations(self._key_family, self._element)
+        def observations(self, lang=None, start_period=None, end_period=None):
+            return self._read_observations(make_observation, lang, start_period, end_period)
+        
+        def _read_observations(self, make_observation, lang=None, start_period=None, end_period=None):
+            if start_period is None and end_period is None:
+                period_filter = None
+            else:
+                period_filter = PeriodFilter(start_period, end_period)
+            
             time_dimension = self._key_family.time_dimension()
             time_code_list_id = time_dimension.code_list_id()
-            if time_code_list_id:
-                if not lang:
-                    raise ValueError("Observation time uses code list, but language is not specified")
-                
-                def describe_time_code(code):
-                    codes = self._key_family._describe_code(time_code_list_id, code, lang=lang)
-                    if len(codes) > 1:
-                        raise ValueError("Time value has parent, case not handled")
-                    else:
-                        code, = codes
-                        return code
-                
-                return (
-                    Observation(time=describe_time_code(observation.time), value=observation.value)
-                    for observation in observations
-                )
+            if time_code_list_id or period_filter is None:
+                matches_time = None
             else:
-                return observations
+                matches_time = period_filter.matches
+            
+            if not time_code_list_id:
+                return parser.read_observations(self._key_family, self._element, make_observation, matches_time)
+            
+            if not lang:
+                raise ValueError("Observation time uses code list, but language is not specified")
+            
+            def describe_time_code(code):
+                codes = self._key_family._describe_code(time_code_list_id, code, lang=lang)
+                if len(codes) > 1:
+                    raise ValueError("Time value has parent, case not handled")
+                else:
+                    code, = codes
+                    return code
+            
+            observations = (
+                (describe_time_code(observation.time), observation)
+                for observation in parser.read_observations(self._key_family, self._element, Observation, matches_time)
+            )
+            if period_filter is not None:
+                # Coded times can only be compared once described
+                observations = (
+                    (time, observation)
+                    for time, observation in observations
+                    if period_filter.matches(time)
+                )
+            return (
+                make_observation(time, observation.value, observation.status)
+                for time, observation in observations
+            )
+        
+        def columns(self, lang=None):
+            builder = self._key_family._columns_builder()
+            self._append_to(builder, lang=lang)
+            return builder.build()
+        
+        def observation_batches(self, size, lang=None, start_period=None, end_period=None):
+            _check_batch_size(size)
+            observations = iter(self.observations(lang=lang, start_period=start_period, end_period=end_period))
+            while True:
+                batch = list(itertools.islice(observations, size))
+                if not batch:
+                    return
+                yield batch
+        
+        def _append_to(self, builder, lang):
+            builder.append_series(
+                self._series_key.dimension_codes(),
+                lambda make_observation: self._read_observations(make_observation, lang=lang),
+            )
 
-    if lazy:
-        root = parse_xml_lazy(fileobj)
+    def read_root(member):
+        # Lazy engines time their own parsing as the message is read
+        if lazy:
+            return parse_xml_lazily(member)
+        start = clock()
+        root = XmlNode(parse_xml(member).getroot())
+        if stats is not None:
+            stats.add_time("xml_parse", clock() - start)
+        return root
+    
+    if index is None:
+        roots = iteration.map(read_root, compression.open_members(fileobj))
     else:
-        root = XmlNode(parse_xml(fileobj).getroot())
+        index.check(fileobj)
+        roots = None
+    dsd_fetcher = DsdFetcher(requests, dsd_cache=dsd_cache, lazy=lazy_dsd, stats=stats)
+    return MessageReader(roots, dsd_fetcher=dsd_fetcher)
+
+
+def _check_batch_size(size):
+    if size < 1:
+        raise ValueError("Batch size must be at least 1, but was {0}".format(size))
+
+
+class _KeyFilter(object):
+    # The codes to check are found once for each layout of key, rather than
+    # searching the concepts of every key
+    def __init__(self, codes_by_concept):
+        self._codes_by_concept = codes_by_concept
+        self._checks_by_layout = {}
+    
+    def matches(self, key):
+        checks = self._checks_by_layout.get(key.layout)
+        if checks is None:
+            checks = self._checks_by_layout[key.layout] = self._checks(key.layout)
+        if checks is False:
+            return False
+        
+        codes = key.codes
+        for position, allowed in checks:
+            value = codes[position]
+            if value is None or value.strip() not in allowed:
+                return False
+        return True
+    
+    def _checks(self, layout):
+        checks = []
+        for concept_ref, position in zip(layout.concepts, layout.positions):
+            allowed = self._codes_by_concept.get(concept_ref)
+            if allowed is not None:
+                checks.append((position, allowed))
+        if set(layout.concepts).issuperset(self._codes_by_concept):
+            return checks
+        else:
+            # Keys without every filtered concept never match
+            return False
+
+
+_lazy_parsers = {
+    "pulldom": parse_xml_lazy,
+    "iterparse": parse_xml_iterparse,
+}
+
+
+def _event_parser(parser):
+    # The events engine replaces the tree-walking parser with one that
+    # reads the message as a single stream of events
+    event_parser = getattr(parser, "event_parser", None)
+    if event_parser is None:
+        raise ValueError("The events engine is not supported for this message format")
+    return event_parser()
+
+
+def _lazy_parser(lazy):
+    if lazy is True:
+        lazy = "pulldom"
     
-    dsd_fetcher = DsdFetcher(requests)
-    return MessageReader(root, dsd_fetcher=dsd_fetcher)
+    try:
+        return _lazy_parsers[lazy]
+    except KeyError:
+        raise ValueError("Unknown lazy engine: {0!r}".format(lazy))
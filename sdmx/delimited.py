@@ -0,0 +1,113 @@
+import re
+
+from .iteration import string_types
+
+
+_buffer_size = 1024 * 1024
+_lines_per_chunk = 4096
+
+
+def write(message_reader, fileobj, delimiter=",", lang=None, label_langs=()):
+    # Writes every dataset in the message to a single file, with a header
+    # row before the first dataset. Returns the number of rows written.
+    writer = DelimitedWriter(fileobj, delimiter)
+    header = None
+    rows = 0
+    for dataset in message_reader.datasets():
+        dataset_header = header_row(dataset.key_family(), label_langs)
+        if header is None:
+            header = dataset_header
+            writer.write_row(header)
+        elif dataset_header != header:
+            raise ValueError("Datasets with different dimensions can't be written to the same file")
+        rows += write_dataset(dataset, writer, lang=lang, label_langs=label_langs)
+    writer.flush()
+    return rows
+
+
+def header_row(key_family, label_langs):
+    concept_refs = [dimension.concept_ref() for dimension in key_family.dimensions()]
+    return concept_refs + ["time", "value"] + [
+        "{0}_{1}".format(concept_ref, lang)
+        for lang in label_langs
+        for concept_ref in concept_refs
+    ]
+
+
+def write_dataset(dataset, writer, lang=None, label_langs=(), key_filter=None, include_descendants=False):
+    # The key and label columns are formatted once per series, so only the
+    # time and value are formatted for each observation
+    key_family = dataset.key_family()
+    code_list_ids = [dimension.code_list_id() for dimension in key_family.dimensions()]
+    rows = 0
+    for series in dataset.series(key_filter, include_descendants):
+        key_fields = series.key_codes()
+        label_fields = [
+            None if code is None else key_family._code_label(code_list_id, code, label_lang)
+            for label_lang in label_langs
+            for code_list_id, code in zip(code_list_ids, key_fields)
+        ]
+        rows += writer.write_observations(key_fields, label_fields, series.observations(lang=lang))
+    return rows
+
+
+class DelimitedWriter(object):
+    # Rows are gathered into large chunks before being encoded and
+    # written, rather than writing each row to the file separately
+    def __init__(self, fileobj, delimiter=",", encoding="utf-8"):
+        self._fileobj = fileobj
+        self._delimiter = delimiter
+        self._encoding = encoding
+        self._needs_quotes = re.compile('[{0}"\r\n]'.format(re.escape(delimiter))).search
+        self._quoted_times = {}
+        self._buffer = []
+        self._buffered = 0
+
+    def write_row(self, fields):
+        self._write(self._delimiter.join(self._quote(field) for field in fields) + "\r\n")
+
+    def write_observations(self, key_fields, label_fields, observations):
+        delimiter = self._delimiter
+        quote = self._quote
+        quoted_times = self._quoted_times
+        prefix = "".join(quote(field) + delimiter for field in key_fields)
+        suffix = "".join(delimiter + quote(field) for field in label_fields) + "\r\n"
+
+        rows = 0
+        lines = []
+        for observation in observations:
+            time = observation.time
+            quoted_time = quoted_times.get(time)
+            if quoted_time is None:
+                quoted_time = quoted_times[time] = quote(time)
+            lines.append(prefix + quoted_time + delimiter + quote(observation.value) + suffix)
+            if len(lines) >= _lines_per_chunk:
+                rows += len(lines)
+                self._write("".join(lines))
+                lines = []
+
+        rows += len(lines)
+        self._write("".join(lines))
+        return rows
+
+    def flush(self):
+        if self._buffer:
+            self._fileobj.write("".join(self._buffer).encode(self._encoding))
+            self._buffer = []
+            self._buffered = 0
+
+    def _write(self, text):
+        self._buffer.append(text)
+        self._buffered += len(text)
+        if self._buffered >= _buffer_size:
+            self.flush()
+
+    def _quote(self, field):
+        if field is None:
+            return ""
+        if not isinstance(field, string_types):
+            field = str(field)
+        if self._needs_quotes(field) is None:
+            return field
+        else:
+            return '"' + field.replace('"', '""') + '"'
@@ -1,10 +1,22 @@
 import collections
-
-from .xmlcommon import inner_text, parse_xml
+import re
+import tempfile
+from xml.parsers import expat
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+
+from .xmlcommon import inner_text, parse_xml, XmlFragment
 from .iteration import EagerIteration
+from . import compression
 
 
-def reader(fileobj):
+def reader(fileobj, lazy=False):
+    fileobj = compression.decompress(fileobj)
+    if lazy:
+        return _read_lazily(fileobj)
+    
     tree = parse_xml(fileobj)
     
     reader = DsdReader(tree)
@@ -15,6 +27,232 @@ def reader(fileobj):
     return Dsd(concepts, code_lists, key_families)
     
 
+def _read_lazily(fileobj):
+    # Indexes the DSD in a single streaming pass with expat. Concepts and key
+    # families are read straight away. Each code list is written to a
+    # temporary file as it's read, and parsed from there when it's first
+    # used.
+    reader = DsdReader(None)
+    concepts = []
+    code_list_sources = OrderedDict()
+    key_families = []
+    
+    for tag, fragment in _scan_fragments(fileobj):
+        if tag == _code_list_tag:
+            code_list_sources[fragment.get("id")] = _CodeListFragment(fragment)
+        elif tag == _concept_tag:
+            concepts.append(reader._read_concept_element(fragment.parse()))
+        else:
+            key_families.append(reader._read_key_family_element(fragment.parse()))
+    
+    return LazyDsd(concepts, code_list_sources, key_families)
+
+
+_chunk_size = 64 * 1024
+
+
+def _scan_fragments(fileobj):
+    scanner = None
+    while True:
+        chunk = fileobj.read(_chunk_size)
+        if scanner is None:
+            if isinstance(chunk, bytes):
+                scanner = _FragmentScanner()
+            else:
+                # Text has already been decoded, so any declared encoding is
+                # ignored
+                scanner = _FragmentScanner("utf-8")
+        if not isinstance(chunk, bytes):
+            chunk = chunk.encode("utf-8")
+        for fragment in scanner.feed(chunk, is_final=not chunk):
+            yield fragment
+        if not chunk:
+            return
+
+
+class _FragmentScanner(object):
+    # Finds the fragments of a DSD as it's fed. Code lists are copied to a
+    # temporary file as they're read. Otherwise, only the bytes from the
+    # start of the earliest fragment that's still open are kept.
+    def __init__(self, override_encoding=None):
+        self._parser = parser = expat.ParserCreate(override_encoding, namespace_separator=" ")
+        self._override_encoding = override_encoding
+        self._encoding = override_encoding or "utf-8"
+        self._content = bytearray()
+        # The position in the document of the start of the content
+        self._offset = 0
+        # Input that expat hasn't reported yet starts at or after the last
+        # event it reported
+        self._last_index = 0
+        self._path = []
+        self._starts = []
+        self._namespaces = [{}]
+        self._pending_namespaces = {}
+        self._fragments = []
+        self._fragment_file = _FragmentFile()
+        # The position in the document up to which an open code list has
+        # been copied, or None if no code list is open
+        self._spooled_to = None
+        
+        parser.XmlDeclHandler = self._xml_decl
+        parser.StartNamespaceDeclHandler = self._start_namespace
+        parser.StartElementHandler = self._start_element
+        parser.EndElementHandler = self._end_element
+    
+    def feed(self, chunk, is_final=False):
+        self._content += chunk
+        self._parser.Parse(chunk, is_final)
+        
+        keep_from = self._last_index
+        if self._spooled_to is not None:
+            self._spool(keep_from)
+        elif self._starts:
+            keep_from = min(keep_from, self._starts[0][0])
+        del self._content[:keep_from - self._offset]
+        self._offset = keep_from
+        
+        fragments = self._fragments
+        self._fragments = []
+        return fragments
+    
+    def _spool(self, end):
+        offset = self._offset
+        self._fragment_file.write(self._content[self._spooled_to - offset:end - offset])
+        self._spooled_to = end
+    
+    def _xml_decl(self, version, declared_encoding, standalone):
+        if declared_encoding and self._override_encoding is None:
+            self._encoding = declared_encoding
+    
+    def _start_namespace(self, prefix, uri):
+        self._pending_namespaces[prefix] = uri
+    
+    def _start_element(self, name, attributes):
+        start = self._last_index = self._parser.CurrentByteIndex
+        tag = _expat_tag(name)
+        in_scope = self._namespaces[-1]
+        if self._pending_namespaces:
+            in_scope = dict(in_scope)
+            in_scope.update(self._pending_namespaces)
+            self._pending_namespaces.clear()
+        self._namespaces.append(in_scope)
+        self._path.append(tag)
+        if _is_fragment_path(self._path):
+            raw_name = _raw_name_pattern.match(self._content, start - self._offset + 1).group(0)
+            if tag == _code_list_tag:
+                self._spooled_to = start
+                spool_offset = self._fragment_file.tell()
+            else:
+                spool_offset = None
+            self._starts.append((start, raw_name, attributes, in_scope, spool_offset))
+    
+    def _end_element(self, name):
+        self._last_index = self._parser.CurrentByteIndex
+        if _is_fragment_path(self._path):
+            start, raw_name, attributes, in_scope, spool_offset = self._starts.pop()
+            offset = self._offset
+            end = offset + _fragment_end(self._content, self._last_index - offset, raw_name)
+            if spool_offset is None:
+                content = bytes(self._content[start - offset:end - offset])
+                fragment = XmlFragment(content, attributes, in_scope, self._encoding)
+            else:
+                self._spool(end)
+                self._spooled_to = None
+                size = self._fragment_file.tell() - spool_offset
+                fragment = _SpooledFragment(self._fragment_file, spool_offset, size, attributes, in_scope, self._encoding)
+            self._fragments.append((self._path[-1], fragment))
+        self._path.pop()
+        self._namespaces.pop()
+
+
+def _fragment_end(content, index, raw_name):
+    # For an element with an end tag, expat reports the start of the end tag.
+    # For an empty element, it reports the end of the start tag.
+    if _is_end_tag(content, index, raw_name):
+        return content.index(b">", index) + 1
+    else:
+        return index
+
+
+class _FragmentFile(object):
+    # Holds the content of fragments in a temporary file, so that they
+    # aren't kept in memory until they're used
+    def __init__(self):
+        self._file = None
+    
+    def tell(self):
+        if self._file is None:
+            return 0
+        self._file.seek(0, 2)
+        return self._file.tell()
+    
+    def write(self, content):
+        if self._file is None:
+            self._file = tempfile.TemporaryFile()
+        self._file.seek(0, 2)
+        self._file.write(content)
+    
+    def read(self, offset, size):
+        self._file.seek(offset)
+        return self._file.read(size)
+
+
+class _SpooledFragment(object):
+    def __init__(self, fragment_file, offset, size, attributes, namespaces, encoding):
+        self._fragment_file = fragment_file
+        self._offset = offset
+        self._size = size
+        self._attributes = attributes
+        self._namespaces = namespaces
+        self._encoding = encoding
+    
+    def get(self, name):
+        return self._attributes.get(name)
+    
+    def parse(self):
+        content = self._fragment_file.read(self._offset, self._size)
+        return XmlFragment(content, self._attributes, self._namespaces, self._encoding).parse()
+
+
+def _is_fragment_path(path):
+    if len(path) == 3:
+        return (path[1], path[2]) in _fragment_parents
+    else:
+        return len(path) > 3 and path[1] == _concepts_tag and path[-1] == _concept_tag
+
+
+def _is_end_tag(content, index, raw_name):
+    end_tag_start = b"</" + raw_name
+    return (
+        content.startswith(end_tag_start, index) and
+        content[index + len(end_tag_start):index + len(end_tag_start) + 1] in (b">", b" ", b"\t", b"\r", b"\n")
+    )
+
+
+def _expat_tag(name):
+    parts = name.split(" ")
+    if len(parts) == 1:
+        return name
+    else:
+        return "{%s}%s" % tuple(parts)
+
+
+_raw_name_pattern = re.compile(br"[^\s/>]+")
+
+_code_lists_tag = "{http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message}CodeLists"
+_code_list_tag = "{http://www.SDMX.org/resources/SDMXML/schemas/v2_0/structure}CodeList"
+_concepts_tag = "{http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message}Concepts"
+_concept_tag = "{http://www.SDMX.org/resources/SDMXML/schemas/v2_0/structure}Concept"
+_key_families_tag = "{http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message}KeyFamilies"
+_key_family_tag = "{http://www.SDMX.org/resources/SDMXML/schemas/v2_0/structure}KeyFamily"
+
+_fragment_parents = set([
+    (_code_lists_tag, _code_list_tag),
+    (_concepts_tag, _concept_tag),
+    (_key_families_tag, _key_family_tag),
+])
+
+
 def _read_concepts(reader):
     return reader.concepts()
 
@@ -40,6 +278,7 @@ class Dsd(object):
             for code_list in code_lists
         )
         self._key_families = key_families
+        self._code_descriptions = CodeDescriptionIndex(self)
     
     def concepts(self):
         return self._concepts
@@ -55,6 +294,75 @@ class Dsd(object):
     
     def key_families(self):
         return self._key_families
+    
+    def code_descriptions(self):
+        return self._code_descriptions
+
+
+class _CodeListFragment(object):
+    def __init__(self, fragment):
+        self._fragment = fragment
+    
+    def read(self):
+        return DsdReader(None)._read_code_list_element(self._fragment.parse())
+
+
+class LazyDsd(Dsd):
+    # Each code list is read from its source the first time it's requested
+    def __init__(self, concepts, code_list_sources, key_families):
+        Dsd.__init__(self, concepts, [], key_families)
+        self._code_list_ids = list(code_list_sources)
+        self._code_list_sources = code_list_sources
+    
+    def code_lists(self):
+        return [self.code_list(id) for id in self._code_list_ids]
+    
+    def code_list(self, id):
+        if id in self._code_list_sources:
+            self._code_list_lookup[id] = self._code_list_sources.pop(id).read()
+        return self._code_list_lookup.get(id)
+
+
+class CodeDescriptionIndex(object):
+    def __init__(self, dsd):
+        self._dsd = dsd
+        self._descriptions = {}
+        self.hits = 0
+        self.misses = 0
+    
+    def describe(self, code_list_id, code_value, lang):
+        # Returns a tuple of descriptions of the code and its ancestors,
+        # with ancestors before descendants
+        key = (code_list_id, code_value, lang)
+        descriptions = self._descriptions.get(key)
+        if descriptions is None:
+            self.misses += 1
+            descriptions = self._descriptions[key] = self._read_descriptions(code_list_id, code_value, lang)
+        else:
+            self.hits += 1
+        return descriptions
+    
+    def build(self, lang, code_list_ids=None):
+        if code_list_ids is None:
+            code_lists = self._dsd.code_lists()
+        else:
+            code_lists = map(self._dsd.code_list, code_list_ids)
+        
+        for code_list in code_lists:
+            for code in code_list.codes():
+                self.describe(code_list.id, code.value, lang)
+    
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._descriptions)}
+    
+    def _read_descriptions(self, code_list_id, code_value, lang):
+        code = self._dsd.code_list(code_list_id).code(code_value.strip())
+        parent_code_id = code.parent_code_id()
+        if parent_code_id is None:
+            ancestors = ()
+        else:
+            ancestors = self.describe(code_list_id, parent_code_id, lang)
+        return ancestors + (code.description(lang=lang), )
 
 
 Concept = collections.namedtuple("Concept", [])
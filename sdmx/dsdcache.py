@@ -0,0 +1,275 @@
+import contextlib
+import errno
+import hashlib
+import io
+import json
+import os
+import tempfile
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from . import snapshot
+from .dataset import _read_dsd
+from .instrumentation import clock
+
+
+class DsdCache(object):
+    def __init__(self, directory, ttl=None, max_size=None):
+        self._directory = directory
+        self._ttl = ttl
+        self._max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        _make_directory(directory)
+
+    def fetch(self, url, requests, lazy=False, stats=None):
+        # Cached DSDs are read as they would be without the cache: lazily
+        # if lazy is True, with the parse timed in stats
+        key = _cache_key(url)
+        with self._lock(key):
+            metadata = self._read_metadata(key)
+            if metadata is not None and self._is_fresh(metadata):
+                dsd_reader = self._read_cached(key, lazy, stats)
+                if dsd_reader is not None:
+                    self.hits += 1
+                    return dsd_reader
+
+            headers = _conditional_headers(metadata)
+            if headers:
+                response = requests.get(url, headers=headers)
+            else:
+                response = requests.get(url)
+
+            status_code = getattr(response, "status_code", 200)
+            if status_code == 304 and metadata is not None:
+                dsd_reader = self._read_cached(key, lazy, stats)
+                if dsd_reader is not None:
+                    metadata["fetched_at"] = time.time()
+                    self._write_metadata(key, metadata)
+                    self.hits += 1
+                    return dsd_reader
+                # The cached files have gone, so fetch the DSD again
+                # without a conditional request
+                response = requests.get(url)
+                status_code = getattr(response, "status_code", 200)
+
+            if status_code >= 400:
+                raise IOError("Could not fetch DSD from {0}: HTTP status {1}".format(url, status_code))
+
+            self.misses += 1
+            content = b"".join(response.iter_content(16 * 1024))
+            dsd_reader = _read_dsd(io.BytesIO(content), lazy, stats)
+            self._write(key, url, response, content, None if lazy else dsd_reader)
+
+        self._evict(keep=key)
+        return dsd_reader
+
+    def _is_fresh(self, metadata):
+        return self._ttl is None or metadata["fetched_at"] + self._ttl > time.time()
+
+    def _read_cached(self, key, lazy, stats):
+        # A snapshot only reads each code list when it's first used, so
+        # serves lazy reads as well as eager ones. Writing a snapshot reads
+        # every code list, so is left to eager reads.
+        dsd_reader = self._read_snapshot(key, stats)
+        if dsd_reader is None:
+            dsd_reader = self._read_raw(key, lazy, stats)
+            if dsd_reader is not None and not lazy:
+                self._write_file(self._path(key, "snapshot"), snapshot.dumps(dsd_reader))
+        if dsd_reader is not None:
+            _touch(self._path(key, "json"))
+        return dsd_reader
+
+    def _read_snapshot(self, key, stats):
+        start = clock()
+        try:
+            dsd_reader = snapshot.load(self._path(key, "snapshot"))
+        except (IOError, OSError, ValueError):
+            return None
+        if stats is not None:
+            stats.add_time("dsd_parse", clock() - start)
+        return dsd_reader
+
+    def _read_raw(self, key, lazy, stats):
+        try:
+            with open(self._path(key, "xml"), "rb") as fileobj:
+                return _read_dsd(fileobj, lazy, stats)
+        except (IOError, OSError):
+            return None
+
+    def _read_metadata(self, key):
+        try:
+            with open(self._path(key, "json"), "rb") as fileobj:
+                return json.loads(fileobj.read().decode("utf-8"))
+        except (IOError, OSError, ValueError):
+            return None
+
+    def _write(self, key, url, response, content, dsd_reader):
+        response_headers = getattr(response, "headers", None) or {}
+        metadata = {
+            "url": url,
+            "etag": response_headers.get("ETag"),
+            "last_modified": response_headers.get("Last-Modified"),
+            "fetched_at": time.time(),
+        }
+        self._write_file(self._path(key, "xml"), content)
+        if dsd_reader is None:
+            _remove(self._path(key, "snapshot"))
+        else:
+            self._write_file(self._path(key, "snapshot"), snapshot.dumps(dsd_reader))
+        self._write_metadata(key, metadata)
+
+    def _write_metadata(self, key, metadata):
+        self._write_file(self._path(key, "json"), json.dumps(metadata).encode("utf-8"))
+
+    def _write_file(self, path, content):
+        # Write to a temporary file and then rename so that other processes
+        # never see a partially written file
+        fd, temp_path = tempfile.mkstemp(dir=self._directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fileobj:
+                fileobj.write(content)
+            _replace(temp_path, path)
+        except:
+            _remove(temp_path)
+            raise
+
+    def _evict(self, keep):
+        if self._max_size is None:
+            return
+
+        with self._lock(_evict_lock_key):
+            names = os.listdir(self._directory)
+            entries = []
+            for name in names:
+                if name.endswith(".json"):
+                    key = name[:-len(".json")]
+                    paths = [self._path(key, extension) for extension in _extensions]
+                    size = sum(map(_file_size, paths))
+                    last_used = _modified_time(self._path(key, "json"))
+                    entries.append((last_used, key, size))
+
+            total_size = sum(size for last_used, key, size in entries)
+            for last_used, key, size in sorted(entries):
+                if total_size <= self._max_size:
+                    break
+                if key != keep:
+                    self._remove_entry(key)
+                    total_size -= size
+
+            # Lock files are left behind by fetches that failed
+            for name in names:
+                key, extension = os.path.splitext(name)
+                if extension == ".lock" and key != _evict_lock_key and (key + ".json") not in names:
+                    self._remove_entry(key, only_if_unused=True)
+
+    def _remove_entry(self, key, only_if_unused=False):
+        with self._lock(key):
+            if only_if_unused and os.path.exists(self._path(key, "json")):
+                return
+            for extension in _extensions:
+                _remove(self._path(key, extension))
+            # Processes waiting for the lock notice that the file has been
+            # removed, and lock the new file instead
+            _remove(self._path(key, "lock"))
+
+    @contextlib.contextmanager
+    def _lock(self, key):
+        if fcntl is None:
+            yield
+        else:
+            path = self._path(key, "lock")
+            while True:
+                lock_file = open(path, "ab")
+                try:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                    if _is_same_file(lock_file, path):
+                        break
+                except:
+                    lock_file.close()
+                    raise
+                # The entry was evicted while waiting for the lock
+                lock_file.close()
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                lock_file.close()
+
+    def _path(self, key, extension):
+        return os.path.join(self._directory, "{0}.{1}".format(key, extension))
+
+
+_extensions = ["json", "xml", "snapshot"]
+
+_evict_lock_key = "evict"
+
+
+def _cache_key(url):
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+
+def _conditional_headers(metadata):
+    headers = {}
+    if metadata is not None:
+        if metadata.get("etag"):
+            headers["If-None-Match"] = metadata["etag"]
+        if metadata.get("last_modified"):
+            headers["If-Modified-Since"] = metadata["last_modified"]
+    return headers
+
+
+def _make_directory(path):
+    try:
+        os.makedirs(path)
+    except OSError as error:
+        if error.errno != errno.EEXIST:
+            raise
+
+
+def _replace(source, destination):
+    if hasattr(os, "replace"):
+        os.replace(source, destination)
+    else:
+        os.rename(source, destination)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _touch(path):
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+
+
+def _is_same_file(fileobj, path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    file_stat = os.fstat(fileobj.fileno())
+    return (stat.st_dev, stat.st_ino) == (file_stat.st_dev, file_stat.st_ino)
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _modified_time(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0
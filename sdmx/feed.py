@@ -0,0 +1,111 @@
+import collections
+from xml.parsers import expat
+
+from .instrumentation import clock
+
+
+_chunk_size = 16 * 1024
+
+
+Event = collections.namedtuple("Event", ["kind", "value"])
+
+
+class DataMessageFeed(object):
+    # Parses a data message from byte chunks pushed by the caller. Each
+    # call to feed() returns the events completed by that chunk.
+    def __init__(self, handler):
+        self._handler = handler
+        self._parser = expat.ParserCreate(namespace_separator=" ")
+        self._parser.ordered_attributes = True
+        self._parser.buffer_text = True
+        # Handlers are called by expat directly, so get names in expat's
+        # format, and attributes as a flat list of names and values
+        self._parser.StartElementHandler = handler.start
+        self._parser.EndElementHandler = handler.end
+        self._parser.CharacterDataHandler = handler.characters
+
+    def feed(self, chunk):
+        self._parser.Parse(chunk, False)
+        return self._handler.take_events()
+
+    def close(self):
+        self._parser.Parse(b"", True)
+        return self._handler.take_events()
+
+
+def expat_name(element_type):
+    namespace, local_name = element_type
+    if namespace is None:
+        return local_name
+    else:
+        return "{0} {1}".format(namespace, local_name)
+
+
+def local_name(name):
+    return name.rpartition(" ")[2]
+
+
+def attribute_pairs(attributes):
+    # Attribute names use the same format as ElementTree
+    return [
+        (_attribute_name(attributes[index]), attributes[index + 1])
+        for index in range(0, len(attributes), 2)
+    ]
+
+
+def _attribute_name(name):
+    if " " in name:
+        return "{%s}%s" % tuple(name.split(" "))
+    else:
+        return name
+
+
+def get_attribute(attributes, name):
+    for index in range(0, len(attributes), 2):
+        if attributes[index] == name:
+            return attributes[index + 1]
+    return None
+
+
+class FeedHandler(object):
+    def __init__(self):
+        self._events = []
+
+    def take_events(self):
+        events = self._events
+        self._events = []
+        return events
+
+    def characters(self, data):
+        pass
+
+    def _emit(self, kind, value):
+        self._events.append(Event(kind, value))
+
+
+class EventStream(object):
+    # Pulls events from a file by feeding it through a DataMessageFeed in
+    # chunks, so events can be read one at a time as they're needed
+    def __init__(self, fileobj, handler, stats=None):
+        self._fileobj = fileobj
+        self._feed = DataMessageFeed(handler)
+        self._events = collections.deque()
+        self._finished = False
+        self._stats = stats
+    
+    def next_event(self):
+        # Returns None once the file has been read
+        events = self._events
+        while not events:
+            if self._finished:
+                return None
+            start = clock()
+            chunk = self._fileobj.read(_chunk_size)
+            if chunk:
+                events.extend(self._feed.feed(chunk))
+            else:
+                self._finished = True
+                events.extend(self._feed.close())
+            if self._stats is not None:
+                self._stats.add_time("xml_parse", clock() - start)
+        return events.popleft()
@@ -1,7 +1,8 @@
 import functools
 import itertools
 
-from .dataset import data_message_reader, Observation
+from .dataset import data_message_reader, observation_factory, Observation
+from .feed import DataMessageFeed, EventStream, FeedHandler, attribute_pairs, expat_name, get_attribute
 from . import xmlcommon as xml
 
 
@@ -27,10 +28,14 @@ class GenericElementTypes(object):
     Value = _expand("Value")
     Time = _expand("Time")
     ObsValue = _expand("ObsValue")
+    Attributes = _expand("Attributes")
 
 
 
 class GenericDataMessageParser(object):
+    def event_parser(self):
+        return GenericEventParser()
+    
     def get_dataset_elements(self, message_element):
         if message_element.qualified_name() == xml.qualified_name(MessageElementTypes.MessageGroup):
             return message_element.findall(xml.path(GenericElementTypes.DataSet))
@@ -40,23 +45,24 @@ class GenericDataMessageParser(object):
     def key_family_for_dataset(self, dataset_element, dsd_reader):
         key_family_ref_element = dataset_element.find(xml.path(GenericElementTypes.KeyFamilyRef))
         ref = key_family_ref_element.inner_text().strip()
-        key_families = dict(
-            (key_family.id, key_family)
-            for key_family in dsd_reader.key_families()
-        )
-        return key_families[ref]
+        return _find_key_family(dsd_reader, ref)
     
-    def get_series_elements(self, dataset_element):
+    def get_series_elements(self, dataset_element, make_key, matches_key=None):
+        # Series that don't match are skipped before any of their
+        # observations are read
         for child in dataset_element.children():
             name = child.qualified_name()
             if name == xml.qualified_name(GenericElementTypes.Group):
                 group_key = self._group_key(child)
                 for series_element in child.findall(xml.path(GenericElementTypes.Series)):
-                    series_key = group_key + self._series_key(series_element)
-                    yield series_element, series_key
+                    series_key = make_key(group_key + self._series_key(series_element))
+                    if matches_key is None or matches_key(series_key):
+                        yield series_element, series_key
             
             elif name == xml.qualified_name(GenericElementTypes.Series):
-                yield child, self._series_key(child)
+                series_key = make_key(self._series_key(child))
+                if matches_key is None or matches_key(series_key):
+                    yield child, series_key
         
     def _group_key(self, group_element):
         key_element = group_element.find(xml.path(GenericElementTypes.GroupKey))
@@ -66,11 +72,15 @@ class GenericDataMessageParser(object):
         key_element = series_element.find(xml.path(GenericElementTypes.SeriesKey))
         return self._read_key_element(key_element)
         
-    def read_observations(self, key_family, series_element):
-        return series_element.map_nodes(
+    def read_observations(self, key_family, series_element, make_observation=Observation, matches_time=None):
+        observations = series_element.map_nodes(
             xml.path(GenericElementTypes.Obs),
-            self._read_obs_element,
+            lambda obs_element: self._read_obs_element(obs_element, make_observation, matches_time),
         )
+        if matches_time is None:
+            return observations
+        else:
+            return (observation for observation in observations if observation is not None)
         
     def _read_key_element(self, key_element):
         key_value_elements = key_element.findall(xml.path(GenericElementTypes.Value))
@@ -80,12 +90,231 @@ class GenericDataMessageParser(object):
             for element in key_value_elements
         ]
         
-    def _read_obs_element(self, obs_element):
-        time_element = obs_element.find(xml.path(GenericElementTypes.Time))
-        time = time_element.inner_text()
-        value_element = obs_element.find(xml.path(GenericElementTypes.ObsValue))
-        value = value_element.get("value")
-        return Observation(time, value)
+    def _read_obs_element(self, obs_element, make_observation, matches_time):
+        # The time, value and status are read in a single pass over the
+        # children, rather than finding each in turn
+        time = None
+        value = None
+        status = None
+        for child in obs_element.children():
+            name = child.qualified_name()
+            if name == _time_name:
+                time = child.inner_text()
+                if matches_time is not None and not matches_time(time):
+                    # The rest of the element is skipped
+                    return None
+            elif name == _obs_value_name:
+                value = child.get("value")
+            elif name == _attributes_name:
+                status = self._read_obs_status(child)
+        return make_observation(time, value, status)
+    
+    def _read_obs_status(self, attributes_element):
+        for element in attributes_element.findall(xml.path(GenericElementTypes.Value)):
+            if element.get("concept") == _status_concept:
+                return element.get("value")
+        return None
+
+
+_status_concept = "OBS_STATUS"
+
+_time_name = xml.qualified_name(GenericElementTypes.Time)
+_obs_value_name = xml.qualified_name(GenericElementTypes.ObsValue)
+_attributes_name = xml.qualified_name(GenericElementTypes.Attributes)
+
+
+def _find_key_family(dsd_reader, ref):
+    key_families = dict(
+        (key_family.id, key_family)
+        for key_family in dsd_reader.key_families()
+    )
+    return key_families[ref]
+
+
+def _expat_names(element_types):
+    class ExpatNames(object):
+        pass
+    for name, element_type in vars(element_types).items():
+        if isinstance(element_type, tuple):
+            setattr(ExpatNames, name, expat_name(element_type))
+    return ExpatNames
+
+
+_generic_names = _expat_names(GenericElementTypes)
+_message_names = _expat_names(MessageElementTypes)
+
+
+class GenericFeedHandler(FeedHandler):
+    # Elements are matched against precomputed expat names, most common
+    # first, since this is called for every element in the message
+    def __init__(self, make_observation=Observation):
+        FeedHandler.__init__(self)
+        self._make_observation = make_observation
+        self._text = None
+        self._group_key = []
+        self._key = None
+        self._series_key = None
+        self._in_attributes = False
+        self._time = None
+        self._value = None
+        self._status = None
+    
+    def start(self, name, attributes):
+        if name == _generic_names.Obs:
+            self._time = None
+            self._value = None
+            self._status = None
+        elif name == _generic_names.Time or name == _generic_names.KeyFamilyRef:
+            self._text = []
+        elif name == _generic_names.ObsValue:
+            self._value = get_attribute(attributes, "value")
+        elif name == _generic_names.Value:
+            self._read_value(attributes)
+        elif name == _generic_names.SeriesKey or name == _generic_names.GroupKey:
+            self._key = []
+        elif name == _generic_names.Attributes:
+            self._in_attributes = True
+        elif name == _generic_names.DataSet or name == _message_names.DataSet:
+            self._group_key = []
+            self._emit("dataset_start", dict(attribute_pairs(attributes)))
+    
+    def end(self, name):
+        if name == _generic_names.Obs:
+            self._emit("observation", self._make_observation(self._time, self._value, self._status))
+        elif name == _generic_names.Time:
+            self._time = "".join(self._text)
+            self._text = None
+        elif name == _generic_names.Value or name == _generic_names.ObsValue:
+            pass
+        elif name == _generic_names.SeriesKey:
+            self._series_key = self._group_key + self._key
+            self._key = None
+            self._emit("series_start", self._series_key)
+        elif name == _generic_names.GroupKey:
+            self._group_key = self._key
+            self._key = None
+        elif name == _generic_names.Attributes:
+            self._in_attributes = False
+        elif name == _generic_names.Series:
+            self._emit("series_end", self._series_key)
+        elif name == _generic_names.Group:
+            self._group_key = []
+        elif name == _generic_names.KeyFamilyRef:
+            self._emit("key_family_ref", "".join(self._text).strip())
+            self._text = None
+        elif name == _generic_names.DataSet or name == _message_names.DataSet:
+            self._emit("dataset_end", None)
+    
+    def characters(self, data):
+        if self._text is not None:
+            self._text.append(data)
+    
+    def _read_value(self, attributes):
+        if self._key is not None:
+            self._key.append((get_attribute(attributes, "concept"), get_attribute(attributes, "value")))
+        elif self._in_attributes and get_attribute(attributes, "concept") == _status_concept:
+            self._status = get_attribute(attributes, "value")
+
+
+def generic_data_message_feed(typed_values=False):
+    return DataMessageFeed(GenericFeedHandler(observation_factory(typed_values)))
+
+
+class GenericEventParser(object):
+    # Reads series keys and observations from a single stream of parser
+    # events, rather than walking the tree through node wrappers. Used by
+    # the "events" engine.
+    def open(self, fileobj, stats=None):
+        return EventStream(fileobj, GenericFeedHandler(_observation_fields), stats)
+    
+    def get_dataset_elements(self, stream):
+        while True:
+            event = stream.next_event()
+            if event is None:
+                return
+            elif event.kind == "dataset_start":
+                dataset = _EventDataset(stream, event.value)
+                yield dataset
+                dataset.skip()
+    
+    def key_family_for_dataset(self, dataset, dsd_reader):
+        return _find_key_family(dsd_reader, dataset.key_family_ref())
+    
+    def get_series_elements(self, dataset, make_key, matches_key=None):
+        while True:
+            event = dataset.next_event()
+            if event is None:
+                return
+            elif event.kind == "series_start":
+                series = _EventSeries(dataset)
+                series_key = make_key(event.value)
+                if matches_key is None or matches_key(series_key):
+                    yield series, series_key
+                series.skip()
+            elif event.kind == "observation":
+                # Events aren't buffered, so the observation has no key
+                raise ValueError("Observation before its series key, which requires the pulldom or iterparse engine")
+    
+    def read_observations(self, key_family, series, make_observation=Observation, matches_time=None):
+        for time, value, status in series.observation_fields():
+            if matches_time is None or matches_time(time):
+                yield make_observation(time, value, status)
+
+
+def _observation_fields(*fields):
+    return fields
+
+
+class _EventDataset(object):
+    def __init__(self, stream, attributes):
+        self._stream = stream
+        self._attributes = attributes
+        self._key_family_ref = None
+        self._finished = False
+    
+    def get(self, name):
+        return self._attributes.get(name)
+    
+    def key_family_ref(self):
+        while self._key_family_ref is None:
+            event = self.next_event()
+            if event is None or event.kind == "series_start":
+                raise ValueError("DataSet has no KeyFamilyRef before its first series")
+            elif event.kind == "key_family_ref":
+                self._key_family_ref = event.value
+        return self._key_family_ref
+    
+    def next_event(self):
+        # Returns None at the end of the dataset
+        if self._finished:
+            return None
+        event = self._stream.next_event()
+        if event is None or event.kind == "dataset_end":
+            self._finished = True
+            return None
+        return event
+    
+    def skip(self):
+        while self.next_event() is not None:
+            pass
+
+
+class _EventSeries(object):
+    def __init__(self, dataset):
+        self._dataset = dataset
+        self._finished = False
+    
+    def observation_fields(self):
+        while not self._finished:
+            event = self._dataset.next_event()
+            if event is None or event.kind == "series_end":
+                self._finished = True
+            elif event.kind == "observation":
+                yield event.value
+    
+    def skip(self):
+        for fields in self.observation_fields():
+            pass
 
 
 generic_data_message_reader = functools.partial(data_message_reader, GenericDataMessageParser())
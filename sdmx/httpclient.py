@@ -0,0 +1,228 @@
+import collections
+import os
+import tempfile
+import threading
+import time
+
+
+_spool_chunk_size = 64 * 1024
+
+
+class PooledRequests(object):
+    # Can be passed as the requests argument of data message readers
+    def __init__(self, session=None, timeout=(10, 60), retries=3, backoff=0.5,
+            retry_statuses=(500, 502, 503, 504), pool_size=10, conditional=True,
+            cache_size=64 * 1024 * 1024, sleep=time.sleep):
+        import requests
+
+        if session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+
+        self._session = session
+        self._timeout = timeout
+        self._retries = retries
+        self._backoff = backoff
+        self._retry_statuses = frozenset(retry_statuses)
+        self._retry_errors = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+        self._conditional = conditional
+        self._cache_size = cache_size
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        # Responses are kept in the order they were last used, so the least
+        # recently used are dropped first. Their bodies are on disk.
+        self._validated_responses = collections.OrderedDict()
+        self._cached_bytes = 0
+
+    def get(self, url, headers=None):
+        # Concurrent requests for the same URL wait for the first request
+        # to finish and then share its response
+        key = (url, tuple(sorted((headers or {}).items())))
+        with self._lock:
+            call = self._in_flight.get(key)
+            is_owner = call is None
+            if is_owner:
+                call = self._in_flight[key] = _Call()
+
+        if not is_owner:
+            return call.wait()
+
+        try:
+            response = self._get(url, headers)
+        except BaseException as error:
+            call.set_error(error)
+            raise
+        else:
+            call.set_response(response)
+            return response
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def _get(self, url, headers):
+        previous_response = None
+        if headers is None and self._conditional:
+            previous_response = self._take_validated_response(url)
+            if previous_response is not None:
+                headers = _conditional_headers(previous_response.headers)
+
+        response = self._get_with_retries(url, headers)
+
+        if response.status_code == 304 and previous_response is not None:
+            response = previous_response
+        if self._conditional and response.status_code == 200 and _conditional_headers(response.headers):
+            self._keep_validated_response(url, response)
+        return response
+
+    def _take_validated_response(self, url):
+        with self._lock:
+            response = self._validated_responses.pop(url, None)
+            if response is not None:
+                self._cached_bytes -= response.size
+            return response
+
+    def _keep_validated_response(self, url, response):
+        if response.size > self._cache_size:
+            return
+        with self._lock:
+            previous_response = self._validated_responses.pop(url, None)
+            if previous_response is not None:
+                self._cached_bytes -= previous_response.size
+            self._validated_responses[url] = response
+            self._cached_bytes += response.size
+            while self._cached_bytes > self._cache_size:
+                evicted_url, evicted_response = self._validated_responses.popitem(last=False)
+                self._cached_bytes -= evicted_response.size
+
+    def _get_with_retries(self, url, headers):
+        attempt = 0
+        while True:
+            try:
+                response = self._session.get(url, headers=headers, timeout=self._timeout, stream=True)
+                if response.status_code not in self._retry_statuses or attempt >= self._retries:
+                    return _read_response(response)
+                response.close()
+            except self._retry_errors:
+                if attempt >= self._retries:
+                    raise
+
+            self._sleep(self._backoff * (2 ** attempt))
+            attempt += 1
+
+
+def _read_response(response):
+    # Successful responses may be large, so their bodies are written to disk
+    # as they arrive, rather than being held in memory
+    try:
+        if response.status_code == 200:
+            body = _spool(response.iter_content(_spool_chunk_size))
+            return FileResponse(response.status_code, response.headers, body)
+        else:
+            return BufferedResponse(response.status_code, response.headers, response.content)
+    finally:
+        response.close()
+
+
+class FileResponse(object):
+    # Each call to iter_content reads the body from the start, so the
+    # response can be shared by concurrent requests and kept for
+    # conditional requests
+    def __init__(self, status_code, headers, body):
+        self.status_code = status_code
+        self.headers = headers
+        self.size = body.size
+        self._body = body
+
+    @property
+    def content(self):
+        return b"".join(self.iter_content(_spool_chunk_size))
+
+    def iter_content(self, chunk_size=1):
+        with open(self._body.path, "rb") as fileobj:
+            while True:
+                chunk = fileobj.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+    def raise_for_status(self):
+        pass
+
+
+def _spool(chunks):
+    descriptor, path = tempfile.mkstemp(prefix="sdmx-response-")
+    body = _SpooledBody(path)
+    with os.fdopen(descriptor, "wb") as fileobj:
+        for chunk in chunks:
+            fileobj.write(chunk)
+            body.size += len(chunk)
+    return body
+
+
+class _SpooledBody(object):
+    # The file is removed once no response refers to it
+    def __init__(self, path):
+        self.path = path
+        self.size = 0
+
+    def __del__(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class BufferedResponse(object):
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    def iter_content(self, chunk_size=1):
+        for index in range(0, len(self.content), chunk_size):
+            yield self.content[index:index + chunk_size]
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise IOError("HTTP status {0}".format(self.status_code))
+
+
+class _Call(object):
+    def __init__(self):
+        self._done = threading.Event()
+        self._response = None
+        self._error = None
+
+    def set_response(self, response):
+        self._response = response
+        self._done.set()
+
+    def set_error(self, error):
+        self._error = error
+        self._done.set()
+
+    def wait(self):
+        self._done.wait()
+        if self._error is not None:
+            raise self._error
+        return self._response
+
+
+def _conditional_headers(response_headers):
+    headers = {}
+    for response_header, request_header in [("ETag", "If-None-Match"), ("Last-Modified", "If-Modified-Since")]:
+        value = _get_header(response_headers, response_header)
+        if value:
+            headers[request_header] = value
+    return headers
+
+
+def _get_header(headers, name):
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
@@ -0,0 +1,235 @@
+import json
+import os
+from xml.parsers import expat
+
+from .compact import CompactFeedHandler
+from .generic import GenericFeedHandler
+from .keys import KeySchema
+from .xmlcommon import XmlFragment
+
+
+# An index records where each dataset and series starts and ends in a
+# data message, so a series can be read by parsing only its own bytes.
+# Offsets are into the uncompressed message, which must be seekable.
+
+version = 1
+
+_chunk_size = 64 * 1024
+
+_handlers = {
+    "generic": GenericFeedHandler,
+    "compact": lambda: CompactFeedHandler(time_concept="TIME_PERIOD", value_concept="OBS_VALUE"),
+}
+
+
+def build(fileobj, message_format):
+    if message_format not in _handlers:
+        raise ValueError("Unknown message format: {0!r}".format(message_format))
+    return _IndexBuilder(_handlers[message_format]()).read(fileobj)
+
+
+def dump(index, fileobj):
+    namespaces = []
+    namespace_ids = {}
+
+    def namespace_id(in_scope):
+        key = tuple(sorted(in_scope.items(), key=lambda item: (item[0] or "", item[1])))
+        if key not in namespace_ids:
+            namespace_ids[key] = len(namespaces)
+            # The default namespace has no prefix, which JSON can't store
+            namespaces.append(dict((prefix or "", uri) for prefix, uri in key))
+        return namespace_ids[key]
+
+    datasets = [
+        {
+            "start": dataset.start,
+            "header_end": dataset.header_end,
+            "namespaces": namespace_id(dataset.namespaces),
+            "series": [
+                [list(series.key), series.start, series.end, namespace_id(series.namespaces)]
+                for series in dataset.series
+            ],
+        }
+        for dataset in index.datasets
+    ]
+    content = json.dumps({
+        "version": version,
+        "size": index.size,
+        "encoding": index.encoding,
+        "namespaces": namespaces,
+        "datasets": datasets,
+    }, separators=(",", ":"))
+    fileobj.write(content.encode("utf-8"))
+
+
+def load(fileobj):
+    content = json.loads(fileobj.read().decode("utf-8"))
+    if content.get("version") != version:
+        raise ValueError("Unsupported series index version: {0!r}".format(content.get("version")))
+
+    namespaces = [
+        dict((prefix or None, uri) for prefix, uri in in_scope.items())
+        for in_scope in content["namespaces"]
+    ]
+    datasets = [
+        _load_dataset(dataset, namespaces)
+        for dataset in content["datasets"]
+    ]
+    return SeriesIndex(content["size"], content["encoding"], datasets)
+
+
+def _load_dataset(dataset, namespaces):
+    key_schema = KeySchema()
+    return IndexedDataset(
+        start=dataset["start"],
+        header_end=dataset["header_end"],
+        namespaces=namespaces[dataset["namespaces"]],
+        series=[
+            IndexedSeries(key_schema.key(key), start, end, namespaces[namespace_id])
+            for key, start, end, namespace_id in dataset["series"]
+        ],
+    )
+
+
+class SeriesIndex(object):
+    def __init__(self, size, encoding, datasets):
+        self.size = size
+        self.encoding = encoding
+        self.datasets = datasets
+
+    def check(self, fileobj):
+        fileobj.seek(0, os.SEEK_END)
+        size = fileobj.tell()
+        if size != self.size:
+            raise ValueError("Series index does not match the message: expected {0} bytes, but was {1}".format(self.size, size))
+
+    def read_dataset_header(self, fileobj, dataset):
+        # The header runs from the start of the dataset to its first series,
+        # so holds the dataset's attributes and any elements before its series
+        content = _read_range(fileobj, dataset.start, dataset.header_end)
+        return XmlFragment(content, {}, dataset.namespaces, self.encoding).parse_start()
+
+    def read_series(self, fileobj, series):
+        content = _read_range(fileobj, series.start, series.end)
+        return XmlFragment(content, {}, series.namespaces, self.encoding).parse()
+
+
+class IndexedDataset(object):
+    def __init__(self, start, header_end, namespaces, series):
+        self.start = start
+        self.header_end = header_end
+        self.namespaces = namespaces
+        self.series = series
+
+
+class IndexedSeries(object):
+    __slots__ = ["key", "start", "end", "namespaces"]
+
+    def __init__(self, key, start, end, namespaces):
+        self.key = key
+        self.start = start
+        self.end = end
+        self.namespaces = namespaces
+
+
+def _read_range(fileobj, start, end):
+    fileobj.seek(start)
+    content = fileobj.read(end - start)
+    if len(content) != end - start:
+        raise ValueError("Series index does not match the message: message is truncated")
+    return content
+
+
+class _IndexBuilder(object):
+    # The feed handler for the message format decides where datasets and
+    # series start and end, while the builder tracks byte offsets and
+    # namespaces. Each series ends where the next element event starts, so
+    # includes any whitespace that follows it.
+    def __init__(self, handler):
+        self._handler = handler
+        self._parser = expat.ParserCreate(namespace_separator=" ")
+        self._parser.ordered_attributes = True
+        self._parser.buffer_text = True
+        self._parser.XmlDeclHandler = self._xml_decl
+        self._parser.StartNamespaceDeclHandler = self._start_namespace
+        self._parser.StartElementHandler = self._start_element
+        self._parser.EndElementHandler = self._end_element
+        self._parser.CharacterDataHandler = handler.characters
+        self._encoding = "utf-8"
+        self._starts = []
+        self._namespaces = [{}]
+        self._pending_namespaces = {}
+        self._datasets = []
+        self._dataset = None
+        self._key_schema = None
+        self._series = None
+        self._unfinished_series = None
+
+    def read(self, fileobj):
+        size = 0
+        while True:
+            chunk = fileobj.read(_chunk_size)
+            if not chunk:
+                break
+            size += len(chunk)
+            self._parser.Parse(chunk, False)
+        self._parser.Parse(b"", True)
+        return SeriesIndex(size, self._encoding, self._datasets)
+
+    def _xml_decl(self, version, encoding, standalone):
+        if encoding:
+            self._encoding = encoding
+
+    def _start_namespace(self, prefix, uri):
+        self._pending_namespaces[prefix] = uri
+
+    def _start_element(self, name, attributes):
+        index = self._parser.CurrentByteIndex
+        self._finish_series(index)
+
+        in_scope = self._namespaces[-1]
+        if self._pending_namespaces:
+            in_scope = dict(in_scope)
+            in_scope.update(self._pending_namespaces)
+            self._pending_namespaces.clear()
+        self._namespaces.append(in_scope)
+        self._starts.append(index)
+
+        self._handler.start(name, attributes)
+        self._read_events(index)
+
+    def _end_element(self, name):
+        index = self._parser.CurrentByteIndex
+        self._finish_series(index)
+        self._handler.end(name)
+        self._starts.pop()
+        self._namespaces.pop()
+        self._read_events(index)
+
+    def _read_events(self, index):
+        for event in self._handler.take_events():
+            if event.kind == "dataset_start":
+                self._dataset = IndexedDataset(self._starts[-1], None, self._namespaces[-2], [])
+                self._datasets.append(self._dataset)
+                self._key_schema = KeySchema()
+            elif event.kind == "series_start":
+                # The series is the innermost open element, both for compact
+                # series, which start with their key, and generic series,
+                # whose key is read from a child element
+                if self._dataset.header_end is None:
+                    self._dataset.header_end = self._starts[-1]
+                self._series = IndexedSeries(self._key_schema.key(event.value), self._starts[-1], None, self._namespaces[-2])
+                self._dataset.series.append(self._series)
+            elif event.kind == "series_end":
+                self._unfinished_series = self._series
+                self._series = None
+            elif event.kind == "dataset_end":
+                self._finish_series(index)
+                if self._dataset.header_end is None:
+                    self._dataset.header_end = index
+                self._dataset = None
+
+    def _finish_series(self, index):
+        if self._unfinished_series is not None:
+            self._unfinished_series.end = index
+            self._unfinished_series = None
@@ -0,0 +1,127 @@
+import collections
+import contextlib
+import time
+
+
+if hasattr(time, "perf_counter"):
+    clock = time.perf_counter
+else:
+    clock = time.time
+
+
+class ReaderStats(object):
+    # Collects timings and counts from data message readers. Timings are
+    # in seconds, keyed by phase.
+    def __init__(self):
+        self.timings = collections.defaultdict(float)
+        self.counts = collections.defaultdict(int)
+
+    def add_time(self, phase, seconds):
+        self.timings[phase] += seconds
+
+    def increment(self, name, count=1):
+        self.counts[name] += count
+
+    @contextlib.contextmanager
+    def timer(self, phase):
+        start = clock()
+        try:
+            yield
+        finally:
+            self.add_time(phase, clock() - start)
+
+    def as_dict(self):
+        return {"timings": dict(self.timings), "counts": dict(self.counts)}
+
+
+class CountingReader(object):
+    def __init__(self, fileobj, stats, name="bytes_read"):
+        self._fileobj = fileobj
+        self._stats = stats
+        self._name = name
+
+    def read(self, *args):
+        data = self._fileobj.read(*args)
+        self._stats.increment(self._name, len(data))
+        return data
+    
+    def seek(self, *args):
+        return self._fileobj.seek(*args)
+    
+    def tell(self):
+        return self._fileobj.tell()
+
+
+class InstrumentedParser(object):
+    def __init__(self, parser, stats):
+        self._parser = parser
+        self._stats = stats
+
+    def get_dataset_elements(self, message_element):
+        return _counted(self._stats, "datasets", self._parser.get_dataset_elements(message_element))
+
+    def key_family_for_dataset(self, dataset_element, dsd_reader):
+        return self._parser.key_family_for_dataset(dataset_element, dsd_reader)
+
+    def get_series_elements(self, dataset_element, make_key, matches_key=None):
+        return self._timed(
+            "series_keys",
+            "series",
+            lambda: self._parser.get_series_elements(dataset_element, make_key, matches_key),
+        )
+
+    def read_observations(self, key_family, series_element, make_observation, matches_time=None):
+        return self._timed(
+            "observations",
+            "observations",
+            lambda: self._parser.read_observations(key_family, series_element, make_observation, matches_time),
+        )
+
+    def _timed(self, phase, count_name, read):
+        # Readers may do their work either when called, or as the result
+        # is iterated, so both are timed
+        stats = self._stats
+        start = clock()
+        iterable = read()
+        stats.add_time(phase, clock() - start)
+
+        for value in timed_iterator(stats, phase, iterable):
+            stats.increment(count_name)
+            yield value
+
+
+def timed_iterator(stats, phase, iterable):
+    iterator = iter(iterable)
+    while True:
+        start = clock()
+        try:
+            value = next(iterator)
+        except StopIteration:
+            stats.add_time(phase, clock() - start)
+            return
+        stats.add_time(phase, clock() - start)
+        yield value
+
+
+def _counted(stats, name, iterable):
+    for value in iterable:
+        stats.increment(name)
+        yield value
+
+
+class InstrumentedCodeDescriptions(object):
+    def __init__(self, code_descriptions, stats):
+        self._code_descriptions = code_descriptions
+        self._stats = stats
+
+    def describe(self, code_list_id, code_value, lang):
+        misses = self._code_descriptions.misses
+        start = clock()
+        descriptions = self._code_descriptions.describe(code_list_id, code_value, lang)
+        self._stats.add_time("descriptions", clock() - start)
+        self._stats.increment("description_lookups")
+        self._stats.increment("description_misses", self._code_descriptions.misses - misses)
+        return descriptions
+
+    def __getattr__(self, name):
+        return getattr(self._code_descriptions, name)
@@ -10,6 +10,8 @@ if sys.version_info[0] == 2:
     class LazyIteration(object):
         map = itertools.imap
 
+    string_types = (str, __builtin__.unicode)
+
 else:
     import builtins
     
@@ -20,3 +22,5 @@ else:
 
     class LazyIteration(object):
         map = builtins.map
+
+    string_types = (str, )
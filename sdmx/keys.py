@@ -0,0 +1,100 @@
+class KeySchema(object):
+    # Shared by the series keys of a dataset. Keys with the same concepts in
+    # the same order share a layout, and equal codes of dimensions share a
+    # single string. Codes of dimensions come first, in dimension order,
+    # followed by the values of any other concepts in the key. Those values,
+    # such as titles, may be different for every series, so aren't kept
+    # once the key has been freed.
+    def __init__(self, dimension_concept_refs=()):
+        self._dimension_concept_refs = tuple(dimension_concept_refs)
+        self._layouts = {}
+        self._codes = {}
+
+    def key(self, pairs):
+        pairs = list(pairs)
+        concepts = tuple([concept for concept, code in pairs])
+        layout = self._layouts.get(concepts)
+        if layout is None:
+            layout = self._layouts[concepts] = KeyLayout(self._dimension_concept_refs, concepts)
+
+        intern = self._codes.setdefault
+        dimension_count = layout.dimension_count
+        codes = [None] * layout.size
+        for position, (concept, code) in zip(layout.positions, pairs):
+            if position < dimension_count:
+                code = intern(code, code)
+            codes[position] = code
+        return SeriesKey(layout, tuple(codes))
+
+
+class KeyLayout(object):
+    def __init__(self, dimension_concept_refs, concepts):
+        dimension_positions = dict(
+            (concept_ref, position)
+            for position, concept_ref in enumerate(dimension_concept_refs)
+        )
+        # As with dict(key), the last value of a repeated dimension is used
+        last_indexes = dict(
+            (concept, index)
+            for index, concept in enumerate(concepts)
+            if concept in dimension_positions
+        )
+        positions = []
+        size = len(dimension_concept_refs)
+        for index, concept in enumerate(concepts):
+            if last_indexes.get(concept) == index:
+                positions.append(dimension_positions[concept])
+            else:
+                positions.append(size)
+                size += 1
+
+        self.dimension_count = len(dimension_concept_refs)
+        self.concepts = concepts
+        # The position in the codes of each concept, in the order of the
+        # concepts in the message
+        self.positions = tuple(positions)
+        self.size = size
+        self._signature = (tuple(dimension_concept_refs), concepts)
+        self._hash = hash(self._signature)
+
+    def __eq__(self, other):
+        return self is other or (isinstance(other, KeyLayout) and self._signature == other._signature)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return self._hash
+
+
+class SeriesKey(object):
+    __slots__ = ["layout", "codes"]
+
+    def __init__(self, layout, codes):
+        self.layout = layout
+        self.codes = codes
+
+    def __iter__(self):
+        # Yields (concept, code) pairs, as found in the message
+        codes = self.codes
+        for concept, position in zip(self.layout.concepts, self.layout.positions):
+            yield concept, codes[position]
+
+    def __len__(self):
+        return len(self.layout.concepts)
+
+    def dimension_codes(self):
+        # Dimensions missing from the key have a code of None
+        return self.codes[:self.layout.dimension_count]
+
+    def __eq__(self, other):
+        return isinstance(other, SeriesKey) and self.layout == other.layout and self.codes == other.codes
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.layout._hash, self.codes))
+
+    def __repr__(self):
+        return "SeriesKey({0!r})".format(list(self))
@@ -0,0 +1,276 @@
+import collections
+import multiprocessing
+import traceback
+try:
+    from queue import Empty
+except ImportError:
+    from Queue import Empty
+
+from . import dsd, snapshot
+from .dataset import DsdFetcher
+from .generic import generic_data_message_reader
+from .compact import compact_data_message_reader
+
+
+FileBatch = collections.namedtuple("FileBatch", ["path", "batch", "error"])
+
+
+_readers = {
+    "generic": generic_data_message_reader,
+    "compact": compact_data_message_reader,
+}
+
+# How long to wait for a message from the workers before checking whether
+# any of them have died
+_poll_interval = 1.0
+
+
+def read_many(paths, message_format, dsd_fileobj=None, dsd_cache=None,
+        processes=None, batch_size=10000, columnar=False, ordered=True,
+        lang=None, lazy="iterparse"):
+    if message_format not in _readers:
+        raise ValueError("Unknown message format: {0!r}".format(message_format))
+
+    paths = list(paths)
+    if dsd_fileobj is None:
+        dsd_snapshot = None
+    else:
+        # The DSD is parsed once, and workers receive a snapshot of it when
+        # they start, rather than with every file
+        dsd_snapshot = snapshot.dumps(dsd.reader(dsd_fileobj))
+
+    options = _ReadOptions(
+        message_format=message_format,
+        batch_size=batch_size,
+        columnar=columnar,
+        lang=lang,
+        lazy=lazy,
+    )
+    processes = processes or multiprocessing.cpu_count()
+    queue = multiprocessing.Queue(maxsize=4 * processes)
+    pool = _WorkerPool(processes, (queue, options, dsd_snapshot, dsd_cache))
+    try:
+        for result in _collect_results(pool, queue, paths, ordered=ordered, max_pending=2 * processes):
+            yield result
+    finally:
+        # Every file has been read, or the caller has stopped early, so
+        # the workers have nothing left to finish
+        pool.terminate()
+
+
+_ReadOptions = collections.namedtuple("_ReadOptions", ["message_format", "batch_size", "columnar", "lang", "lazy"])
+
+
+def _collect_results(pool, queue, paths, ordered, max_pending):
+    # Files are submitted as earlier files are returned, so at most
+    # max_pending files are being read or waiting to be returned. In ordered
+    # mode, this limits how many later files are held while an earlier file
+    # is still being read.
+    pending = {}
+    finished = set()
+    next_index = 0
+    next_submitted = 0
+
+    while True:
+        while next_submitted < len(paths) and len(pending) < max_pending and pool.has_idle_worker():
+            pool.submit(next_submitted, paths[next_submitted])
+            pending[next_submitted] = []
+            next_submitted += 1
+        if not pending:
+            return
+
+        try:
+            messages = [queue.get(timeout=_poll_interval)]
+        except Empty:
+            messages = _lost_file_messages(pool)
+
+        for kind, index, value in messages:
+            if kind == "done":
+                pool.finish(index)
+                finished.add(index)
+                result = None
+            elif kind == "error":
+                result = FileBatch(paths[index], None, value)
+            else:
+                result = FileBatch(paths[index], value, None)
+
+            if not ordered:
+                if result is not None:
+                    yield result
+                if index in finished:
+                    del pending[index]
+            else:
+                if result is not None:
+                    pending[index].append(result)
+
+                while next_index in pending and (pending[next_index] or next_index in finished):
+                    results = pending[next_index]
+                    while results:
+                        yield results.pop(0)
+                    if next_index in finished:
+                        del pending[next_index]
+                        next_index += 1
+                    else:
+                        break
+
+
+def _lost_file_messages(pool):
+    # A worker that dies, for instance by being killed, never reports that
+    # it's done, so its file is reported as an error instead
+    messages = []
+    for index, pid, exitcode in pool.lost_files():
+        error = "Worker process {0} exited with code {1} before the file was read".format(pid, exitcode)
+        messages.append(("error", index, error))
+        messages.append(("done", index, None))
+    return messages
+
+
+class _WorkerPool(object):
+    # Each worker is sent one file at a time, so the file given to a worker
+    # that dies is known, even if it died before starting to read it
+    def __init__(self, processes, worker_args):
+        self._worker_args = worker_args
+        self._workers = [self._start_worker() for index in range(processes)]
+
+    def has_idle_worker(self):
+        return any(worker.index is None for worker in self._workers)
+
+    def submit(self, index, path):
+        worker = next(worker for worker in self._workers if worker.index is None)
+        worker.index = index
+        worker.tasks.put((index, path))
+
+    def finish(self, index):
+        for worker in self._workers:
+            if worker.index == index:
+                worker.index = None
+
+    def lost_files(self):
+        # Returns the index of the file given to each worker that has died,
+        # along with its process ID and exit code, and replaces the worker
+        lost = []
+        for position, worker in enumerate(self._workers):
+            if not worker.process.is_alive():
+                if worker.index is not None:
+                    lost.append((worker.index, worker.process.pid, worker.process.exitcode))
+                self._workers[position] = self._start_worker()
+        return lost
+
+    def terminate(self):
+        for worker in self._workers:
+            worker.tasks.cancel_join_thread()
+            worker.process.terminate()
+        for worker in self._workers:
+            worker.process.join()
+
+    def _start_worker(self):
+        tasks = multiprocessing.Queue()
+        process = multiprocessing.Process(target=_run_worker, args=(tasks, ) + self._worker_args)
+        process.daemon = True
+        process.start()
+        return _WorkerProcess(process, tasks)
+
+
+class _WorkerProcess(object):
+    def __init__(self, process, tasks):
+        self.process = process
+        self.tasks = tasks
+        # The file the worker is reading, if any
+        self.index = None
+
+
+def _run_worker(tasks, queue, options, dsd_snapshot, dsd_cache):
+    try:
+        worker = _create_worker(queue, options, dsd_snapshot, dsd_cache)
+    except Exception:
+        # Every file the worker is given is reported as an error, rather
+        # than the worker exiting and being replaced by one that fails the
+        # same way
+        worker = _FailedWorker(queue, traceback.format_exc())
+
+    while True:
+        index, path = tasks.get()
+        worker.read_file(index, path)
+
+
+def _create_worker(queue, options, dsd_snapshot, dsd_cache):
+    if dsd_snapshot is None:
+        parsed_dsd = None
+    else:
+        parsed_dsd = snapshot.loads(dsd_snapshot)
+
+    return _Worker(queue, options, parsed_dsd, _MemoisedDsdCache(dsd_cache))
+
+
+class _FailedWorker(object):
+    def __init__(self, queue, error):
+        self._queue = queue
+        self._error = error
+
+    def read_file(self, index, path):
+        self._queue.put(("error", index, self._error))
+        self._queue.put(("done", index, None))
+
+
+class _Worker(object):
+    def __init__(self, queue, options, parsed_dsd, dsd_cache):
+        self._queue = queue
+        self._options = options
+        self._parsed_dsd = parsed_dsd
+        self._dsd_cache = dsd_cache
+
+    def read_file(self, index, path):
+        try:
+            with open(path, "rb") as fileobj:
+                message_reader = _readers[self._options.message_format](
+                    fileobj,
+                    lazy=self._options.lazy,
+                    parsed_dsd=self._parsed_dsd,
+                    dsd_cache=self._dsd_cache,
+                )
+                if self._options.columnar:
+                    batches = self._column_batches(message_reader)
+                else:
+                    batches = self._row_batches(message_reader)
+
+                for batch in batches:
+                    self._queue.put(("batch", index, batch))
+        except Exception:
+            self._queue.put(("error", index, traceback.format_exc()))
+
+        self._queue.put(("done", index, None))
+
+    def _row_batches(self, message_reader):
+        batch = []
+        for dataset in message_reader.datasets():
+            for series in dataset.series():
+                key = tuple(series.key())
+                for observation in series.observations(lang=self._options.lang):
+                    batch.append((key, observation.time, observation.value))
+                    if len(batch) >= self._options.batch_size:
+                        yield batch
+                        batch = []
+
+        if batch:
+            yield batch
+
+    def _column_batches(self, message_reader):
+        for dataset in message_reader.datasets():
+            for columns in dataset.column_batches(self._options.batch_size, lang=self._options.lang):
+                yield columns
+
+
+class _MemoisedDsdCache(object):
+    # Keeps DSDs fetched by a worker in memory for the lifetime of the
+    # worker, rather than for a single file
+    def __init__(self, dsd_cache):
+        self._dsd_cache = dsd_cache
+        self._dsds = {}
+
+    def fetch(self, url, requests, lazy=False, stats=None):
+        if url not in self._dsds:
+            if self._dsd_cache is None:
+                self._dsds[url] = DsdFetcher(requests, lazy=lazy, stats=stats).fetch(url)
+            else:
+                self._dsds[url] = self._dsd_cache.fetch(url, requests, lazy=lazy, stats=stats)
+        return self._dsds[url]
@@ -0,0 +1,89 @@
+import collections
+import datetime
+import re
+
+
+Period = collections.namedtuple("Period", ["start", "end"])
+
+
+def parse_period(text):
+    # Returns the period as a half-open range of dates
+    match = _period_pattern.match(text.strip())
+    if match is None:
+        raise ValueError("Unrecognised period: {0!r}".format(text))
+
+    year, frequency, number, month, day = match.groups()
+    year = int(year)
+    try:
+        if frequency is not None:
+            return _frequency_period(year, frequency, int(number))
+        elif day is not None:
+            start = datetime.date(year, int(month), int(day))
+            return Period(start, start + _one_day)
+        elif month is not None:
+            return _month_period(year, int(month), 1)
+        else:
+            return _month_period(year, 1, 12)
+    except ValueError:
+        raise ValueError("Unrecognised period: {0!r}".format(text))
+
+
+_period_pattern = re.compile(
+    r"^(\d{4})"
+    r"(?:-(?:([ASQMWD])(\d{1,3})|(\d{2})(?:-(\d{2})(?:T.*)?)?))?$"
+)
+
+_one_day = datetime.timedelta(days=1)
+
+
+def _frequency_period(year, frequency, number):
+    if frequency == "A" and number == 1:
+        return _month_period(year, 1, 12)
+    elif frequency == "S" and 1 <= number <= 2:
+        return _month_period(year, 6 * number - 5, 6)
+    elif frequency == "Q" and 1 <= number <= 4:
+        return _month_period(year, 3 * number - 2, 3)
+    elif frequency == "M":
+        return _month_period(year, number, 1)
+    elif frequency == "W" and 1 <= number <= 53:
+        # ISO 8601 weeks start on Monday, and the first week of the year
+        # contains the 4th of January
+        fourth_of_january = datetime.date(year, 1, 4)
+        start = fourth_of_january + datetime.timedelta(days=7 * (number - 1) - fourth_of_january.weekday())
+        return Period(start, start + datetime.timedelta(days=7))
+    elif frequency == "D" and 1 <= number <= 366:
+        start = datetime.date(year, 1, 1) + datetime.timedelta(days=number - 1)
+        if start.year != year:
+            raise ValueError()
+        return Period(start, start + _one_day)
+    else:
+        raise ValueError()
+
+
+def _month_period(year, month, months):
+    start = datetime.date(year, month, 1)
+    end_month = month - 1 + months
+    end = datetime.date(year + end_month // 12, end_month % 12 + 1, 1)
+    return Period(start, end)
+
+
+class PeriodFilter(object):
+    # Matches times whose periods overlap the range from the start of
+    # start_period to the end of end_period
+    def __init__(self, start_period=None, end_period=None):
+        self._start = None if start_period is None else parse_period(start_period).start
+        self._end = None if end_period is None else parse_period(end_period).end
+        self._matches = {}
+
+    def matches(self, time):
+        # Observations without a time can't be placed in the range
+        if time is None:
+            return False
+        matches = self._matches.get(time)
+        if matches is None:
+            period = parse_period(time)
+            matches = self._matches[time] = (
+                (self._start is None or period.end > self._start) and
+                (self._end is None or period.start < self._end)
+            )
+        return matches
@@ -0,0 +1,317 @@
+import array
+import mmap
+import struct
+import sys
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+
+from . import dsd
+
+
+# A snapshot is a header, a table of strings, and then a sequence of
+# unsigned 32-bit words that refer to strings by index:
+#
+#     magic, version, string count, string data length, word count
+#     string offsets (string count + 1 words)
+#     string data (UTF-8, padded to a multiple of four bytes)
+#     words: concepts, key families, code list directory, code lists
+#
+# Each code list is stored as arrays of code values, parent codes and
+# descriptions, and is only read when first requested.
+
+version = 2
+
+_magic = b"SDMXDSD\x00"
+_header = struct.Struct("<8sIIII")
+_word = struct.Struct("<I")
+_word_pair = struct.Struct("<II")
+_none = 0xFFFFFFFF
+
+
+def dumps(dsd_reader):
+    return _SnapshotWriter().write(dsd_reader)
+
+
+def dump(dsd_reader, fileobj):
+    fileobj.write(dumps(dsd_reader))
+
+
+def loads(content):
+    return _SnapshotReader(content).read()
+
+
+def load(path):
+    # The snapshot is mapped into memory, so code lists are read straight
+    # from the file, and processes loading the same snapshot share pages
+    with open(path, "rb") as fileobj:
+        content = mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+    return loads(content)
+
+
+class _SnapshotWriter(object):
+    def __init__(self):
+        self._strings = OrderedDict()
+        self._words = array.array("I")
+
+    def write(self, dsd_reader):
+        concepts = dsd_reader.concepts()
+        self._append(len(concepts))
+        for concept in concepts:
+            self._append_string(concept.id)
+            self._append_names(concept._names_by_lang)
+
+        key_families = dsd_reader.key_families()
+        self._append(len(key_families))
+        for key_family in key_families:
+            self._append_key_family(key_family)
+
+        code_lists = dsd_reader.code_lists()
+        self._append(len(code_lists))
+        directory_start = len(self._words)
+        for code_list in code_lists:
+            self._append(0, 0, 0)
+        for index, code_list in enumerate(code_lists):
+            start = len(self._words)
+            self._append_code_list(code_list)
+            entry = directory_start + index * 3
+            self._words[entry:entry + 3] = array.array("I", [self._string(code_list.id), start, len(self._words) - start])
+
+        return self._header() + self._string_table() + _to_bytes(self._words)
+
+    def _append_key_family(self, key_family):
+        self._append_string(key_family.id)
+        self._append_names(key_family._names)
+        dimensions = key_family.dimensions()
+        self._append(len(dimensions))
+        for dimension in dimensions:
+            self._append_dimension(dimension)
+        for dimension in [key_family.time_dimension(), key_family.primary_measure()]:
+            if dimension is None:
+                self._append(0)
+            else:
+                self._append(1)
+                self._append_dimension(dimension)
+
+    def _append_dimension(self, dimension):
+        self._append_string(dimension.concept_ref())
+        self._append_string(dimension.code_list_id())
+
+    def _append_code_list(self, code_list):
+        codes = code_list.codes()
+        langs = sorted(set(
+            lang
+            for code in codes
+            for lang in code._descriptions
+        ), key=lambda lang: (lang is not None, lang))
+
+        self._append_names(code_list._names_by_lang)
+        self._append(len(codes), len(langs))
+        self._extend_strings(langs)
+        self._extend_strings(code.value for code in codes)
+        self._extend_strings(code.parent_code_id() for code in codes)
+        for code in codes:
+            self._extend_strings(code._descriptions.get(lang) for lang in langs)
+
+    def _append_names(self, names):
+        self._append(len(names))
+        for lang, name in names.items():
+            self._append_string(lang)
+            self._append_string(name)
+
+    def _append(self, *words):
+        self._words.extend(words)
+
+    def _append_string(self, value):
+        self._words.append(self._string(value))
+
+    def _extend_strings(self, values):
+        self._words.extend(map(self._string, values))
+
+    def _string(self, value):
+        if value is None:
+            return _none
+        index = self._strings.get(value)
+        if index is None:
+            index = self._strings[value] = len(self._strings)
+        return index
+
+    def _header(self):
+        return _header.pack(_magic, version, len(self._strings), len(self._string_data()), len(self._words))
+
+    def _string_table(self):
+        return _to_bytes(self._string_offsets()) + self._string_data()
+
+    def _string_offsets(self):
+        offsets = array.array("I", [0])
+        for encoded in self._encoded_strings():
+            offsets.append(offsets[-1] + len(encoded))
+        return offsets
+
+    def _string_data(self):
+        data = b"".join(self._encoded_strings())
+        return data + b"\x00" * (-len(data) % 4)
+
+    def _encoded_strings(self):
+        return [value.encode("utf-8") for value in self._strings]
+
+
+class _SnapshotReader(object):
+    def __init__(self, content):
+        if len(content) < _header.size:
+            raise ValueError("Snapshot is truncated")
+        magic, snapshot_version, string_count, string_data_length, word_count = _header.unpack_from(content, 0)
+        if magic != _magic:
+            raise ValueError("Not a DSD snapshot")
+        if snapshot_version != version:
+            raise ValueError("Unsupported snapshot version: {0}".format(snapshot_version))
+
+        self._content = content
+        self._string_offsets_start = _header.size
+        self._string_data_start = self._string_offsets_start + 4 * (string_count + 1)
+        self._words_start = self._string_data_start + string_data_length
+        self._word_count = word_count
+        if self._words_start + 4 * word_count > len(content):
+            raise ValueError("Snapshot is truncated")
+        self._position = 0
+
+    def read(self):
+        concepts = [
+            dsd.Concept(self._next_string(), self._next_names())
+            for index in range(self._next_word())
+        ]
+        key_families = [
+            self._next_key_family()
+            for index in range(self._next_word())
+        ]
+        code_list_sources = OrderedDict()
+        for index in range(self._next_word()):
+            id = self._next_string()
+            start = self._next_word()
+            length = self._next_word()
+            if start + length > self._word_count:
+                raise ValueError("Snapshot is corrupt")
+            code_list_sources[id] = _SnapshotCodeList(self, id, start, length)
+
+        return dsd.LazyDsd(concepts, code_list_sources, key_families)
+
+    def read_code_list(self, id, start, length):
+        words = self._words(start, length)
+        position = [0]
+
+        def take(count):
+            values = words[position[0]:position[0] + count]
+            position[0] += count
+            return values
+
+        name_count, = take(1)
+        names = self._names(take(2 * name_count))
+        code_count, lang_count = take(2)
+        langs = self._strings(take(lang_count))
+        values = self._strings(take(code_count))
+        parents = self._strings(take(code_count))
+        descriptions = self._strings(take(code_count * lang_count))
+
+        codes = [
+            dsd.Code(
+                value=values[index],
+                parent_code_id=parents[index],
+                descriptions=dict(
+                    (lang, description)
+                    for lang, description in zip(langs, descriptions[index * lang_count:(index + 1) * lang_count])
+                    if description is not None
+                ),
+            )
+            for index in range(code_count)
+        ]
+        return dsd.CodeList(id, names, codes)
+
+    def _next_key_family(self):
+        id = self._next_string()
+        names = self._next_names()
+        dimensions = [
+            self._next_dimension()
+            for index in range(self._next_word())
+        ]
+        time_dimension, primary_measure = [
+            self._next_dimension() if self._next_word() else None
+            for index in range(2)
+        ]
+        return dsd.KeyFamily(
+            id,
+            names=names,
+            dimensions=dimensions,
+            time_dimension=time_dimension,
+            primary_measure=primary_measure,
+        )
+
+    def _next_dimension(self):
+        return dsd.KeyFamilyDimension(
+            concept_ref=self._next_string(),
+            code_list_id=self._next_string(),
+        )
+
+    def _next_names(self):
+        count = self._next_word()
+        return self._names([self._next_word() for index in range(2 * count)])
+
+    def _next_string(self):
+        return self._string(self._next_word())
+
+    def _next_word(self):
+        if self._position >= self._word_count:
+            raise ValueError("Snapshot is corrupt")
+        word, = _word.unpack_from(self._content, self._words_start + 4 * self._position)
+        self._position += 1
+        return word
+
+    def _words(self, start, length):
+        offset = self._words_start + 4 * start
+        words = array.array("I")
+        _from_bytes(words, self._content[offset:offset + 4 * length])
+        return words
+
+    def _names(self, words):
+        strings = self._strings(words)
+        return dict(zip(strings[::2], strings[1::2]))
+
+    def _strings(self, indices):
+        return [self._string(index) for index in indices]
+
+    def _string(self, index):
+        if index == _none:
+            return None
+        start, end = _word_pair.unpack_from(self._content, self._string_offsets_start + 4 * index)
+        return self._content[self._string_data_start + start:self._string_data_start + end].decode("utf-8")
+
+
+class _SnapshotCodeList(object):
+    def __init__(self, reader, id, start, length):
+        self._reader = reader
+        self._id = id
+        self._start = start
+        self._length = length
+
+    def read(self):
+        return self._reader.read_code_list(self._id, self._start, self._length)
+
+
+def _to_bytes(words):
+    if sys.byteorder == "big":
+        words = array.array("I", words)
+        words.byteswap()
+    if hasattr(words, "tobytes"):
+        return words.tobytes()
+    else:
+        return words.tostring()
+
+
+def _from_bytes(words, content):
+    if hasattr(words, "frombytes"):
+        words.frombytes(content)
+    else:
+        words.fromstring(content)
+    if sys.byteorder == "big":
+        words.byteswap()
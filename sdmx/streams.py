@@ -0,0 +1,22 @@
+class ChunkedReader(object):
+    # A read-only file-like object over an iterable of byte strings,
+    # so that a response body can be parsed without first copying it
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = b""
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            result = self._buffer + b"".join(self._chunks)
+            self._buffer = b""
+            return result
+
+        while len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+
+        result = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return result
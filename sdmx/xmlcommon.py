@@ -2,30 +2,53 @@ import re
 from xml.dom import pulldom
 import itertools
 import sys
+import tempfile
 
 if sys.version_info[:2] < (2, 7):
-    from lxml.etree import parse as parse_xml
+    from lxml.etree import parse as parse_xml, iterparse, fromstring, tostring, XMLParser, TreeBuilder
 else:
-    from xml.etree.cElementTree import parse as parse_xml
+    from xml.etree.cElementTree import parse as parse_xml, iterparse, fromstring, tostring, XMLParser, TreeBuilder
 
 
+from xml.sax.saxutils import quoteattr
+
 from .iteration import EagerIteration, LazyIteration
+from .instrumentation import timed_iterator
+
+__all__ = ["parse_xml", "parse_xml_lazy", "parse_xml_iterparse", "inner_text", "XmlNode", "XmlFragment"]
+
+
+# pulldom builds a node for every event in each buffer it reads, so a smaller
+# buffer keeps fewer nodes in memory at once
+_pulldom_buffer_size = 4096
 
-__all__ = ["parse_xml", "inner_text", "XmlNode"]
+# The number of elements that each node holds in memory after reading past
+# them, before writing any more to a temporary file
+default_lookahead_limit = 10000
 
 
-def parse_xml_lazy(fileobj):
-    stream = DomStream(pulldom.parse(fileobj))
+def parse_xml_lazy(fileobj, lookahead_limit=default_lookahead_limit, stats=None):
+    stream = DomStream(_timed_events(pulldom.parse(fileobj, bufsize=_pulldom_buffer_size), stats), lookahead_limit)
     event = None
     while event != pulldom.START_ELEMENT:
         event, node = next(stream)
     return StreamingXmlNode(stream, node)
 
 
+def _timed_events(events, stats):
+    # The document is parsed as its events are read, so time spent reading
+    # events is counted as parsing
+    if stats is None:
+        return events
+    else:
+        return timed_iterator(stats, "xml_parse", events)
+
+
 class DomStream(object):
-    def __init__(self, stream):
+    def __init__(self, stream, lookahead_limit=default_lookahead_limit):
         self._stream = stream
         self.depth = 0
+        self.lookahead_limit = lookahead_limit
     
     def __iter__(self):
         return self
@@ -39,6 +62,9 @@ class DomStream(object):
             self.depth += 1
         elif event == pulldom.END_ELEMENT:
             self.depth -= 1
+            # Elements and their attributes refer to each other, so would
+            # otherwise only be freed by the cyclic garbage collector
+            node.unlink()
         return event, node
 
 
@@ -46,6 +72,10 @@ class StreamingXmlNode(object):
     def __init__(self, stream, node):
         self._stream = stream
         self._node = node
+        # The depth of the node itself, rather than wherever the stream
+        # happens to be when a method is called
+        self._depth = stream.depth
+        self._lookahead = None
         
     def map_nodes(self, path, func):
         return LazyIteration.map(func, self.findall(path))
@@ -58,13 +88,28 @@ class StreamingXmlNode(object):
     
     def findall(self, path):
         part, = path
-        # TODO: what if we skipped elements that we actually care about e.g. observations before a key?
-        for child in self.children():
+        if self._lookahead is not None:
+            for child in self._lookahead.take(qualified_name(part)):
+                yield child
+        for child in self._stream_children():
             if child._name_tuple() == part:
                 yield child
+            else:
+                # Children that are read past, such as observations before
+                # a series key, are kept so that later calls can find them
+                if self._lookahead is None:
+                    self._lookahead = _Lookahead(self._stream.lookahead_limit)
+                self._lookahead.add(child._read_element())
     
     def children(self):
-        original_depth = self._stream.depth
+        if self._lookahead is not None:
+            for child in self._lookahead.take():
+                yield child
+        for child in self._stream_children():
+            yield child
+    
+    def _stream_children(self):
+        original_depth = self._depth
         while self._stream.depth >= original_depth:
             event, node = next(self._stream)
             if self._stream.depth == original_depth + 1 and event == pulldom.START_ELEMENT:
@@ -83,19 +128,274 @@ class StreamingXmlNode(object):
                 text.append(node.nodeValue)
         return "".join(text)
     
+    def local_name(self):
+        return self._node.localName
+    
     def qualified_name(self):
         return qualified_name(self._name_tuple())
     
+    def attributes(self):
+        return _dom_attributes(self._node)
+    
     def _name_tuple(self):
         return self._node.namespaceURI, self._node.localName
     
+    def _read_element(self):
+        # Reads the rest of the node into an ElementTree element
+        builder = TreeBuilder()
+        builder.start(_dom_name(self._node), dict(self.attributes()))
+        for event, node in self._stream_at_current_depth():
+            if event == pulldom.START_ELEMENT:
+                builder.start(_dom_name(node), dict(_dom_attributes(node)))
+            elif event == pulldom.END_ELEMENT:
+                builder.end(_dom_name(node))
+            elif event == pulldom.CHARACTERS:
+                builder.data(node.nodeValue)
+        return builder.close()
+    
     def _stream_at_current_depth(self):
-        original_depth = self._stream.depth
+        original_depth = self._depth
         while self._stream.depth >= original_depth:
             yield next(self._stream)
         
 
 
+_xmlns_namespace = "http://www.w3.org/2000/xmlns/"
+
+
+def _dom_name(node):
+    return _expanded_name(node.namespaceURI, node.localName)
+
+
+def _dom_attributes(node):
+    return [
+        (_expanded_name(namespace, local_name), value)
+        for (namespace, local_name), value in node.attributes.itemsNS()
+        if namespace != _xmlns_namespace
+    ]
+
+
+def _expanded_name(namespace, local_name):
+    # Use the same names for elements and attributes as ElementTree
+    if namespace is None:
+        return local_name
+    else:
+        return qualified_name((namespace, local_name))
+
+
+def parse_xml_iterparse(fileobj, lookahead_limit=default_lookahead_limit, stats=None):
+    stream = ElementStream(_timed_events(iterparse(fileobj, events=("start", "end")), stats), lookahead_limit)
+    event, element = next(stream)
+    return IterparseXmlNode(stream, element)
+
+
+class ElementStream(object):
+    def __init__(self, events, lookahead_limit=default_lookahead_limit):
+        self._events = events
+        self.depth = 0
+        self.lookahead_limit = lookahead_limit
+    
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.next()
+    
+    def next(self):
+        event, element = next(self._events)
+        if event == "start":
+            self.depth += 1
+        else:
+            self.depth -= 1
+        return event, element
+
+
+class IterparseXmlNode(object):
+    def __init__(self, stream, element):
+        self._stream = stream
+        self._element = element
+        self._depth = stream.depth
+        self._lookahead = None
+        
+    def map_nodes(self, path, func):
+        return LazyIteration.map(func, self.findall(path))
+    
+    def find(self, path):
+        try:
+            return next(self.findall(path))
+        except StopIteration:
+            return None
+    
+    def findall(self, path):
+        part, = path
+        tag = qualified_name(part)
+        if self._lookahead is not None:
+            for child in self._lookahead.take(tag):
+                yield child
+        for child in self._stream_children():
+            if child._element.tag == tag:
+                yield child
+            else:
+                if self._lookahead is None:
+                    self._lookahead = _Lookahead(self._stream.lookahead_limit)
+                self._lookahead.add(child._read_element())
+    
+    def children(self):
+        if self._lookahead is not None:
+            for child in self._lookahead.take():
+                yield child
+        for child in self._stream_children():
+            yield child
+    
+    def _stream_children(self):
+        original_depth = self._depth
+        while self._stream.depth >= original_depth:
+            event, element = next(self._stream)
+            if self._stream.depth == original_depth + 1 and event == "start":
+                # Earlier children have been read in full, so detach them
+                # from the tree. Otherwise, iterparse keeps every element
+                # of the document alive, including observations we've
+                # already yielded.
+                del self._element[:-1]
+                yield IterparseXmlNode(self._stream, element)
+    
+    def get(self, name):
+        return self._element.get(name)
+    
+    def inner_text(self):
+        for event in self._stream_at_current_depth():
+            pass
+        return inner_text(self._element)
+    
+    def local_name(self):
+        return _local_name(self._element.tag)
+    
+    def qualified_name(self):
+        return self._element.tag
+    
+    def attributes(self):
+        return self._element.items()
+    
+    def _read_element(self):
+        for event in self._stream_at_current_depth():
+            pass
+        return self._element
+    
+    def _stream_at_current_depth(self):
+        original_depth = self._depth
+        while self._stream.depth >= original_depth:
+            yield next(self._stream)
+
+
+class _Lookahead(object):
+    # Holds children that a lazy node has read past, in document order.
+    # Up to ``limit`` elements, counting descendants, are held in memory,
+    # and any further children are written to a temporary file. A limit of
+    # None holds every child in memory.
+    def __init__(self, limit=default_lookahead_limit):
+        self._limit = limit
+        self._held = 0
+        self._entries = []
+        self._file = None
+    
+    def add(self, element):
+        size = sum(1 for descendant in element.iter())
+        if self._limit is None or self._held + size <= self._limit:
+            self._held += size
+            self._entries.append((element.tag, element, None, size))
+        else:
+            if self._file is None:
+                self._file = tempfile.TemporaryFile()
+            self._file.seek(0, 2)
+            offset = self._file.tell()
+            # Text after the element belongs to its parent
+            element.tail = None
+            self._file.write(tostring(element))
+            self._entries.append((element.tag, None, offset, self._file.tell() - offset))
+    
+    def take(self, tag=None):
+        # Removes and yields the children with the given tag, or every child
+        # if tag is None. Children are removed one at a time so that none are
+        # lost if the caller stops early.
+        entries = self._entries
+        index = 0
+        while index < len(entries):
+            if tag is None or entries[index][0] == tag:
+                yield XmlNode(self._load(entries.pop(index)))
+            else:
+                index += 1
+        if not entries and self._file is not None:
+            self._file.close()
+            self._file = None
+    
+    def _load(self, entry):
+        entry_tag, element, offset, size = entry
+        if element is None:
+            self._file.seek(offset)
+            return fromstring(self._file.read(size))
+        else:
+            self._held -= size
+            return element
+
+
+class XmlFragment(object):
+    # The bytes of a single element from a larger document, along with the
+    # namespace declarations in scope for that element
+    def __init__(self, content, attributes, namespaces, encoding):
+        self._content = content
+        self._attributes = attributes
+        self._namespaces = namespaces
+        self._encoding = encoding
+    
+    def get(self, name):
+        return self._attributes.get(name)
+    
+    def parse(self):
+        wrapper = fromstring(self._prefix() + self._content + b"</fragment>")
+        return wrapper[0]
+    
+    def parse_start(self):
+        # Parses content that holds the start of an element, but not its end.
+        # Only the children that are complete are included.
+        target = _FirstElementTarget()
+        parser = XMLParser(target=target)
+        parser.feed(self._prefix() + self._content)
+        return target.element
+    
+    def _prefix(self):
+        declarations = "".join(
+            " {0}={1}".format("xmlns" if prefix is None else "xmlns:" + prefix, quoteattr(uri))
+            for prefix, uri in self._namespaces.items()
+        )
+        prefix = '<?xml version="1.0" encoding="{0}"?><fragment{1}>'.format(self._encoding, declarations)
+        return prefix.encode(self._encoding)
+
+
+class _FirstElementTarget(object):
+    # Builds the tree as the parser is fed, so elements can be used before
+    # the document is complete
+    def __init__(self):
+        self._builder = TreeBuilder()
+        self._depth = 0
+        self.element = None
+    
+    def start(self, tag, attributes):
+        element = self._builder.start(tag, attributes)
+        self._depth += 1
+        if self._depth == 2 and self.element is None:
+            self.element = element
+    
+    def end(self, tag):
+        self._depth -= 1
+        return self._builder.end(tag)
+    
+    def data(self, data):
+        self._builder.data(data)
+    
+    def close(self):
+        return self._builder.close()
+
+
 def path(*parts):
     return list(parts)
 
@@ -134,7 +434,7 @@ class XmlNode(object):
             yield XmlNode(child)
             
     def local_name(self):
-        return re.sub(r"\{[^}]*\}", "", self._node.tag)
+        return _local_name(self._node.tag)
     
     def qualified_name(self):
         return self._node.tag
@@ -143,6 +443,10 @@ class XmlNode(object):
         return self._node.items()
     
 
+def _local_name(tag):
+    return re.sub(r"\{[^}]*\}", "", tag)
+
+
 def _path_to_xpath(path):
     return "/".join(
         qualified_name(part)
@@ -0,0 +1,94 @@
+import io
+import os
+import shutil
+import tempfile
+
+from nose.tools import istest, assert_equal
+from nose.plugins.skip import SkipTest
+
+import sdmx
+from sdmx import arrow
+from sdmx.__main__ import main
+from . import testing
+
+
+@istest
+def message_is_written_to_parquet_with_dictionary_encoded_dimensions():
+    pyarrow = _import_pyarrow()
+    import pyarrow.parquet
+
+    with _temporary_directory() as directory:
+        path = os.path.join(directory, "message.parquet")
+        with testing.open("groups.dsd.xml", "rb") as dsd_file:
+            reader = sdmx.generic_data_message_reader(_message_file(), dsd_fileobj=dsd_file, lazy="events")
+            rows = arrow.write(reader, path, batch_size=1)
+
+        assert_equal(3, rows)
+        parquet_file = pyarrow.parquet.ParquetFile(path)
+        assert_equal(2, parquet_file.num_row_groups)
+        table = parquet_file.read()
+        assert_equal(pyarrow.dictionary(pyarrow.int32(), pyarrow.string()), table.schema.field("INDIC").type)
+        assert_equal(
+            {
+                "COUNTRY": ["OECD-E", "OECD-E", None],
+                "INDIC": ["TO-VP", "TO-VP", "OTHER"],
+                "time": ["1986", "1987", "1988"],
+                "value": [1.0, 2.0, 3.0],
+            },
+            table.to_pydict(),
+        )
+
+
+@istest
+def command_writes_message_to_arrow_stream():
+    pyarrow = _import_pyarrow()
+
+    with _temporary_directory() as directory:
+        message_path = os.path.join(directory, "message.xml")
+        output_path = os.path.join(directory, "message.arrow")
+        with open(message_path, "wb") as fileobj:
+            fileobj.write(_message_file().getvalue())
+
+        assert_equal(0, main(["parquet", message_path, output_path, "--dsd", testing.path("groups.dsd.xml")]))
+
+        table = pyarrow.ipc.open_stream(output_path).read_all()
+        assert_equal(["1986", "1987", "1988"], table.column("time").to_pylist())
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise SkipTest("pyarrow is not installed")
+    return pyarrow
+
+
+class _temporary_directory(object):
+    def __enter__(self):
+        self._path = tempfile.mkdtemp()
+        return self._path
+
+    def __exit__(self, *args):
+        shutil.rmtree(self._path)
+
+
+def _message_file():
+    return io.BytesIO(b"""<message:MessageGroup xmlns="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/generic" xmlns:message="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message">
+        <DataSet>
+            <KeyFamilyRef>MON2012TSE_O</KeyFamilyRef>
+            <Series>
+                <SeriesKey>
+                    <Value concept="COUNTRY" value="OECD-E" />
+                    <Value concept="INDIC" value="TO-VP" />
+                </SeriesKey>
+                <Obs><Time>1986</Time><ObsValue value="1"/></Obs>
+                <Obs><Time>1987</Time><ObsValue value="2"/></Obs>
+            </Series>
+            <Series>
+                <SeriesKey>
+                    <Value concept="INDIC" value="OTHER" />
+                </SeriesKey>
+                <Obs><Time>1988</Time><ObsValue value="3"/></Obs>
+            </Series>
+        </DataSet>
+    </message:MessageGroup>""")
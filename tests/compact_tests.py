@@ -1,88 +1,231 @@
 import io
+import math
 
-from nose.tools import istest, assert_equal
+from nose.tools import istest, nottest, assert_equal
 import funk
 
 import sdmx
+from . import testing
 
 
-@istest
-def dataset_key_family_is_retrieved_from_dsd():
-    dataset_file = io.BytesIO(
-    b"""<message:CompactData xmlns="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message" xmlns:common="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/common" xmlns:compact="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/compact" xmlns:oecd="http://oecd.stat.org/Data" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:schemaLocation="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message http://www.sdmx.org/docs/2_0/SDMXMessage.xsd http://oecd.stat.org/Data http://stats.oecd.org/RestSDMX/sdmx.ashx/GetSchema/MON2012TSE_O" xmlns:message="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message">
-    <oecd:DataSet keyFamilyURI="http://stats.oecd.org/RestSDMX/sdmx.ashx/GetKeyFamily/MON2012TSE_O/OECD/?resolveRef=true" xmlns:oecd="http://oecd.stat.org/Data">
-    </oecd:DataSet>
-</message:CompactData>""")
-    dataset_reader = _reader(dataset_file)
-    dataset, = dataset_reader.datasets()
+@nottest
+class CompactDataTests(object):
+    @istest
+    def dataset_key_family_is_retrieved_from_dsd(self):
+        dataset_file = io.BytesIO(
+        b"""<message:CompactData xmlns="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message" xmlns:common="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/common" xmlns:compact="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/compact" xmlns:oecd="http://oecd.stat.org/Data" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:schemaLocation="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message http://www.sdmx.org/docs/2_0/SDMXMessage.xsd http://oecd.stat.org/Data http://stats.oecd.org/RestSDMX/sdmx.ashx/GetSchema/MON2012TSE_O" xmlns:message="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message">
+        <oecd:DataSet keyFamilyURI="http://stats.oecd.org/RestSDMX/sdmx.ashx/GetKeyFamily/MON2012TSE_O/OECD/?resolveRef=true" xmlns:oecd="http://oecd.stat.org/Data">
+        </oecd:DataSet>
+    </message:CompactData>""")
+        dataset_reader = self._reader(dataset_file)
+        dataset = _only(dataset_reader.datasets())
+        
+        assert_equal("2012 A) OECD: Estimate of support to agriculture", dataset.key_family().name("en"))
+        assert_equal(["Country", "Indicator"], dataset.key_family().describe_dimensions("en"))
+
+
+    @istest
+    def key_family_from_passed_dsd_is_used_if_key_family_uri_is_missing(self):
+        dataset_file = io.BytesIO(
+        b"""<message:CompactData xmlns="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message" xmlns:common="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/common" xmlns:compact="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/compact" xmlns:oecd="http://oecd.stat.org/Data" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:schemaLocation="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message http://www.sdmx.org/docs/2_0/SDMXMessage.xsd http://oecd.stat.org/Data http://stats.oecd.org/RestSDMX/sdmx.ashx/GetSchema/MON2012TSE_O" xmlns:message="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message">
+        <oecd:DataSet>
+        </oecd:DataSet>
+    </message:CompactData>""")
+        dataset_reader = self._reader(dataset_file, dsd_fileobj=_dsd_fileobj())
+        dataset = _only(dataset_reader.datasets())
+        
+        assert_equal("2012 A) OECD: Estimate of support to agriculture", dataset.key_family().name("en"))
+
+
+    @istest
+    def series_key_is_read_using_dsd_concepts_and_code_lists(self):
+        dataset_file = io.BytesIO(
+        b"""<message:CompactData xmlns="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message" xmlns:common="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/common" xmlns:compact="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/compact" xmlns:oecd="http://oecd.stat.org/Data" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:schemaLocation="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message http://www.sdmx.org/docs/2_0/SDMXMessage.xsd http://oecd.stat.org/Data http://stats.oecd.org/RestSDMX/sdmx.ashx/GetSchema/MON2012TSE_O" xmlns:message="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message">
+        <oecd:DataSet keyFamilyURI="http://stats.oecd.org/RestSDMX/sdmx.ashx/GetKeyFamily/MON2012TSE_O/OECD/?resolveRef=true" xmlns:oecd="http://oecd.stat.org/Data">
+            <oecd:Series COUNTRY="OECD-E" INDIC="TO-VP" TIME_FORMAT="P1Y">
+            </oecd:Series>
+        </oecd:DataSet>
+    </message:CompactData>""")
+        dataset_reader = self._reader(dataset_file)
+        dataset = _only(dataset_reader.datasets())
+        series = _only(dataset.series())
+        
+        assert_equal(
+            [("Country", ["OECD(EUR million)"]), ("Indicator", ["Total value of production (at farm gate)"])],
+            list(series.describe_key(lang="en").items()),
+        )
+
+
+    @istest
+    def observations_have_time_and_value(self):
+        dataset_file = io.BytesIO(
+        b"""<message:CompactData xmlns="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message" xmlns:common="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/common" xmlns:compact="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/compact" xmlns:oecd="http://oecd.stat.org/Data" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:schemaLocation="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message http://www.sdmx.org/docs/2_0/SDMXMessage.xsd http://oecd.stat.org/Data http://stats.oecd.org/RestSDMX/sdmx.ashx/GetSchema/MON2012TSE_O" xmlns:message="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message">
+        <oecd:DataSet keyFamilyURI="http://stats.oecd.org/RestSDMX/sdmx.ashx/GetKeyFamily/MON2012TSE_O/OECD/?resolveRef=true" xmlns:oecd="http://oecd.stat.org/Data">
+            <oecd:Series COUNTRY="OECD-E" INDIC="TO-VP" TIME_FORMAT="P1Y">
+                <oecd:Obs TIME="1986" OBS_VALUE="538954.220075479" />
+                <oecd:Obs TIME="1987" OBS_VALUE="598184.668422966" />
+            </oecd:Series>
+        </oecd:DataSet>
+    </message:CompactData>""")
+        dataset_reader = self._reader(dataset_file)
+        dataset = _only(dataset_reader.datasets())
+        series = _only(dataset.series())
+        first_obs, second_obs = series.observations()
+        
+        assert_equal("1986", first_obs.time)
+        assert_equal("538954.220075479", first_obs.value)
+        
+        assert_equal("1987", second_obs.time)
+        assert_equal("598184.668422966", second_obs.value)
+
+
+    @istest
+    def observations_have_status_and_typed_values_if_requested(self):
+        dataset_file = io.BytesIO(
+        b"""<message:CompactData xmlns:message="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message">
+        <oecd:DataSet keyFamilyURI="http://stats.oecd.org/RestSDMX/sdmx.ashx/GetKeyFamily/MON2012TSE_O/OECD/?resolveRef=true" xmlns:oecd="http://oecd.stat.org/Data">
+            <oecd:Series COUNTRY="OECD-E" INDIC="TO-VP">
+                <oecd:Obs TIME="1986" OBS_VALUE="538954.25" OBS_STATUS="E" />
+                <oecd:Obs TIME="1987" />
+            </oecd:Series>
+        </oecd:DataSet>
+    </message:CompactData>""")
+        dataset_reader = self._reader(dataset_file, typed_values=True)
+        dataset = _only(dataset_reader.datasets())
+        series = _only(dataset.series())
+        first_obs, second_obs = series.observations()
+        
+        assert_equal(538954.25, first_obs.value)
+        assert_equal("E", first_obs.status)
+        assert math.isnan(second_obs.value)
+        assert_equal(None, second_obs.status)
+
+
+    @istest
+    def series_can_be_filtered_by_key(self):
+        dataset_file = io.BytesIO(
+        b"""<message:CompactData xmlns:message="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message">
+        <oecd:DataSet keyFamilyURI="http://stats.oecd.org/RestSDMX/sdmx.ashx/GetKeyFamily/MON2012TSE_O/OECD/?resolveRef=true" xmlns:oecd="http://oecd.stat.org/Data">
+            <oecd:Series COUNTRY="OECD-E" INDIC="TO-VP">
+                <oecd:Obs TIME="1986" OBS_VALUE="1" />
+            </oecd:Series>
+            <oecd:Series COUNTRY="OECD-E" INDIC="TO-VP1P">
+                <oecd:Obs TIME="1987" OBS_VALUE="2" />
+            </oecd:Series>
+        </oecd:DataSet>
+    </message:CompactData>""")
+        dataset_reader = self._reader(dataset_file)
+        dataset = _only(dataset_reader.datasets())
+        series = _only(dataset.series(key_filter={"INDIC": "TO-VP1P"}))
+        
+        assert_equal("2", _only(series.observations()).value)
+
+
+    @istest
+    def observations_can_be_filtered_by_time(self):
+        dataset_file = io.BytesIO(
+        b"""<message:CompactData xmlns:message="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message">
+        <oecd:DataSet keyFamilyURI="http://stats.oecd.org/RestSDMX/sdmx.ashx/GetKeyFamily/MON2012TSE_O/OECD/?resolveRef=true" xmlns:oecd="http://oecd.stat.org/Data">
+            <oecd:Series COUNTRY="OECD-E" INDIC="TO-VP">
+                <oecd:Obs TIME="1985" OBS_VALUE="1" />
+                <oecd:Obs TIME="1986" OBS_VALUE="2" />
+                <oecd:Obs TIME="1987" OBS_VALUE="3" />
+            </oecd:Series>
+        </oecd:DataSet>
+    </message:CompactData>""")
+        dataset_reader = self._reader(dataset_file)
+        dataset = _only(dataset_reader.datasets())
+        series = _only(dataset.series())
+        
+        assert_equal(["1986", "1987"], [observation.time for observation in series.observations(start_period="1986-07")])
+
+
+    @istest
+    def observations_can_be_read_in_batches(self):
+        dataset_file = io.BytesIO(
+        b"""<message:CompactData xmlns:message="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message">
+        <oecd:DataSet keyFamilyURI="http://stats.oecd.org/RestSDMX/sdmx.ashx/GetKeyFamily/MON2012TSE_O/OECD/?resolveRef=true" xmlns:oecd="http://oecd.stat.org/Data">
+            <oecd:Series COUNTRY="OECD-E" INDIC="TO-VP">
+                <oecd:Obs TIME="1985" OBS_VALUE="1" />
+                <oecd:Obs TIME="1986" OBS_VALUE="2" />
+                <oecd:Obs TIME="1987" OBS_VALUE="3" />
+            </oecd:Series>
+        </oecd:DataSet>
+    </message:CompactData>""")
+        dataset_reader = self._reader(dataset_file)
+        dataset = _only(dataset_reader.datasets())
+        series = _only(dataset.series())
+        
+        assert_equal(
+            [["1", "2"], ["3"]],
+            [[observation.value for observation in batch] for batch in series.observation_batches(2)],
+        )
+
+
+    @istest
+    def observations_are_read_for_each_series_in_turn(self):
+        dataset_file = io.BytesIO(
+        b"""<message:CompactData xmlns:message="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message">
+        <oecd:DataSet keyFamilyURI="http://stats.oecd.org/RestSDMX/sdmx.ashx/GetKeyFamily/MON2012TSE_O/OECD/?resolveRef=true" xmlns:oecd="http://oecd.stat.org/Data">
+            <oecd:Series COUNTRY="OECD-E" INDIC="TO-VP">
+                <oecd:Obs TIME="1986" OBS_VALUE="538954.220075479" />
+            </oecd:Series>
+            <oecd:Series COUNTRY="OECD-E" INDIC="TO-VP1P">
+                <oecd:Obs TIME="1986" OBS_VALUE="12.5" />
+                <oecd:Obs TIME="1987" OBS_VALUE="13.5" />
+            </oecd:Series>
+        </oecd:DataSet>
+    </message:CompactData>""")
+        dataset_reader = self._reader(dataset_file)
+        dataset = _only(dataset_reader.datasets())
+        
+        values = [
+            (series.describe_key(lang="en")["Indicator"][-1], [observation.value for observation in series.observations()])
+            for series in dataset.series()
+        ]
+        
+        assert_equal(
+            [
+                ("Total value of production (at farm gate)", ["538954.220075479"]),
+                ("of which: share of MPS commodities, percentage", ["12.5", "13.5"]),
+            ],
+            values,
+        )
+    
+    def _reader(self, dataset_file, **kwargs):
+        context = funk.Context()
+        requests = context.mock()
+        response = context.mock()
+        funk.allows(requests).get("http://stats.oecd.org/RestSDMX/sdmx.ashx/GetKeyFamily/MON2012TSE_O/OECD/?resolveRef=true").returns(response)
+        funk.allows(response).iter_content(16 * 1024).returns(_dsd_chunks())
+        
+        return self._message_reader(fileobj=dataset_file, requests=requests, **kwargs)
     
-    assert_equal("2012 A) OECD: Estimate of support to agriculture", dataset.key_family().name("en"))
-    assert_equal(["Country", "Indicator"], dataset.key_family().describe_dimensions("en"))
+    def _message_reader(self, **kwargs):
+        return sdmx.compact_data_message_reader(lazy=self.lazy, **kwargs)
 
 
 @istest
-def key_family_from_passed_dsd_is_used_if_key_family_uri_is_missing():
-    dataset_file = io.BytesIO(
-    b"""<message:CompactData xmlns="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message" xmlns:common="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/common" xmlns:compact="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/compact" xmlns:oecd="http://oecd.stat.org/Data" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:schemaLocation="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message http://www.sdmx.org/docs/2_0/SDMXMessage.xsd http://oecd.stat.org/Data http://stats.oecd.org/RestSDMX/sdmx.ashx/GetSchema/MON2012TSE_O" xmlns:message="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message">
-    <oecd:DataSet>
-    </oecd:DataSet>
-</message:CompactData>""")
-    dataset_reader = _reader(dataset_file, dsd_fileobj=_dsd_fileobj())
-    dataset, = dataset_reader.datasets()
-    
-    assert_equal("2012 A) OECD: Estimate of support to agriculture", dataset.key_family().name("en"))
+class EagerCompactTests(CompactDataTests):
+    lazy = False
 
 
 @istest
-def series_key_is_read_using_dsd_concepts_and_code_lists():
-    dataset_file = io.BytesIO(
-    b"""<message:CompactData xmlns="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message" xmlns:common="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/common" xmlns:compact="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/compact" xmlns:oecd="http://oecd.stat.org/Data" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:schemaLocation="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message http://www.sdmx.org/docs/2_0/SDMXMessage.xsd http://oecd.stat.org/Data http://stats.oecd.org/RestSDMX/sdmx.ashx/GetSchema/MON2012TSE_O" xmlns:message="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message">
-    <oecd:DataSet keyFamilyURI="http://stats.oecd.org/RestSDMX/sdmx.ashx/GetKeyFamily/MON2012TSE_O/OECD/?resolveRef=true" xmlns:oecd="http://oecd.stat.org/Data">
-        <oecd:Series COUNTRY="OECD-E" INDIC="TO-VP" TIME_FORMAT="P1Y">
-        </oecd:Series>
-    </oecd:DataSet>
-</message:CompactData>""")
-    dataset_reader = _reader(dataset_file)
-    dataset, = dataset_reader.datasets()
-    series, = dataset.series()
-    
-    assert_equal(
-        [("Country", ["OECD(EUR million)"]), ("Indicator", ["Total value of production (at farm gate)"])],
-        list(series.describe_key(lang="en").items()),
-    )
+class LazyCompactTests(CompactDataTests):
+    lazy = True
 
 
 @istest
-def observations_have_time_and_value():
-    dataset_file = io.BytesIO(
-    b"""<message:CompactData xmlns="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message" xmlns:common="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/common" xmlns:compact="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/compact" xmlns:oecd="http://oecd.stat.org/Data" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:schemaLocation="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message http://www.sdmx.org/docs/2_0/SDMXMessage.xsd http://oecd.stat.org/Data http://stats.oecd.org/RestSDMX/sdmx.ashx/GetSchema/MON2012TSE_O" xmlns:message="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message">
-    <oecd:DataSet keyFamilyURI="http://stats.oecd.org/RestSDMX/sdmx.ashx/GetKeyFamily/MON2012TSE_O/OECD/?resolveRef=true" xmlns:oecd="http://oecd.stat.org/Data">
-        <oecd:Series COUNTRY="OECD-E" INDIC="TO-VP" TIME_FORMAT="P1Y">
-            <oecd:Obs TIME="1986" OBS_VALUE="538954.220075479" />
-            <oecd:Obs TIME="1987" OBS_VALUE="598184.668422966" />
-        </oecd:Series>
-    </oecd:DataSet>
-</message:CompactData>""")
-    dataset_reader = _reader(dataset_file)
-    dataset, = dataset_reader.datasets()
-    series, = dataset.series()
-    first_obs, second_obs = series.observations()
-    
-    assert_equal("1986", first_obs.time)
-    assert_equal("538954.220075479", first_obs.value)
-    
-    assert_equal("1987", second_obs.time)
-    assert_equal("598184.668422966", second_obs.value)
+class LazyIterparseCompactTests(CompactDataTests):
+    lazy = "iterparse"
 
 
-def _reader(dataset_file, **kwargs):
-    context = funk.Context()
-    requests = context.mock()
-    response = context.mock()
-    funk.allows(requests).get("http://stats.oecd.org/RestSDMX/sdmx.ashx/GetKeyFamily/MON2012TSE_O/OECD/?resolveRef=true").returns(response)
-    funk.allows(response).iter_content(16 * 1024).returns(_dsd_chunks())
+@istest
+class IndexedCompactTests(CompactDataTests):
+    lazy = False
     
-    return sdmx.compact_data_message_reader(fileobj=dataset_file, requests=requests, **kwargs)
+    def _message_reader(self, fileobj, **kwargs):
+        return sdmx.compact_data_message_reader(fileobj=fileobj, index=testing.series_index(fileobj, "compact"), **kwargs)
 
 
 def _dsd_fileobj():
@@ -134,3 +277,11 @@ def _dsd_chunks():
             yield buf
         else:
             return
+
+
+def _only(iterable):
+    if hasattr(iterable, "next") or hasattr(iterable, "__next__"):
+        return next(iterable)
+    else:
+        value, = iterable
+        return value
@@ -0,0 +1,139 @@
+import bz2
+import gzip
+import io
+import zipfile
+
+from nose.tools import istest, assert_equal
+
+import sdmx
+from sdmx.streams import ChunkedReader
+from . import testing
+
+
+@istest
+def gzipped_message_is_decompressed_as_it_is_read():
+    for lazy in [False, True, "iterparse"]:
+        assert_equal([["1986"]], _read_times(_unseekable(_gzip(_message("1986"))), lazy=lazy))
+
+
+@istest
+def concatenated_gzip_streams_are_read_as_one_message():
+    message = _message("1986")
+    middle = len(message) // 2
+    
+    assert_equal([["1986"]], _read_times(_unseekable(_gzip(message[:middle]) + _gzip(message[middle:]))))
+
+
+@istest
+def bzipped_dsd_is_decompressed():
+    with testing.open("groups.dsd.xml", "rb") as dsd_file:
+        dsd_reader = sdmx.dsd_reader(io.BytesIO(bz2.compress(dsd_file.read())))
+    
+    key_family, = dsd_reader.key_families()
+    assert_equal("MON2012TSE_O", key_family.id)
+
+
+@istest
+def datasets_are_read_from_each_member_of_zip_archive():
+    archive = _zip([("a.xml", _message("1986")), ("b.xml", _message("1987"))])
+    
+    assert_equal([["1986"], ["1987"]], _read_times(io.BytesIO(archive)))
+    assert_equal([["1986"], ["1987"]], _read_times(_unseekable(archive), lazy="iterparse"))
+
+
+@istest
+def members_of_zip_archive_can_be_streamed_when_sizes_follow_data():
+    output = _UnseekableWriter()
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("a.xml", _message("1986"))
+        archive.writestr("b.xml", _message("1987"))
+    
+    assert_equal([["1986"], ["1987"]], _read_times(_unseekable(output.getvalue()), lazy=True))
+
+
+@istest
+def message_and_dsd_can_be_read_from_files_opened_in_text_mode():
+    for lazy in [False, True, "iterparse"]:
+        with testing.open("groups.sdmx.xml", "r") as dataset_file:
+            with testing.open("groups.dsd.xml", "r") as dsd_file:
+                dataset_reader = sdmx.generic_data_message_reader(dataset_file, dsd_fileobj=dsd_file, lazy=lazy)
+                keys = [dict(series.key()) for dataset in dataset_reader.datasets() for series in dataset.series()]
+                assert_equal([{"COUNTRY": "OECD-E", "INDIC": "TO-VP1P"}], keys)
+    
+    for lazy in [False, True]:
+        with testing.open("groups.dsd.xml", "r") as dsd_file:
+            key_family, = sdmx.dsd_reader(dsd_file, lazy=lazy).key_families()
+        assert_equal("MON2012TSE_O", key_family.id)
+
+
+@istest
+def unseekable_text_is_read_unchanged():
+    text = _message("1986").decode("ascii")
+    
+    assert_equal([["1986"]], _read_times(_UnseekableTextReader(text), lazy=True))
+
+
+def _read_times(fileobj, lazy=False):
+    with testing.open("groups.dsd.xml", "rb") as dsd_file:
+        dataset_reader = sdmx.generic_data_message_reader(fileobj, dsd_fileobj=dsd_file, lazy=lazy)
+        return [
+            [observation.time for series in dataset.series() for observation in series.observations()]
+            for dataset in dataset_reader.datasets()
+        ]
+
+
+class _UnseekableTextReader(object):
+    def __init__(self, text):
+        self._fileobj = io.StringIO(text)
+    
+    def read(self, size=-1):
+        # Reads are short, so peeking needs several of them
+        return self._fileobj.read(min(size, 2) if size >= 0 else size)
+
+
+def _unseekable(content):
+    return ChunkedReader([content[index:index + 100] for index in range(0, len(content), 100)])
+
+
+def _gzip(content):
+    output = io.BytesIO()
+    with gzip.GzipFile(fileobj=output, mode="wb") as gzip_file:
+        gzip_file.write(content)
+    return output.getvalue()
+
+
+def _zip(members):
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, content in members:
+            archive.writestr(name, content)
+    return output.getvalue()
+
+
+class _UnseekableWriter(object):
+    def __init__(self):
+        self._output = io.BytesIO()
+    
+    def write(self, data):
+        return self._output.write(data)
+    
+    def flush(self):
+        pass
+    
+    def getvalue(self):
+        return self._output.getvalue()
+
+
+def _message(time):
+    return """<message:MessageGroup xmlns="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/generic" xmlns:message="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message">
+    <DataSet>
+        <KeyFamilyRef>MON2012TSE_O</KeyFamilyRef>
+        <Series>
+            <SeriesKey>
+                <Value concept="COUNTRY" value="OECD-E" />
+                <Value concept="INDIC" value="TO-VP" />
+            </SeriesKey>
+            <Obs><Time>{0}</Time><ObsValue value="1"/></Obs>
+        </Series>
+    </DataSet>
+</message:MessageGroup>""".format(time).encode("utf-8")
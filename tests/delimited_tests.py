@@ -0,0 +1,74 @@
+import io
+
+from nose.tools import istest, assert_equal
+
+import sdmx
+from sdmx import delimited
+from . import testing
+
+
+@istest
+def dataset_is_written_as_one_row_per_observation():
+    with testing.open("groups.dsd.xml", "rb") as dsd_file:
+        reader = sdmx.generic_data_message_reader(_message_file(), dsd_fileobj=dsd_file, lazy="events")
+        dataset = next(iter(reader.datasets()))
+        output = io.BytesIO()
+        rows = dataset.write_csv(output, label_langs=["en"])
+
+    assert_equal(3, rows)
+    assert_equal(
+        b"INDIC,COUNTRY,time,value,INDIC_en,COUNTRY_en\r\n"
+        b"TO-VP,OECD-E,1986,1,Total value of production (at farm gate),OECD(EUR million)\r\n"
+        b"TO-VP,OECD-E,1987,2,Total value of production (at farm gate),OECD(EUR million)\r\n"
+        b"OTHER,,1988,\"3,5\",,\r\n",
+        output.getvalue(),
+    )
+
+
+@istest
+def message_can_be_written_with_other_delimiter():
+    with testing.open("groups.dsd.xml", "rb") as dsd_file:
+        reader = sdmx.generic_data_message_reader(_message_file(), dsd_fileobj=dsd_file)
+        output = io.BytesIO()
+        rows = delimited.write(reader, output, delimiter="\t")
+
+    assert_equal(3, rows)
+    assert_equal(
+        b"INDIC\tCOUNTRY\ttime\tvalue\r\n"
+        b"TO-VP\tOECD-E\t1986\t1\r\n"
+        b"TO-VP\tOECD-E\t1987\t2\r\n"
+        b"OTHER\t\t1988\t3,5\r\n",
+        output.getvalue(),
+    )
+
+
+@istest
+def fields_containing_quotes_are_quoted():
+    output = io.BytesIO()
+    writer = delimited.DelimitedWriter(output)
+    writer.write_row(['say "hello"', "two\nlines", "plain"])
+    writer.flush()
+
+    assert_equal(b'"say ""hello""","two\nlines",plain\r\n', output.getvalue())
+
+
+def _message_file():
+    return io.BytesIO(b"""<message:MessageGroup xmlns="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/generic" xmlns:message="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message">
+        <DataSet>
+            <KeyFamilyRef>MON2012TSE_O</KeyFamilyRef>
+            <Series>
+                <SeriesKey>
+                    <Value concept="COUNTRY" value="OECD-E" />
+                    <Value concept="INDIC" value="TO-VP" />
+                </SeriesKey>
+                <Obs><Time>1986</Time><ObsValue value="1"/></Obs>
+                <Obs><Time>1987</Time><ObsValue value="2"/></Obs>
+            </Series>
+            <Series>
+                <SeriesKey>
+                    <Value concept="INDIC" value="OTHER" />
+                </SeriesKey>
+                <Obs><Time>1988</Time><ObsValue value="3,5"/></Obs>
+            </Series>
+        </DataSet>
+    </message:MessageGroup>""")
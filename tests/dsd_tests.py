@@ -1,3 +1,5 @@
+# -*- coding: utf-8 -*-
+
 import io
 
 from nose.tools import istest, assert_equal
@@ -284,3 +286,135 @@ def primary_measure_can_be_read_from_key_family():
     dimension = key_family.primary_measure()
     
     assert_equal("OBS_VALUE", dimension.concept_ref())
+
+
+@istest
+def code_descriptions_include_descriptions_of_ancestors():
+    dsd_reader = sdmx.dsd_reader(fileobj=_hierarchical_code_list_fileobj())
+    code_descriptions = dsd_reader.code_descriptions()
+    
+    assert_equal(("World", "Europe", "United Kingdom"), code_descriptions.describe("CL_AREA", "UK", "en"))
+
+
+@istest
+def code_descriptions_are_memoised():
+    dsd_reader = sdmx.dsd_reader(fileobj=_hierarchical_code_list_fileobj())
+    code_descriptions = dsd_reader.code_descriptions()
+    code_descriptions.describe("CL_AREA", "UK", "en")
+    code_descriptions.describe("CL_AREA", "UK", "en")
+    code_descriptions.describe("CL_AREA", "EU", "en")
+    
+    assert_equal({"hits": 2, "misses": 3, "size": 3}, code_descriptions.stats())
+
+
+@istest
+def code_descriptions_can_be_built_eagerly():
+    dsd_reader = sdmx.dsd_reader(fileobj=_hierarchical_code_list_fileobj())
+    code_descriptions = dsd_reader.code_descriptions()
+    code_descriptions.build(lang="en")
+    code_descriptions.describe("CL_AREA", "UK", "en")
+    
+    assert_equal({"hits": 3, "misses": 3, "size": 3}, code_descriptions.stats())
+
+
+def _hierarchical_code_list_fileobj():
+    return io.BytesIO(b"""<?xml version="1.0" encoding="UTF-8"?>
+<Structure xmlns="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message" xmlns:structure="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/structure">
+    <CodeLists>
+        <structure:CodeList id="CL_AREA" agencyID="OECD">
+            <structure:Code value="W">
+                <structure:Description xml:lang="en">World</structure:Description>
+            </structure:Code>
+            <structure:Code value="EU" parentCode="W">
+                <structure:Description xml:lang="en">Europe</structure:Description>
+            </structure:Code>
+            <structure:Code value="UK" parentCode="EU">
+                <structure:Description xml:lang="en">United Kingdom</structure:Description>
+            </structure:Code>
+        </structure:CodeList>
+    </CodeLists>
+</Structure>""")
+
+
+@istest
+def code_lists_can_be_read_lazily():
+    dsd_reader = sdmx.dsd_reader(fileobj=_hierarchical_code_list_fileobj(), lazy=True)
+    code_list, = dsd_reader.code_lists()
+    
+    assert_equal("CL_AREA", code_list.id)
+    assert_equal(["W", "EU", "UK"], [code.value for code in code_list.codes()])
+    assert_equal("Europe", code_list.code("EU").description("en"))
+    assert code_list is dsd_reader.code_list("CL_AREA")
+    assert_equal(None, dsd_reader.code_list("CL_COUNTRY"))
+    assert_equal(("World", "Europe", "United Kingdom"), dsd_reader.code_descriptions().describe("CL_AREA", "UK", "en"))
+
+
+@istest
+def concepts_and_key_families_can_be_read_lazily():
+    dsd_file = io.BytesIO(b"""<?xml version="1.0" encoding="UTF-8"?>
+<Structure xmlns="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message" xmlns:structure="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/structure">
+    <Concepts>
+        <structure:ConceptScheme>
+            <structure:Concept id="COUNTRY" agencyID="OECD">
+                <structure:Name xml:lang="en">Country</structure:Name>
+            </structure:Concept>
+        </structure:ConceptScheme>
+    </Concepts>
+    <KeyFamilies>
+        <structure:KeyFamily id="MON20123_2" agencyID="OECD">
+            <structure:Name xml:lang="en">2012 F) OECD countries : Consumer Support Estimate by country</structure:Name>
+            <structure:Components>
+                <structure:Dimension conceptRef="COUNTRY" codelist="CL_MON20123_2_COUNTRY"/>
+                <structure:TimeDimension conceptRef="TIME" />
+            </structure:Components>
+        </structure:KeyFamily>
+    </KeyFamilies>
+</Structure>""")
+    
+    dsd_reader = sdmx.dsd_reader(fileobj=dsd_file, lazy=True)
+    key_family, = dsd_reader.key_families()
+    dimension, = key_family.dimensions()
+    
+    assert_equal("Country", dsd_reader.concept("COUNTRY").name("en"))
+    assert_equal("MON20123_2", key_family.id)
+    assert_equal("CL_MON20123_2_COUNTRY", dimension.code_list_id())
+    assert_equal("TIME", key_family.time_dimension().concept_ref())
+
+
+@istest
+def dsd_is_read_lazily_when_elements_are_split_across_reads():
+    content = _hierarchical_code_list_fileobj().read()
+    
+    for size in [1, 7, 64]:
+        dsd_reader = sdmx.dsd_reader(fileobj=_ShortReader(content, size), lazy=True)
+        code_list, = dsd_reader.code_lists()
+        
+        assert_equal(["W", "EU", "UK"], [code.value for code in code_list.codes()])
+        assert_equal("United Kingdom", code_list.code("UK").description("en"))
+
+
+class _ShortReader(object):
+    def __init__(self, content, size):
+        self._fileobj = io.BytesIO(content)
+        self._size = size
+    
+    def read(self, size=-1):
+        return self._fileobj.read(self._size)
+
+
+@istest
+def empty_code_lists_and_other_encodings_can_be_read_lazily():
+    dsd_file = io.BytesIO(u"""<?xml version="1.0" encoding="ISO-8859-1"?>
+<Structure xmlns="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message" xmlns:structure="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/structure">
+    <CodeLists>
+        <structure:CodeList id="CL_EMPTY" />
+        <structure:CodeList id="CL_AREA">
+            <structure:Code value="FR"><structure:Description xml:lang="fr">République française</structure:Description></structure:Code>
+        </structure:CodeList>
+    </CodeLists>
+</Structure>""".encode("iso-8859-1"))
+    
+    dsd_reader = sdmx.dsd_reader(fileobj=dsd_file, lazy=True)
+    
+    assert_equal([], dsd_reader.code_list("CL_EMPTY").codes())
+    assert_equal(u"République française", dsd_reader.code_list("CL_AREA").code("FR").description("fr"))
@@ -0,0 +1,176 @@
+import io
+import os
+import shutil
+import tempfile
+
+from nose.tools import istest, assert_equal
+
+import sdmx
+from sdmx import dsd
+from sdmx.dsdcache import _cache_key
+
+
+_url = "http://stats.oecd.org/RestSDMX/sdmx.ashx/GetKeyFamily/MON2012TSE_O/OECD/?resolveRef=true"
+_other_url = "http://stats.oecd.org/RestSDMX/sdmx.ashx/GetKeyFamily/OTHER/OECD/?resolveRef=true"
+
+
+@istest
+def dsd_is_only_fetched_once_by_readers_sharing_cache_directory():
+    with _temporary_directory() as directory:
+        requests = FakeRequests()
+
+        for index in range(2):
+            dataset_reader = sdmx.generic_data_message_reader(
+                _dataset_file(),
+                requests=requests,
+                dsd_cache=sdmx.DsdCache(directory),
+            )
+            dataset, = dataset_reader.datasets()
+            assert_equal("2012 A) OECD: Estimate of support to agriculture", dataset.key_family().name("en"))
+
+        assert_equal([(_url, None)], requests.calls)
+
+
+@istest
+def expired_dsd_is_revalidated_using_etag():
+    with _temporary_directory() as directory:
+        requests = FakeRequests(etag='"v1"')
+        cache = sdmx.DsdCache(directory, ttl=0)
+        cache.fetch(_url, requests)
+
+        requests.not_modified = True
+        dsd_reader = sdmx.DsdCache(directory, ttl=0).fetch(_url, requests)
+
+        assert_equal([(_url, None), (_url, {"If-None-Match": '"v1"'})], requests.calls)
+        key_family, = dsd_reader.key_families()
+        assert_equal("MON2012TSE_O", key_family.id)
+
+
+@istest
+def expired_dsd_is_replaced_if_modified():
+    with _temporary_directory() as directory:
+        requests = FakeRequests(etag='"v1"')
+        sdmx.DsdCache(directory, ttl=0).fetch(_url, requests)
+
+        requests.body = _dsd_bytes().replace(b"MON2012TSE_O", b"MON2013TSE_O")
+        dsd_reader = sdmx.DsdCache(directory, ttl=0).fetch(_url, requests)
+
+        key_family, = dsd_reader.key_families()
+        assert_equal("MON2013TSE_O", key_family.id)
+
+
+@istest
+def least_recently_used_dsds_are_evicted_when_cache_is_full():
+    with _temporary_directory() as directory:
+        requests = FakeRequests()
+        cache = sdmx.DsdCache(directory, max_size=1)
+        cache.fetch(_url, requests)
+        cache.fetch(_other_url, requests)
+
+        assert_equal(3, len([name for name in os.listdir(directory) if not name.endswith(".lock")]))
+        sdmx.DsdCache(directory).fetch(_url, requests)
+        assert_equal([(_url, None), (_other_url, None), (_url, None)], requests.calls)
+
+
+@istest
+def lock_files_of_evicted_dsds_are_removed():
+    with _temporary_directory() as directory:
+        requests = FakeRequests()
+        cache = sdmx.DsdCache(directory, max_size=1)
+        cache.fetch(_url, requests)
+        cache.fetch(_other_url, requests)
+
+        lock_names = [name for name in os.listdir(directory) if name.endswith(".lock")]
+        assert_equal(set(["evict.lock", _cache_key(_other_url) + ".lock"]), set(lock_names))
+
+
+@istest
+def cached_dsds_are_read_with_same_options_as_fetched_dsds():
+    with _temporary_directory() as directory:
+        requests = FakeRequests()
+        sdmx.DsdCache(directory).fetch(_url, requests)
+        stats = sdmx.ReaderStats()
+
+        dsd_reader = sdmx.DsdCache(directory).fetch(_url, requests, lazy=True, stats=stats)
+
+        assert_equal(1, len(requests.calls))
+        assert isinstance(dsd_reader, dsd.LazyDsd)
+        assert "dsd_parse" in stats.timings
+
+
+@istest
+def lazy_reads_of_cached_dsds_use_snapshot():
+    with _temporary_directory() as directory:
+        requests = FakeRequests()
+        sdmx.DsdCache(directory).fetch(_url, requests)
+        for name in os.listdir(directory):
+            if name.endswith(".xml"):
+                os.remove(os.path.join(directory, name))
+
+        dsd_reader = sdmx.DsdCache(directory).fetch(_url, requests, lazy=True)
+
+        assert_equal(1, len(requests.calls))
+        key_family, = dsd_reader.key_families()
+        assert_equal("MON2012TSE_O", key_family.id)
+
+
+class FakeRequests(object):
+    def __init__(self, etag=None):
+        self.calls = []
+        self.etag = etag
+        self.body = _dsd_bytes()
+        self.not_modified = False
+
+    def get(self, url, headers=None):
+        self.calls.append((url, headers))
+        if self.not_modified and headers:
+            return FakeResponse(304, {}, b"")
+        else:
+            return FakeResponse(200, {"ETag": self.etag}, self.body)
+
+
+class FakeResponse(object):
+    def __init__(self, status_code, headers, body):
+        self.status_code = status_code
+        self.headers = headers
+        self._body = body
+
+    def iter_content(self, chunk_size):
+        fileobj = io.BytesIO(self._body)
+        while True:
+            buf = fileobj.read(chunk_size)
+            if buf:
+                yield buf
+            else:
+                return
+
+
+class _temporary_directory(object):
+    def __enter__(self):
+        self._path = tempfile.mkdtemp()
+        return os.path.join(self._path, "cache")
+
+    def __exit__(self, *args):
+        shutil.rmtree(self._path)
+
+
+def _dataset_file():
+    return io.BytesIO(b"""<message:MessageGroup xmlns="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/generic" xmlns:message="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message">
+    <DataSet keyFamilyURI="http://stats.oecd.org/RestSDMX/sdmx.ashx/GetKeyFamily/MON2012TSE_O/OECD/?resolveRef=true">
+        <KeyFamilyRef>MON2012TSE_O</KeyFamilyRef>
+    </DataSet>
+</message:MessageGroup>""")
+
+
+def _dsd_bytes():
+    return b"""<?xml version="1.0" encoding="UTF-8"?>
+<Structure xmlns="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message" xmlns:structure="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/structure">
+    <KeyFamilies>
+        <structure:KeyFamily id="MON2012TSE_O" agencyID="OECD">
+            <structure:Name xml:lang="en">2012 A) OECD: Estimate of support to agriculture</structure:Name>
+            <structure:Components>
+                <structure:TimeDimension conceptRef="TIME" />
+            </structure:Components>
+        </structure:KeyFamily>
+    </KeyFamilies>
+</Structure>"""
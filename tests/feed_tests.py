@@ -0,0 +1,97 @@
+from nose.tools import istest, assert_equal
+
+import sdmx
+
+
+@istest
+def events_are_returned_as_generic_message_is_fed():
+    feed = sdmx.generic_data_message_feed()
+    events = []
+    for chunk in _chunks(_generic_message, 7):
+        events += feed.feed(chunk)
+    events += feed.close()
+    
+    assert_equal(
+        [
+            ("dataset_start", {}),
+            ("key_family_ref", "MON2012TSE_O"),
+            ("series_start", [("INDIC", "TO-VP"), ("COUNTRY", "OECD-E")]),
+            ("observation", ("1986", "538954.220075479", "E")),
+            ("observation", ("1987", None, None)),
+            ("series_end", [("INDIC", "TO-VP"), ("COUNTRY", "OECD-E")]),
+            ("dataset_end", None),
+        ],
+        list(map(_describe_event, events)),
+    )
+
+
+@istest
+def series_are_available_before_message_is_complete():
+    feed = sdmx.generic_data_message_feed()
+    end_of_first_obs = _generic_message.index(b"</Obs>") + len(b"</Obs>")
+    
+    events = feed.feed(_generic_message[:end_of_first_obs])
+    
+    assert_equal(
+        ["dataset_start", "key_family_ref", "series_start", "observation"],
+        [event.kind for event in events],
+    )
+
+
+@istest
+def events_are_returned_as_compact_message_is_fed():
+    feed = sdmx.compact_data_message_feed(time_concept="TIME", typed_values=True)
+    events = []
+    for chunk in _chunks(_compact_message, 5):
+        events += feed.feed(chunk)
+    events += feed.close()
+    
+    assert_equal(
+        [
+            ("dataset_start", {"keyFamilyURI": "http://example.com/dsd"}),
+            ("series_start", [("COUNTRY", "OECD-E"), ("INDIC", "TO-VP")]),
+            ("observation", ("1986", 538954.25, "E")),
+            ("series_end", [("COUNTRY", "OECD-E"), ("INDIC", "TO-VP")]),
+            ("dataset_end", None),
+        ],
+        list(map(_describe_event, events)),
+    )
+
+
+def _describe_event(event):
+    if event.kind == "observation":
+        return event.kind, (event.value.time, event.value.value, event.value.status)
+    else:
+        return event.kind, event.value
+
+
+def _chunks(content, size):
+    return [content[index:index + size] for index in range(0, len(content), size)]
+
+
+_generic_message = b"""<message:MessageGroup xmlns="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/generic" xmlns:message="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message">
+    <DataSet>
+        <KeyFamilyRef>MON2012TSE_O</KeyFamilyRef>
+        <Group type="Segment">
+            <GroupKey>
+                <Value concept="INDIC" value="TO-VP" />
+            </GroupKey>
+            <Series>
+                <SeriesKey>
+                    <Value concept="COUNTRY" value="OECD-E" />
+                </SeriesKey>
+                <Obs><Time>1986</Time><ObsValue value="538954.220075479"/><Attributes><Value concept="OBS_STATUS" value="E" /></Attributes></Obs>
+                <Obs><Time>1987</Time></Obs>
+            </Series>
+        </Group>
+    </DataSet>
+</message:MessageGroup>"""
+
+
+_compact_message = b"""<message:CompactData xmlns:message="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message">
+    <oecd:DataSet keyFamilyURI="http://example.com/dsd" xmlns:oecd="http://oecd.stat.org/Data">
+        <oecd:Series COUNTRY="OECD-E" INDIC="TO-VP">
+            <oecd:Obs TIME="1986" OBS_VALUE="538954.25" OBS_STATUS="E" />
+        </oecd:Series>
+    </oecd:DataSet>
+</message:CompactData>"""
@@ -1,6 +1,8 @@
 import io
+import math
 
 from nose.tools import istest, nottest, assert_equal
+from nose.plugins.skip import SkipTest
 import funk
 
 import sdmx
@@ -120,6 +122,205 @@ class GenericDataTests(object):
         assert_equal("598184.668422966", second_obs.value)
 
 
+    @istest
+    def observations_have_status_if_present(self):
+        dataset_file = io.BytesIO(
+        b"""<message:MessageGroup xmlns="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/generic" xmlns:message="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message">
+        <DataSet keyFamilyURI="http://stats.oecd.org/RestSDMX/sdmx.ashx/GetKeyFamily/MON2012TSE_O/OECD/?resolveRef=true">
+            <KeyFamilyRef>MON2012TSE_O</KeyFamilyRef>
+            <Series>
+                <SeriesKey>
+                    <Value concept="COUNTRY" value="OECD-E" />
+                    <Value concept="INDIC" value="TO-VP" />
+                </SeriesKey>
+                <Obs><Time>1986</Time><ObsValue value="538954.220075479"/><Attributes><Value concept="OBS_STATUS" value="E" /></Attributes></Obs>
+                <Obs><Time>1987</Time><ObsValue value="598184.668422966"/></Obs>
+            </Series>
+        </DataSet>
+    </message:MessageGroup>""")
+        dataset_reader = self._reader(dataset_file)
+        dataset = _only(dataset_reader.datasets())
+        series = _only(dataset.series())
+        
+        assert_equal(["E", None], [observation.status for observation in series.observations()])
+
+
+    @istest
+    def observation_values_are_parsed_as_floats_if_typed_values_is_set(self):
+        dataset_file = io.BytesIO(
+        b"""<message:MessageGroup xmlns="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/generic" xmlns:message="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message">
+        <DataSet keyFamilyURI="http://stats.oecd.org/RestSDMX/sdmx.ashx/GetKeyFamily/MON2012TSE_O/OECD/?resolveRef=true">
+            <KeyFamilyRef>MON2012TSE_O</KeyFamilyRef>
+            <Series>
+                <SeriesKey>
+                    <Value concept="COUNTRY" value="OECD-E" />
+                    <Value concept="INDIC" value="TO-VP" />
+                </SeriesKey>
+                <Obs><Time>1986</Time><ObsValue value="538954.25"/></Obs>
+                <Obs><Time>1987</Time><ObsValue value="NaN"/></Obs>
+            </Series>
+        </DataSet>
+    </message:MessageGroup>""")
+        dataset_reader = self._reader(dataset_file, typed_values=True)
+        dataset = _only(dataset_reader.datasets())
+        series = _only(dataset.series())
+        first_obs, second_obs = series.observations()
+        
+        assert_equal("1986", first_obs.time)
+        assert_equal(538954.25, first_obs.value)
+        assert math.isnan(second_obs.value)
+
+
+    @istest
+    def observation_values_that_are_not_numbers_are_parsed_as_nan_if_typed_values_is_set(self):
+        dataset_file = io.BytesIO(
+        b"""<message:MessageGroup xmlns="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/generic" xmlns:message="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message">
+        <DataSet keyFamilyURI="http://stats.oecd.org/RestSDMX/sdmx.ashx/GetKeyFamily/MON2012TSE_O/OECD/?resolveRef=true">
+            <KeyFamilyRef>MON2012TSE_O</KeyFamilyRef>
+            <Series>
+                <SeriesKey>
+                    <Value concept="COUNTRY" value="OECD-E" />
+                    <Value concept="INDIC" value="TO-VP" />
+                </SeriesKey>
+                <Obs><Time>1986</Time><ObsValue value=":"/></Obs>
+                <Obs><Time>1987</Time><ObsValue value=" "/></Obs>
+                <Obs><Time>1988</Time><ObsValue value=" 2.5 "/></Obs>
+            </Series>
+        </DataSet>
+    </message:MessageGroup>""")
+        dataset_reader = self._reader(dataset_file, typed_values=True)
+        dataset = _only(dataset_reader.datasets())
+        series = _only(dataset.series())
+        first_obs, second_obs, third_obs = series.observations()
+        
+        assert math.isnan(first_obs.value)
+        assert math.isnan(second_obs.value)
+        assert_equal(2.5, third_obs.value)
+
+
+    @istest
+    def dataset_can_be_read_as_columns(self):
+        dataset_file = io.BytesIO(
+        b"""<message:MessageGroup xmlns="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/generic" xmlns:message="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message">
+        <DataSet keyFamilyURI="http://stats.oecd.org/RestSDMX/sdmx.ashx/GetKeyFamily/MON2012TSE_O/OECD/?resolveRef=true">
+            <KeyFamilyRef>MON2012TSE_O</KeyFamilyRef>
+            <Series>
+                <SeriesKey>
+                    <Value concept="COUNTRY" value="OECD-E" />
+                    <Value concept="INDIC" value="TO-VP1P" />
+                </SeriesKey>
+                <Obs><Time>1986</Time><ObsValue value="538954.25"/></Obs>
+                <Obs><Time>1987</Time><ObsValue value="NaN"/></Obs>
+            </Series>
+            <Series>
+                <SeriesKey>
+                    <Value concept="COUNTRY" value="OECD-E" />
+                    <Value concept="INDIC" value="TO-VP" />
+                </SeriesKey>
+                <Obs><Time>1986</Time></Obs>
+            </Series>
+        </DataSet>
+    </message:MessageGroup>""")
+        dataset_reader = self._reader(dataset_file)
+        dataset = _only(dataset_reader.datasets())
+        columns = dataset.columns()
+        
+        assert_equal(["1986", "1987", "1986"], list(columns.time))
+        assert_equal(538954.25, columns.value[0])
+        assert math.isnan(columns.value[1])
+        assert math.isnan(columns.value[2])
+        assert_equal(["COUNTRY", "INDIC"], list(columns.dimensions.keys()))
+        assert_equal([0, 0, 0], list(columns.dimensions["COUNTRY"]))
+        assert_equal(["OECD-E"], columns.categories["COUNTRY"])
+        assert_equal([1, 1, 0], list(columns.dimensions["INDIC"]))
+        assert_equal(["TO-VP", "TO-VP1P"], columns.categories["INDIC"])
+
+
+    @istest
+    def dataset_can_be_read_as_batches_of_columns(self):
+        dataset_file = io.BytesIO(
+        b"""<message:MessageGroup xmlns="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/generic" xmlns:message="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message">
+        <DataSet keyFamilyURI="http://stats.oecd.org/RestSDMX/sdmx.ashx/GetKeyFamily/MON2012TSE_O/OECD/?resolveRef=true">
+            <KeyFamilyRef>MON2012TSE_O</KeyFamilyRef>
+            <Series>
+                <SeriesKey>
+                    <Value concept="COUNTRY" value="OECD-E" />
+                    <Value concept="INDIC" value="TO-VP1P" />
+                </SeriesKey>
+                <Obs><Time>1986</Time><ObsValue value="1"/></Obs>
+                <Obs><Time>1987</Time><ObsValue value=":"/></Obs>
+            </Series>
+            <Series>
+                <SeriesKey>
+                    <Value concept="COUNTRY" value="OECD-W" />
+                    <Value concept="INDIC" value="TO-VP" />
+                </SeriesKey>
+                <Obs><Time>1988</Time><ObsValue value="3"/></Obs>
+            </Series>
+        </DataSet>
+    </message:MessageGroup>""")
+        dataset_reader = self._reader(dataset_file)
+        dataset = _only(dataset_reader.datasets())
+        first, second = dataset.column_batches(2)
+        
+        assert_equal(["1986", "1987"], list(first.time))
+        assert_equal(1, first.value[0])
+        assert math.isnan(first.value[1])
+        assert_equal([1, 1], list(first.dimensions["INDIC"]))
+        assert_equal(["OECD-E"], first.categories["COUNTRY"])
+        assert_equal(["1988"], list(second.time))
+        assert_equal([3], list(second.value))
+        assert_equal([1], list(second.dimensions["COUNTRY"]))
+        assert_equal(["OECD-E", "OECD-W"], second.categories["COUNTRY"])
+
+
+    @istest
+    def dataset_can_be_read_as_dataframe(self):
+        try:
+            import pandas
+        except ImportError:
+            raise SkipTest("pandas is not installed")
+        
+        dataset_file = io.BytesIO(
+        b"""<message:MessageGroup xmlns="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/generic" xmlns:message="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message">
+        <DataSet keyFamilyURI="http://stats.oecd.org/RestSDMX/sdmx.ashx/GetKeyFamily/MON2012TSE_O/OECD/?resolveRef=true">
+            <KeyFamilyRef>MON2012TSE_O</KeyFamilyRef>
+            <Series>
+                <SeriesKey>
+                    <Value concept="COUNTRY" value="OECD-E" />
+                    <Value concept="INDIC" value="TO-VP1P" />
+                </SeriesKey>
+                <Obs><Time>1986</Time><ObsValue value="538954.25"/></Obs>
+                <Obs><Time>1987</Time><ObsValue value="NaN"/></Obs>
+            </Series>
+            <Series>
+                <SeriesKey>
+                    <Value concept="COUNTRY" value="OECD-E" />
+                    <Value concept="INDIC" value="OTHER" />
+                </SeriesKey>
+                <Obs><Time>1986</Time><ObsValue value="1"/></Obs>
+            </Series>
+        </DataSet>
+    </message:MessageGroup>""")
+        dataset_reader = self._reader(dataset_file)
+        dataset = _only(dataset_reader.datasets())
+        frame = dataset.to_dataframe(label_langs=["en"])
+        
+        assert_equal(["COUNTRY", "INDIC", "COUNTRY_en", "INDIC_en", "value"], list(frame.columns))
+        assert_equal(["OECD-E"] * 3, list(frame["COUNTRY"]))
+        assert_equal(["TO-VP", "TO-VP1P", "OTHER"], list(frame["INDIC"].cat.categories))
+        assert_equal(["TO-VP1P", "TO-VP1P", "OTHER"], list(frame["INDIC"]))
+        assert_equal(["OECD(EUR million)"] * 3, list(frame["COUNTRY_en"]))
+        assert_equal("of which: share of MPS commodities, percentage", frame["INDIC_en"].iloc[0])
+        assert pandas.isnull(frame["INDIC_en"].iloc[2])
+        assert_equal("float64", str(frame["value"].dtype))
+        assert_equal([538954.25, 1], [frame["value"].iloc[0], frame["value"].iloc[2]])
+        assert_equal(
+            [pandas.Period("1986", freq="Y"), pandas.Period("1987", freq="Y"), pandas.Period("1986", freq="Y")],
+            list(frame.index),
+        )
+
+
     @istest
     def time_is_read_from_code_list_if_time_dimension_has_code_dimension(self):
         with testing.open("time-code-list.sdmx.xml", "rb") as dataset_file:
@@ -133,6 +334,33 @@ class GenericDataTests(object):
                 assert_equal("1987", second_obs.time)
 
 
+    @istest
+    def observations_can_be_filtered_by_coded_time(self):
+        with testing.open("time-code-list.sdmx.xml", "rb") as dataset_file:
+            with testing.open("time-code-list.dsd.xml", "rb") as dsd_file:
+                dataset_reader = self._message_reader(dataset_file, dsd_fileobj=dsd_file)
+                dataset = _only(dataset_reader.datasets())
+                series = _only(dataset.series())
+                observation = _only(series.observations(lang="en", start_period="1987"))
+                
+                assert_equal("1987", observation.time)
+
+
+    @istest
+    def observations_can_be_filtered_by_time(self):
+        with testing.open("groups.dsd.xml", "rb") as dsd_file:
+            dataset_reader = self._message_reader(_filtered_dataset_file(), dsd_fileobj=dsd_file)
+            dataset = _only(dataset_reader.datasets())
+            
+            observations = [
+                observation
+                for series in dataset.series()
+                for observation in series.observations(start_period="1987-Q1", end_period="1987-12")
+            ]
+            
+            assert_equal(["1987"], [observation.time for observation in observations])
+
+
     @istest
     def whitespace_is_stripped_before_looking_up_time_code(self):
         with testing.open("time-code-list-whitespace.sdmx.xml", "rb") as dataset_file:
@@ -160,6 +388,69 @@ class GenericDataTests(object):
                     assert_equal("Observation time uses code list, but language is not specified", str(error))
 
 
+    @istest
+    def series_can_be_filtered_by_key(self):
+        with testing.open("groups.dsd.xml", "rb") as dsd_file:
+            dataset_reader = self._message_reader(_filtered_dataset_file(), dsd_fileobj=dsd_file)
+            dataset = _only(dataset_reader.datasets())
+            
+            all_series = dataset.series(key_filter={"INDIC": ["TO-VP", "TO-VP1P"], "COUNTRY": "OECD-E"})
+            
+            assert_equal(["1986", "1987"], [_only(series.observations()).time for series in all_series])
+
+
+    @istest
+    def series_can_be_filtered_by_key_including_descendant_codes(self):
+        with testing.open("groups.dsd.xml", "rb") as dsd_file:
+            dataset_reader = self._message_reader(_filtered_dataset_file(), dsd_fileobj=dsd_file)
+            dataset = _only(dataset_reader.datasets())
+            
+            all_series = dataset.series(key_filter={"INDIC": "TO-VP"}, include_descendants=True)
+            
+            assert_equal(
+                [[("COUNTRY", "OECD-E"), ("INDIC", "TO-VP")], [("COUNTRY", "OECD-E"), ("INDIC", "TO-VP1P")]],
+                [series.key() for series in all_series],
+            )
+
+
+    @istest
+    def series_key_codes_are_in_order_of_dimensions(self):
+        with testing.open("groups.dsd.xml", "rb") as dsd_file:
+            dataset_reader = self._message_reader(_filtered_dataset_file(), dsd_fileobj=dsd_file)
+            dataset = _only(dataset_reader.datasets())
+            
+            assert_equal(
+                [("TO-VP", "OECD-E"), ("TO-VP1P", "OECD-E"), ("OTHER", "OECD-E")],
+                [series.key_codes() for series in dataset.series()],
+            )
+
+
+    @istest
+    def observations_of_series_can_be_read_in_batches(self):
+        with testing.open("groups.dsd.xml", "rb") as dsd_file:
+            dataset_reader = self._message_reader(_filtered_dataset_file(), dsd_fileobj=dsd_file)
+            dataset = _only(dataset_reader.datasets())
+            series = next(iter(dataset.series()))
+            
+            batches = list(series.observation_batches(2))
+            
+            assert_equal([["1986"]], [[observation.time for observation in batch] for batch in batches])
+
+
+    @istest
+    def observations_of_dataset_can_be_read_in_batches_across_series(self):
+        with testing.open("groups.dsd.xml", "rb") as dsd_file:
+            dataset_reader = self._message_reader(_filtered_dataset_file(), dsd_fileobj=dsd_file)
+            dataset = _only(dataset_reader.datasets())
+            
+            batches = list(dataset.observation_batches(2))
+            
+            assert_equal(
+                [[("TO-VP", "1986"), ("TO-VP1P", "1987")], [("OTHER", "1988")]],
+                [[(dict(key)["INDIC"], observation.time) for key, observation in batch] for batch in batches],
+            )
+
+
     @istest
     def key_values_can_be_read_from_group(self):
         with testing.open("groups.sdmx.xml", "rb") as dataset_file:
@@ -176,14 +467,14 @@ class GenericDataTests(object):
                     list(series.describe_key(lang="en").items()),
                 )
 
-    def _reader(self, dataset_file):
+    def _reader(self, dataset_file, **kwargs):
         context = funk.Context()
         requests = context.mock()
         response = context.mock()
         funk.allows(requests).get("http://stats.oecd.org/RestSDMX/sdmx.ashx/GetKeyFamily/MON2012TSE_O/OECD/?resolveRef=true").returns(response)
         funk.allows(response).iter_content(16 * 1024).returns(_dsd_chunks())
         
-        return self._message_reader(fileobj=dataset_file, requests=requests)
+        return self._message_reader(fileobj=dataset_file, requests=requests, **kwargs)
     
     def _message_reader(self, *args, **kwargs):
         return sdmx.generic_data_message_reader(*args, lazy=self.lazy, **kwargs)
@@ -198,6 +489,153 @@ class LazyGenericTests(GenericDataTests):
     lazy = True
 
 
+@istest
+class LazyIterparseGenericTests(GenericDataTests):
+    lazy = "iterparse"
+
+
+@istest
+class EventsGenericTests(GenericDataTests):
+    lazy = "events"
+
+
+@istest
+class IndexedGenericTests(GenericDataTests):
+    lazy = False
+    
+    def _message_reader(self, fileobj, **kwargs):
+        return sdmx.generic_data_message_reader(fileobj=fileobj, index=testing.series_index(fileobj, "generic"), **kwargs)
+
+
+@nottest
+class OutOfOrderElementTests(object):
+    @istest
+    def observations_before_series_key_are_read_with_series(self):
+        series = self._only_series()
+        
+        assert_equal([("COUNTRY", "OECD-E"), ("INDIC", "TO-VP")], series.key())
+        assert_equal(["1986", "1987", "1988"], [observation.time for observation in series.observations()])
+    
+    @istest
+    def children_of_observation_can_be_in_any_order(self):
+        series = self._only_series()
+        observation = list(series.observations())[1]
+        
+        assert_equal("2", observation.value)
+        assert_equal("E", observation.status)
+    
+    def _only_series(self):
+        with testing.open("groups.dsd.xml", "rb") as dsd_file:
+            reader = sdmx.generic_data_message_reader(
+                _out_of_order_dataset_file(),
+                dsd_fileobj=dsd_file,
+                lazy=self.lazy,
+                lookahead_limit=self.lookahead_limit,
+            )
+            dataset = next(iter(reader.datasets()))
+            return next(iter(dataset.series()))
+
+
+@istest
+class EagerOutOfOrderElementTests(OutOfOrderElementTests):
+    lazy = False
+    lookahead_limit = None
+
+
+@istest
+class LazyOutOfOrderElementTests(OutOfOrderElementTests):
+    lazy = "pulldom"
+    lookahead_limit = None
+
+
+@istest
+class LazyIterparseOutOfOrderElementTests(OutOfOrderElementTests):
+    lazy = "iterparse"
+    lookahead_limit = None
+
+
+@istest
+class SpilledLazyOutOfOrderElementTests(OutOfOrderElementTests):
+    lazy = "pulldom"
+    lookahead_limit = 4
+
+
+@istest
+class SpilledLazyIterparseOutOfOrderElementTests(OutOfOrderElementTests):
+    lazy = "iterparse"
+    lookahead_limit = 0
+
+
+@istest
+def value_error_is_raised_if_events_engine_reads_observation_before_series_key():
+    with testing.open("groups.dsd.xml", "rb") as dsd_file:
+        reader = sdmx.generic_data_message_reader(_out_of_order_dataset_file(), dsd_fileobj=dsd_file, lazy="events")
+        dataset = next(iter(reader.datasets()))
+        try:
+            list(dataset.series())
+            assert False, "Expected ValueError"
+        except ValueError as error:
+            assert_equal("Observation before its series key, which requires the pulldom or iterparse engine", str(error))
+
+
+def _out_of_order_dataset_file():
+    return io.BytesIO(b"""<message:MessageGroup xmlns="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/generic" xmlns:message="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message">
+        <DataSet>
+            <KeyFamilyRef>MON2012TSE_O</KeyFamilyRef>
+            <Series>
+                <Obs><Time>1986</Time><ObsValue value="1"/></Obs>
+                <Obs>
+                    <Attributes><Value concept="OBS_STATUS" value="E" /></Attributes>
+                    <ObsValue value="2"/>
+                    <Time>1987</Time>
+                </Obs>
+                <SeriesKey>
+                    <Value concept="COUNTRY" value="OECD-E" />
+                    <Value concept="INDIC" value="TO-VP" />
+                </SeriesKey>
+                <Obs><Time>1988</Time><ObsValue value="3"/></Obs>
+            </Series>
+        </DataSet>
+    </message:MessageGroup>""")
+
+
+def _filtered_dataset_file():
+    series = "".join(
+        """<Series>
+            <SeriesKey>
+                <Value concept="COUNTRY" value="OECD-E" />
+                <Value concept="INDIC" value="{0}" />
+            </SeriesKey>
+            <Obs><Time>{1}</Time><ObsValue value="1"/></Obs>
+        </Series>""".format(indicator, time)
+        for indicator, time in [("TO-VP", 1986), ("TO-VP1P", 1987), ("OTHER", 1988)]
+    )
+    return io.BytesIO("""<message:MessageGroup xmlns="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/generic" xmlns:message="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message">
+        <DataSet>
+            <KeyFamilyRef>MON2012TSE_O</KeyFamilyRef>
+            {0}
+        </DataSet>
+    </message:MessageGroup>""".format(series).encode("utf-8"))
+
+
+@istest
+def value_error_is_raised_if_lazy_engine_is_unknown():
+    try:
+        sdmx.generic_data_message_reader(io.BytesIO(b"<DataSet />"), lazy="sax")
+        assert False, "Expected ValueError"
+    except ValueError as error:
+        assert_equal("Unknown lazy engine: 'sax'", str(error))
+
+
+@istest
+def value_error_is_raised_if_events_engine_is_used_with_compact_data():
+    try:
+        sdmx.compact_data_message_reader(io.BytesIO(b"<DataSet />"), lazy="events")
+        assert False, "Expected ValueError"
+    except ValueError as error:
+        assert_equal("The events engine is not supported for this message format", str(error))
+
+
 def _dsd_chunks():
     fileobj = io.BytesIO(b"""<?xml version="1.0" encoding="UTF-8"?>
 <Structure xmlns="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message" xmlns:structure="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/structure">
@@ -0,0 +1,173 @@
+import io
+import os
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+from nose.tools import istest, assert_equal
+
+import sdmx
+
+
+@istest
+def dsd_can_be_fetched_by_data_message_reader():
+    with _Server() as server:
+        dataset_reader = sdmx.generic_data_message_reader(
+            _dataset_file(server.url("/dsd")),
+            requests=sdmx.PooledRequests(),
+        )
+        dataset, = dataset_reader.datasets()
+
+        assert_equal("2012 A) OECD: Estimate of support to agriculture", dataset.key_family().name("en"))
+
+
+@istest
+def requests_are_retried_if_server_is_unavailable():
+    with _Server(failures=2) as server:
+        sleeps = []
+        response = sdmx.PooledRequests(sleep=sleeps.append, backoff=1).get(server.url("/dsd"))
+
+        assert_equal(200, response.status_code)
+        assert_equal(3, len(server.requests))
+        assert_equal([1, 2], sleeps)
+
+
+@istest
+def last_response_is_returned_once_retries_are_exhausted():
+    with _Server(failures=5) as server:
+        response = sdmx.PooledRequests(sleep=lambda seconds: None, retries=2).get(server.url("/dsd"))
+
+        assert_equal(503, response.status_code)
+        assert_equal(3, len(server.requests))
+
+
+@istest
+def unchanged_responses_are_revalidated_with_conditional_requests():
+    with _Server() as server:
+        requests = sdmx.PooledRequests()
+        first_response = requests.get(server.url("/dsd"))
+        second_response = requests.get(server.url("/dsd"))
+
+        assert_equal(200, second_response.status_code)
+        assert_equal(first_response.content, second_response.content)
+        assert_equal([None, '"v1"'], [headers.get("If-None-Match") for headers in server.requests])
+
+
+@istest
+def least_recently_used_responses_are_dropped_once_cache_is_full():
+    with _Server() as server:
+        requests = sdmx.PooledRequests(cache_size=len(_dsd_bytes()))
+        requests.get(server.url("/dsd"))
+        requests.get(server.url("/other"))
+        requests.get(server.url("/dsd"))
+
+        assert_equal([None, None, None], [headers.get("If-None-Match") for headers in server.requests])
+
+
+@istest
+def response_body_is_removed_from_disk_once_response_is_released():
+    with _Server() as server:
+        response = sdmx.PooledRequests(conditional=False).get(server.url("/dsd"))
+        path = response._body.path
+
+        assert_equal(_dsd_bytes(), b"".join(response.iter_content(100)))
+        del response
+        assert not os.path.exists(path)
+
+
+@istest
+def concurrent_requests_for_same_url_are_collapsed():
+    with _Server(delay=0.2) as server:
+        requests = sdmx.PooledRequests()
+        responses = []
+
+        def fetch():
+            responses.append(requests.get(server.url("/dsd")))
+
+        threads = [threading.Thread(target=fetch) for index in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert_equal(1, len(server.requests))
+        assert_equal(4, len(responses))
+
+
+class _Server(object):
+    def __init__(self, failures=0, delay=0):
+        self.requests = []
+        self._failures = failures
+        self._delay = delay
+
+    def __enter__(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                server.requests.append(dict(self.headers.items()))
+                time.sleep(server._delay)
+                if len(server.requests) <= server._failures:
+                    self._respond(503, {}, b"")
+                elif self.headers.get("If-None-Match") == '"v1"':
+                    self._respond(304, {"ETag": '"v1"'}, b"")
+                else:
+                    self._respond(200, {"ETag": '"v1"'}, _dsd_bytes())
+
+            def _respond(self, status_code, headers, body):
+                self.send_response(status_code)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = _ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def url(self, path):
+        return "http://127.0.0.1:{0}{1}".format(self._server.server_address[1], path)
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def _dataset_file(dsd_url):
+    return io.BytesIO("""<message:MessageGroup xmlns="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/generic" xmlns:message="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message">
+    <DataSet keyFamilyURI="{0}">
+        <KeyFamilyRef>MON2012TSE_O</KeyFamilyRef>
+    </DataSet>
+</message:MessageGroup>""".format(dsd_url).encode("utf-8"))
+
+
+def _dsd_bytes():
+    return b"""<?xml version="1.0" encoding="UTF-8"?>
+<Structure xmlns="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message" xmlns:structure="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/structure">
+    <KeyFamilies>
+        <structure:KeyFamily id="MON2012TSE_O" agencyID="OECD">
+            <structure:Name xml:lang="en">2012 A) OECD: Estimate of support to agriculture</structure:Name>
+            <structure:Components>
+                <structure:TimeDimension conceptRef="TIME" />
+            </structure:Components>
+        </structure:KeyFamily>
+    </KeyFamilies>
+</Structure>"""
@@ -0,0 +1,105 @@
+import io
+
+from nose.tools import istest, assert_equal
+
+import sdmx
+from sdmx import index
+from . import testing
+
+
+@istest
+def index_records_key_of_each_series_including_group_key():
+    series_index = index.build(_message_file(), "generic")
+
+    dataset, = series_index.datasets
+    assert_equal(
+        [
+            [("COUNTRY", "OECD-E"), ("INDIC", "TO-VP")],
+            [("INDIC", "TO-VP1P"), ("COUNTRY", "OECD-E")],
+        ],
+        [list(series.key) for series in dataset.series],
+    )
+
+
+@istest
+def only_matching_series_are_read_from_message():
+    message_file = _CountingFile(_message_file())
+    series_index = testing.series_index(message_file, "generic")
+    message_file.bytes_read = 0
+
+    with testing.open("groups.dsd.xml", "rb") as dsd_file:
+        reader = sdmx.generic_data_message_reader(message_file, dsd_fileobj=dsd_file, index=series_index)
+        dataset, = reader.datasets()
+        series, = dataset.series(key_filter={"INDIC": "TO-VP1P"})
+
+        assert_equal(["1987"], [observation.time for observation in series.observations()])
+
+    indexed_series = series_index.datasets[0].series[1]
+    header_size = series_index.datasets[0].header_end - series_index.datasets[0].start
+    assert_equal(header_size + indexed_series.end - indexed_series.start, message_file.bytes_read)
+
+
+@istest
+def value_error_is_raised_if_index_does_not_match_message():
+    series_index = index.build(_message_file(), "generic")
+    message_file = io.BytesIO(_message_file().getvalue() + b"\n")
+    try:
+        sdmx.generic_data_message_reader(message_file, index=series_index)
+        assert False, "Expected ValueError"
+    except ValueError as error:
+        assert_equal(
+            "Series index does not match the message: expected {0} bytes, but was {1}".format(series_index.size, series_index.size + 1),
+            str(error),
+        )
+
+
+@istest
+def value_error_is_raised_if_message_format_is_unknown():
+    try:
+        index.build(_message_file(), "structure")
+        assert False, "Expected ValueError"
+    except ValueError as error:
+        assert_equal("Unknown message format: 'structure'", str(error))
+
+
+class _CountingFile(object):
+    def __init__(self, fileobj):
+        self._fileobj = fileobj
+        self.bytes_read = 0
+
+    def read(self, *args):
+        data = self._fileobj.read(*args)
+        self.bytes_read += len(data)
+        return data
+
+    def seek(self, *args):
+        return self._fileobj.seek(*args)
+
+    def tell(self):
+        return self._fileobj.tell()
+
+
+def _message_file():
+    return io.BytesIO(b"""<message:MessageGroup xmlns="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/generic" xmlns:message="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message">
+        <DataSet>
+            <KeyFamilyRef>MON2012TSE_O</KeyFamilyRef>
+            <Series>
+                <SeriesKey>
+                    <Value concept="COUNTRY" value="OECD-E" />
+                    <Value concept="INDIC" value="TO-VP" />
+                </SeriesKey>
+                <Obs><Time>1986</Time><ObsValue value="1"/></Obs>
+            </Series>
+            <Group type="Segment_487">
+                <GroupKey>
+                    <Value concept="INDIC" value="TO-VP1P" />
+                </GroupKey>
+                <Series>
+                    <SeriesKey>
+                        <Value concept="COUNTRY" value="OECD-E" />
+                    </SeriesKey>
+                    <Obs><Time>1987</Time><ObsValue value="2"/></Obs>
+                </Series>
+            </Group>
+        </DataSet>
+    </message:MessageGroup>""")
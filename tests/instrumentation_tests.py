@@ -0,0 +1,139 @@
+import io
+import time
+
+from nose.tools import istest, assert_equal
+
+import sdmx
+from . import testing
+
+
+@istest
+def counts_and_timings_are_recorded_when_reading_data_message():
+    stats = sdmx.ReaderStats()
+    message = _message()
+    with testing.open("groups.dsd.xml", "rb") as dsd_file:
+        dataset_reader = sdmx.generic_data_message_reader(io.BytesIO(message), dsd_fileobj=dsd_file, lazy=True, stats=stats)
+        for dataset in dataset_reader.datasets():
+            for series in dataset.series():
+                series.describe_key(lang="en")
+                list(series.observations())
+    
+    assert_equal(len(message), stats.counts["bytes_read"])
+    assert_equal(1, stats.counts["datasets"])
+    assert_equal(2, stats.counts["series"])
+    assert_equal(3, stats.counts["observations"])
+    assert_equal(4, stats.counts["description_lookups"])
+    assert_equal(3, stats.counts["description_misses"])
+    assert_equal(
+        set(["xml_parse", "dsd_parse", "series_keys", "observations", "descriptions"]),
+        set(stats.as_dict()["timings"]),
+    )
+
+
+@istest
+def parsing_is_timed_as_message_is_read_lazily():
+    for lazy in ["pulldom", "iterparse", "events"]:
+        _parsing_is_timed_as_message_is_read(lazy)
+
+
+def _parsing_is_timed_as_message_is_read(lazy):
+    stats = sdmx.ReaderStats()
+    message = _large_message(series_count=1000)
+    fileobj = _SlowReader(io.BytesIO(message), delay=0.01)
+    with testing.open("groups.dsd.xml", "rb") as dsd_file:
+        dataset_reader = sdmx.generic_data_message_reader(fileobj, dsd_fileobj=dsd_file, lazy=lazy, stats=stats)
+        for dataset in dataset_reader.datasets():
+            for series in dataset.series():
+                list(series.observations())
+    
+    # Opening the root only needs the first read
+    assert fileobj.reads > 4
+    assert stats.timings["xml_parse"] >= (fileobj.reads - 1) * 0.01
+
+
+class _SlowReader(object):
+    def __init__(self, fileobj, delay):
+        self._fileobj = fileobj
+        self._delay = delay
+        self.reads = 0
+    
+    def read(self, *args):
+        self.reads += 1
+        time.sleep(self._delay)
+        return self._fileobj.read(*args)
+
+
+def _large_message(series_count):
+    series = """
+        <Series>
+            <SeriesKey>
+                <Value concept="COUNTRY" value="OECD-E" />
+                <Value concept="INDIC" value="TO-VP" />
+            </SeriesKey>
+            <Obs><Time>1986</Time><ObsValue value="1"/></Obs>
+        </Series>"""
+    return """<message:MessageGroup xmlns="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/generic" xmlns:message="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message">
+    <DataSet>
+        <KeyFamilyRef>MON2012TSE_O</KeyFamilyRef>{0}
+    </DataSet>
+</message:MessageGroup>""".format(series * series_count).encode("ascii")
+
+
+@istest
+def dsd_fetches_are_counted_as_cache_hits_or_misses():
+    with testing.open("groups.dsd.xml", "rb") as dsd_file:
+        dsd_bytes = dsd_file.read()
+    requests = _FakeRequests(dsd_bytes)
+    stats = sdmx.ReaderStats()
+    message = _message(key_family_uri="http://example.com/dsd")
+    
+    dataset_reader = sdmx.generic_data_message_reader(io.BytesIO(message), requests=requests, stats=stats)
+    for dataset in dataset_reader.datasets():
+        pass
+    
+    assert_equal(1, stats.counts["dsd_cache_misses"])
+    assert_equal(len(dsd_bytes), stats.counts["dsd_bytes_read"])
+    assert "dsd_fetch" in stats.timings
+
+
+class _FakeRequests(object):
+    def __init__(self, body):
+        self._body = body
+    
+    def get(self, url):
+        return _FakeResponse(self._body)
+
+
+class _FakeResponse(object):
+    def __init__(self, body):
+        self._body = body
+    
+    def iter_content(self, chunk_size):
+        return [self._body]
+
+
+def _message(key_family_uri=None):
+    if key_family_uri is None:
+        key_family_attribute = ""
+    else:
+        key_family_attribute = ' keyFamilyURI="{0}"'.format(key_family_uri)
+    return """<message:MessageGroup xmlns="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/generic" xmlns:message="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message">
+    <DataSet{0}>
+        <KeyFamilyRef>MON2012TSE_O</KeyFamilyRef>
+        <Series>
+            <SeriesKey>
+                <Value concept="COUNTRY" value="OECD-E" />
+                <Value concept="INDIC" value="TO-VP" />
+            </SeriesKey>
+            <Obs><Time>1986</Time><ObsValue value="1"/></Obs>
+            <Obs><Time>1987</Time><ObsValue value="2"/></Obs>
+        </Series>
+        <Series>
+            <SeriesKey>
+                <Value concept="COUNTRY" value="OECD-E" />
+                <Value concept="INDIC" value="TO-VP1P" />
+            </SeriesKey>
+            <Obs><Time>1986</Time><ObsValue value="3"/></Obs>
+        </Series>
+    </DataSet>
+</message:MessageGroup>""".format(key_family_attribute).encode("utf-8")
@@ -0,0 +1,62 @@
+from nose.tools import istest, assert_equal
+
+from sdmx.keys import KeySchema
+
+
+@istest
+def codes_are_stored_in_order_of_dimensions_followed_by_other_concepts():
+    schema = KeySchema(["INDIC", "COUNTRY"])
+    key = schema.key([("UNIT", "EUR"), ("COUNTRY", "OECD-E"), ("INDIC", "TO-VP")])
+
+    assert_equal(("TO-VP", "OECD-E", "EUR"), key.codes)
+    assert_equal(("TO-VP", "OECD-E"), key.dimension_codes())
+    assert_equal([("UNIT", "EUR"), ("COUNTRY", "OECD-E"), ("INDIC", "TO-VP")], list(key))
+
+
+@istest
+def missing_dimensions_have_code_of_none():
+    schema = KeySchema(["INDIC", "COUNTRY"])
+    key = schema.key([("INDIC", "TO-VP")])
+
+    assert_equal(("TO-VP", None), key.dimension_codes())
+    assert_equal([("INDIC", "TO-VP")], list(key))
+
+
+@istest
+def last_value_of_repeated_dimension_is_used():
+    schema = KeySchema(["COUNTRY"])
+    key = schema.key([("COUNTRY", "OECD"), ("COUNTRY", "OECD-E")])
+
+    assert_equal(("OECD-E", ), key.dimension_codes())
+    assert_equal([("COUNTRY", "OECD"), ("COUNTRY", "OECD-E")], list(key))
+
+
+@istest
+def keys_with_same_concepts_share_layout_and_codes():
+    schema = KeySchema(["COUNTRY"])
+    first = schema.key([("COUNTRY", "".join(["OECD", "-E"]))])
+    second = schema.key([("COUNTRY", "".join(["OECD", "-E"]))])
+
+    assert first.layout is second.layout
+    assert first.codes[0] is second.codes[0]
+    assert_equal(first, second)
+    assert_equal(hash(first), hash(second))
+
+
+@istest
+def keys_with_different_codes_or_concepts_are_not_equal():
+    schema = KeySchema(["COUNTRY"])
+    key = schema.key([("COUNTRY", "OECD-E")])
+
+    assert key != schema.key([("COUNTRY", "OECD")])
+    assert key != schema.key([("COUNTRY", "OECD-E"), ("UNIT", "EUR")])
+
+
+@istest
+def values_of_other_concepts_are_not_interned():
+    schema = KeySchema(["COUNTRY"])
+    first = schema.key([("COUNTRY", "OECD-E"), ("TITLE", "".join(["Ti", "tle"]))])
+    second = schema.key([("COUNTRY", "OECD-E"), ("TITLE", "".join(["Ti", "tle"]))])
+
+    assert first.codes[1] is not second.codes[1]
+    assert_equal(first, second)
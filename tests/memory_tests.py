@@ -0,0 +1,160 @@
+import gc
+import io
+import itertools
+import re
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from nose.tools import istest, nottest
+from nose.plugins.skip import SkipTest
+
+import sdmx
+from sdmx import dsd
+from benchmarks import synthetic
+
+
+_readers = {
+    "generic": (synthetic.write_generic_message, sdmx.generic_data_message_reader),
+    "compact": (synthetic.write_compact_message, sdmx.compact_data_message_reader),
+}
+
+# Allows for noise in the allocator, such as a buffer being resized
+_slack_bytes = 64 * 1024
+
+
+@nottest
+class LazyMemoryTests(object):
+    @istest
+    def peak_memory_does_not_grow_with_number_of_series(self):
+        peaks = [self._peak_memory(series=series, observations=20) for series in [50, 200, 800]]
+
+        _assert_flat(peaks)
+
+    @istest
+    def peak_memory_does_not_grow_with_length_of_series(self):
+        peaks = [self._peak_memory(series=20, observations=observations) for observations in [20, 80, 320]]
+
+        _assert_flat(peaks)
+
+    @istest
+    def peak_memory_does_not_grow_with_number_of_series_with_unique_attributes(self):
+        peaks = [
+            self._peak_memory(series=series, observations=5, unique_titles=True)
+            for series in [250, 1000, 4000]
+        ]
+
+        _assert_flat(peaks)
+
+    def _peak_memory(self, series, observations, unique_titles=False):
+        if tracemalloc is None:
+            raise SkipTest("tracemalloc is not available")
+
+        write_message, message_reader = _readers[self.message_format]
+        shape = synthetic.shape(series=series, observations=observations, codes=20)
+        dsd_file = io.BytesIO()
+        synthetic.write_dsd(dsd_file, shape)
+        dsd_file.seek(0)
+        parsed_dsd = dsd.reader(dsd_file)
+        message = io.BytesIO()
+        write_message(message, shape)
+        if unique_titles:
+            message = io.BytesIO(_add_unique_titles(message.getvalue()))
+
+        def read():
+            reader = message_reader(io.BytesIO(message.getvalue()), lazy=self.lazy, parsed_dsd=parsed_dsd)
+            for dataset in reader.datasets():
+                for series_reader in dataset.series():
+                    for observation in series_reader.observations():
+                        pass
+
+        # The first read fills caches, such as code descriptions, that
+        # depend on the DSD rather than the message
+        read()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            read()
+            current, peak = tracemalloc.get_traced_memory()
+            return peak
+        finally:
+            tracemalloc.stop()
+
+
+# Titles are part of the series key but aren't dimensions, so have no code
+# list bounding the number of distinct values
+_series_key_start = re.compile(b"<data:Series|<SeriesKey>")
+
+
+def _add_unique_titles(message):
+    counter = itertools.count()
+
+    def add_title(match):
+        title = "Title of series {0}".format(next(counter)).encode("ascii")
+        if match.group(0) == b"<SeriesKey>":
+            return b'<SeriesKey><Value concept="TITLE_COMPL" value="' + title + b'"/>'
+        else:
+            return b'<data:Series TITLE_COMPL="' + title + b'"'
+
+    return _series_key_start.sub(add_title, message)
+
+
+@istest
+def peak_memory_of_reading_dsd_lazily_does_not_grow_with_number_of_codes():
+    peaks = [_dsd_peak_memory(codes=codes) for codes in [250, 1000, 4000]]
+
+    _assert_flat(peaks)
+
+
+def _dsd_peak_memory(codes):
+    if tracemalloc is None:
+        raise SkipTest("tracemalloc is not available")
+
+    dsd_file = io.BytesIO()
+    synthetic.write_dsd(dsd_file, synthetic.shape(codes=codes))
+    dsd_file.seek(0)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        dsd.reader(dsd_file, lazy=True)
+        current, peak = tracemalloc.get_traced_memory()
+        return peak
+    finally:
+        tracemalloc.stop()
+
+
+def _assert_flat(peaks):
+    assert max(peaks) <= peaks[0] * 1.1 + _slack_bytes, "Peak memory grew with message size: {0}".format(peaks)
+
+
+@istest
+class GenericPulldomMemoryTests(LazyMemoryTests):
+    message_format = "generic"
+    lazy = "pulldom"
+
+
+@istest
+class GenericIterparseMemoryTests(LazyMemoryTests):
+    message_format = "generic"
+    lazy = "iterparse"
+
+
+@istest
+class GenericEventsMemoryTests(LazyMemoryTests):
+    message_format = "generic"
+    lazy = "events"
+
+
+@istest
+class CompactPulldomMemoryTests(LazyMemoryTests):
+    message_format = "compact"
+    lazy = "pulldom"
+
+
+@istest
+class CompactIterparseMemoryTests(LazyMemoryTests):
+    message_format = "compact"
+    lazy = "iterparse"
@@ -0,0 +1,212 @@
+import multiprocessing
+import os
+import shutil
+import signal
+import tempfile
+import threading
+import time
+
+from nose.tools import istest, assert_equal
+from nose.plugins.skip import SkipTest
+
+import sdmx
+from sdmx import parallel
+from . import testing
+
+
+@istest
+def observations_of_each_file_are_returned_in_file_order():
+    with _message_files(3) as paths:
+        with testing.open("groups.dsd.xml", "rb") as dsd_file:
+            results = list(sdmx.read_many(paths, "generic", dsd_fileobj=dsd_file, processes=2, batch_size=1))
+
+    assert_equal([paths[0], paths[0], paths[1], paths[1], paths[2], paths[2]], [result.path for result in results])
+    assert_equal([None] * 6, [result.error for result in results])
+    assert_equal(
+        [((("COUNTRY", "OECD-E"), ("INDIC", "TO-VP")), "1986", "0")],
+        results[0].batch,
+    )
+    assert_equal(
+        [((("COUNTRY", "OECD-E"), ("INDIC", "TO-VP")), "1987", "2")],
+        results[3].batch,
+    )
+
+
+@istest
+def errors_are_reported_per_file():
+    with _message_files(2) as paths:
+        with open(paths[0], "wb") as fileobj:
+            fileobj.write(b"<message:MessageGroup")
+        with testing.open("groups.dsd.xml", "rb") as dsd_file:
+            results = list(sdmx.read_many(paths, "generic", dsd_fileobj=dsd_file, processes=2))
+
+    assert_equal([paths[0], paths[1]], [result.path for result in results])
+    assert results[0].error is not None
+    assert_equal(None, results[1].error)
+    assert_equal(2, len(results[1].batch))
+
+
+@istest
+def observations_can_be_returned_as_columns():
+    with _message_files(2) as paths:
+        with testing.open("groups.dsd.xml", "rb") as dsd_file:
+            results = list(sdmx.read_many(paths, "generic", dsd_fileobj=dsd_file, columnar=True, ordered=False))
+
+    assert_equal(set(paths), set(result.path for result in results))
+    for result in results:
+        assert_equal(2, len(result.batch))
+        assert_equal(["TO-VP", "TO-VP1P"], result.batch.categories["INDIC"])
+
+
+@istest
+def file_is_reported_as_error_if_worker_dies_while_reading_it():
+    if not hasattr(os, "mkfifo"):
+        raise SkipTest("Named pipes are not available")
+
+    with _message_files(1) as paths:
+        # Reading from the pipe blocks until the worker is killed
+        blocked_path = os.path.join(os.path.dirname(paths[0]), "blocked.xml")
+        os.mkfifo(blocked_path)
+        killer = threading.Thread(target=_kill_workers_after_start)
+        killer.start()
+        with testing.open("groups.dsd.xml", "rb") as dsd_file:
+            results = list(sdmx.read_many([blocked_path] + paths, "generic", dsd_fileobj=dsd_file, processes=1))
+        killer.join()
+
+    assert_equal([blocked_path, paths[0]], [result.path for result in results])
+    assert "before the file was read" in results[0].error
+    assert_equal(None, results[1].error)
+
+
+def _kill_workers_after_start():
+    while not multiprocessing.active_children():
+        time.sleep(0.05)
+    time.sleep(0.5)
+    for process in multiprocessing.active_children():
+        os.kill(process.pid, signal.SIGKILL)
+
+
+@istest
+def files_are_reported_as_errors_if_workers_die_before_reading_them():
+    with _patched_worker_creation(_kill_current_process):
+        with _message_files(2) as paths:
+            results = list(sdmx.read_many(paths, "generic", processes=1))
+
+    assert_equal(paths, [result.path for result in results])
+    for result in results:
+        assert "before the file was read" in result.error
+
+
+def _kill_current_process(*args):
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+@istest
+def files_are_reported_as_errors_if_workers_cannot_be_created():
+    with _patched_worker_creation(_fail_to_create_worker):
+        with _message_files(2) as paths:
+            results = list(sdmx.read_many(paths, "generic", processes=2))
+
+    assert_equal(paths, [result.path for result in results])
+    for result in results:
+        assert "Could not create worker" in result.error
+
+
+def _fail_to_create_worker(*args):
+    raise ValueError("Could not create worker")
+
+
+class _patched_worker_creation(object):
+    # Workers only see the patched function if they're forked from this
+    # process
+    def __init__(self, create_worker):
+        self._create_worker = create_worker
+
+    def __enter__(self):
+        if multiprocessing.get_start_method() != "fork":
+            raise SkipTest("Workers are not forked")
+        self._original = parallel._create_worker, parallel._poll_interval
+        parallel._create_worker = self._create_worker
+        parallel._poll_interval = 0.1
+
+    def __exit__(self, *args):
+        parallel._create_worker, parallel._poll_interval = self._original
+
+
+@istest
+def later_files_are_not_submitted_until_earlier_files_are_returned():
+    log = []
+    queue = _FakeQueue(log)
+    pool = _FakePool(log, queue)
+    paths = ["0.xml", "1.xml", "2.xml"]
+
+    results = list(parallel._collect_results(pool, queue, paths, ordered=True, max_pending=2))
+
+    assert_equal(["0.xml", "1.xml", "2.xml"], [result.path for result in results])
+    assert log.index(("submit", 2)) > log.index(("done", 0))
+
+
+class _FakePool(object):
+    # Files finish in reverse order of submission, so the first file is
+    # the slowest
+    def __init__(self, log, queue):
+        self._log = log
+        self._queue = queue
+
+    def has_idle_worker(self):
+        return True
+
+    def submit(self, index, path):
+        self._log.append(("submit", index))
+        self._queue.messages[:0] = [("batch", index, [path]), ("done", index, None)]
+
+    def finish(self, index):
+        pass
+
+    def lost_files(self):
+        return []
+
+
+class _FakeQueue(object):
+    def __init__(self, log):
+        self._log = log
+        self.messages = []
+
+    def get(self, timeout):
+        message = self.messages.pop(0)
+        self._log.append((message[0], message[1]))
+        return message
+
+
+class _message_files(object):
+    def __init__(self, count):
+        self._count = count
+
+    def __enter__(self):
+        self._directory = tempfile.mkdtemp()
+        paths = []
+        for index in range(self._count):
+            path = os.path.join(self._directory, "{0}.xml".format(index))
+            with open(path, "wb") as fileobj:
+                fileobj.write(_message(index))
+            paths.append(path)
+        return paths
+
+    def __exit__(self, *args):
+        shutil.rmtree(self._directory)
+
+
+def _message(index):
+    return """<message:MessageGroup xmlns="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/generic" xmlns:message="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message">
+    <DataSet>
+        <KeyFamilyRef>MON2012TSE_O</KeyFamilyRef>
+        <Series>
+            <SeriesKey>
+                <Value concept="COUNTRY" value="OECD-E" />
+                <Value concept="INDIC" value="TO-VP" />
+            </SeriesKey>
+            <Obs><Time>1986</Time><ObsValue value="{0}"/></Obs>
+            <Obs><Time>1987</Time><ObsValue value="{1}"/></Obs>
+        </Series>
+    </DataSet>
+</message:MessageGroup>""".format(index, index + 1).encode("ascii")
@@ -0,0 +1,45 @@
+import datetime
+
+from nose.tools import istest, assert_equal, assert_raises
+
+from sdmx.periods import parse_period, PeriodFilter
+
+
+@istest
+def periods_are_parsed_as_ranges_of_dates():
+    for text, start, end in [
+        ("2020", (2020, 1, 1), (2021, 1, 1)),
+        ("2020-A1", (2020, 1, 1), (2021, 1, 1)),
+        ("2020-S2", (2020, 7, 1), (2021, 1, 1)),
+        ("2020-Q3", (2020, 7, 1), (2020, 10, 1)),
+        ("2020-M07", (2020, 7, 1), (2020, 8, 1)),
+        ("2020-12", (2020, 12, 1), (2021, 1, 1)),
+        ("2020-07-01", (2020, 7, 1), (2020, 7, 2)),
+        ("2020-07-01T12:00:00", (2020, 7, 1), (2020, 7, 2)),
+        ("2020-W01", (2019, 12, 30), (2020, 1, 6)),
+        ("2020-D366", (2020, 12, 31), (2021, 1, 1)),
+    ]:
+        assert_equal((datetime.date(*start), datetime.date(*end)), parse_period(text))
+
+
+@istest
+def value_error_is_raised_if_period_is_not_recognised():
+    for text in ["", "20", "2020-Q5", "2020-M13", "2019-D366", "2020/07"]:
+        assert_raises(ValueError, lambda: parse_period(text))
+
+
+@istest
+def period_filter_matches_periods_that_overlap_range():
+    period_filter = PeriodFilter(start_period="2020-Q2", end_period="2020-06")
+    
+    assert_equal(
+        [False, True, True, True, False, True],
+        list(map(period_filter.matches, ["2020-03", "2020-04", "2020-06-30", "2020-Q2", "2020-07", "2020"])),
+    )
+
+
+@istest
+def period_filter_does_not_match_missing_times():
+    period_filter = PeriodFilter(start_period="2020-Q2")
+    
+    assert_equal(False, period_filter.matches(None))
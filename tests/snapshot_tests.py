@@ -0,0 +1,111 @@
+import io
+import os
+import shutil
+import tempfile
+
+from nose.tools import istest, assert_equal, assert_raises
+
+import sdmx
+from sdmx import snapshot
+
+
+@istest
+def dsd_can_be_read_from_snapshot():
+    original = sdmx.dsd_reader(_dsd_file())
+    
+    dsd_reader = snapshot.loads(snapshot.dumps(original))
+    
+    assert_equal(
+        [(concept.id, concept.name("en")) for concept in original.concepts()],
+        [(concept.id, concept.name("en")) for concept in dsd_reader.concepts()],
+    )
+    original_key_family, = original.key_families()
+    key_family, = dsd_reader.key_families()
+    assert_equal(original_key_family.id, key_family.id)
+    assert_equal(original_key_family.name("en"), key_family.name("en"))
+    assert_equal(
+        [(dimension.concept_ref(), dimension.code_list_id()) for dimension in original_key_family.dimensions()],
+        [(dimension.concept_ref(), dimension.code_list_id()) for dimension in key_family.dimensions()],
+    )
+    assert_equal("TIME", key_family.time_dimension().concept_ref())
+    assert_equal(None, key_family.primary_measure())
+    assert_equal(_code_lists(original), _code_lists(dsd_reader))
+
+
+@istest
+def snapshot_can_be_mapped_from_file():
+    original = sdmx.dsd_reader(_dsd_file())
+    
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, "dsd.snapshot")
+        with open(path, "wb") as fileobj:
+            snapshot.dump(original, fileobj)
+        dsd_reader = snapshot.load(path)
+        
+        assert_equal(_code_lists(original), _code_lists(dsd_reader))
+    finally:
+        shutil.rmtree(directory)
+
+
+@istest
+def error_is_raised_if_snapshot_has_unsupported_version():
+    content = snapshot.dumps(sdmx.dsd_reader(_dsd_file()))
+    content = content[:8] + b"\xff" + content[9:]
+    
+    assert_raises(ValueError, lambda: snapshot.loads(content))
+
+
+@istest
+def error_is_raised_if_snapshot_is_truncated():
+    content = snapshot.dumps(sdmx.dsd_reader(_dsd_file()))
+    
+    for length in [len(content) - 4, len(content) - 1, len(content) // 2, 20]:
+        assert_raises(ValueError, lambda: snapshot.loads(content[:length]))
+
+
+def _code_lists(dsd_reader):
+    return [
+        (
+            code_list.id,
+            code_list.name("en"),
+            [(code.value, code.parent_code_id(), code.description("en"), code.description("fr")) for code in code_list.codes()],
+        )
+        for code_list in dsd_reader.code_lists()
+    ]
+
+
+def _dsd_file():
+    return io.BytesIO(u"""<?xml version="1.0" encoding="UTF-8"?>
+<Structure xmlns="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message" xmlns:structure="http://www.SDMX.org/resources/SDMXML/schemas/v2_0/structure">
+    <CodeLists>
+        <structure:CodeList id="CL_AREA">
+            <structure:Name xml:lang="en">Area</structure:Name>
+            <structure:Code value="W">
+                <structure:Description xml:lang="en">World</structure:Description>
+                <structure:Description xml:lang="fr">Monde</structure:Description>
+            </structure:Code>
+            <structure:Code value="FR" parentCode="W">
+                <structure:Description xml:lang="en">France</structure:Description>
+                <structure:Description xml:lang="fr">R\u00e9publique fran\u00e7aise</structure:Description>
+            </structure:Code>
+        </structure:CodeList>
+        <structure:CodeList id="CL_EMPTY">
+            <structure:Name xml:lang="en">Empty</structure:Name>
+        </structure:CodeList>
+    </CodeLists>
+    <Concepts>
+        <structure:Concept id="AREA">
+            <structure:Name xml:lang="en">Area</structure:Name>
+        </structure:Concept>
+    </Concepts>
+    <KeyFamilies>
+        <structure:KeyFamily id="KF">
+            <structure:Name xml:lang="en">Key family</structure:Name>
+            <structure:Components>
+                <structure:Dimension conceptRef="AREA" codelist="CL_AREA"/>
+                <structure:TimeDimension conceptRef="TIME" />
+            </structure:Components>
+        </structure:KeyFamily>
+    </KeyFamilies>
+</Structure>""".encode("utf-8"))
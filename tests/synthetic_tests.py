@@ -0,0 +1,36 @@
+import io
+
+from nose.tools import istest, assert_equal
+
+import sdmx
+from benchmarks import synthetic
+
+
+@istest
+def synthetic_generic_messages_can_be_read():
+    _assert_synthetic_message_can_be_read(synthetic.write_generic_message, sdmx.generic_data_message_reader)
+
+
+@istest
+def synthetic_compact_messages_can_be_read():
+    _assert_synthetic_message_can_be_read(synthetic.write_compact_message, sdmx.compact_data_message_reader)
+
+
+def _assert_synthetic_message_can_be_read(write_message, message_reader):
+    shape = synthetic.shape(series=3, observations=2, dimensions=2, codes=4, hierarchy_depth=2)
+    dsd_file = io.BytesIO()
+    synthetic.write_dsd(dsd_file, shape)
+    dsd_file.seek(0)
+    message_file = io.BytesIO()
+    write_message(message_file, shape)
+    message_file.seek(0)
+
+    dataset, = message_reader(message_file, dsd_fileobj=dsd_file).datasets()
+    series = list(dataset.series())
+
+    assert_equal(3, len(series))
+    assert_equal(
+        [("Dimension 0", ["Description of code 0 in dimension 0", "Description of code 1 in dimension 0"]), ("Dimension 1", ["Description of code 0 in dimension 1"])],
+        list(series[1].describe_key(lang="en").items()),
+    )
+    assert_equal([("1900-01", "1.0"), ("1900-02", "1.1")], [(observation.time, observation.value) for observation in series[1].observations()])
@@ -1,3 +1,4 @@
+import io
 import os
 import sys
 
@@ -14,3 +15,13 @@ def path(name):
 
 def open(name, mode):
     return builtins.open(path(name), mode)
+
+
+def series_index(fileobj, message_format):
+    # The index is written and read back, so readers are tested against a
+    # loaded index
+    from sdmx import index
+    output = io.BytesIO()
+    index.dump(index.build(fileobj, message_format), output)
+    fileobj.seek(0)
+    return index.load(io.BytesIO(output.getvalue()))